@@ -0,0 +1,29 @@
+import importlib
+
+# 各模块按需导入：asyncio与整个研究流程较重，只在第一次用到对应名称时才加载
+_LAZY_EXPORTS = {
+    "ParagraphOrchestrator": ".orchestrator",
+    "ParagraphTimeline": ".orchestrator",
+    "OrchestrationReport": ".orchestrator",
+    "estimate_remaining_work": ".orchestrator",
+    "ResearchPipeline": ".pipeline",
+    "build_default_pipeline": ".pipeline",
+    "StreamingReportAssembler": ".report_stream",
+    "FileSink": ".report_stream",
+    "StdoutSink": ".report_stream",
+    "QueueSink": ".report_stream",
+    "BatchRunner": ".batch",
+    "BatchItem": ".batch",
+    "BatchResult": ".batch",
+    "run_batch": ".batch"
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,235 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Callable
+from attrs import define, asdict
+from state.state import State
+from .pipeline import ResearchPipeline
+from .report_stream import FileSink
+
+PipelineFactory = Callable[[], ResearchPipeline]
+
+
+@define(auto_attribs=True, slots=True)
+class BatchItem:
+    id: str
+    query: str
+
+
+@define(auto_attribs=True, slots=True)
+class BatchResult:
+    id: str
+    query: str
+    status: str
+    started_at: str
+    wall_time: float = 0.0
+    paragraphs: int = 0
+    completed_paragraphs: int = 0
+    resumed: bool = False
+    state_path: str = ""
+    report_path: str = ""
+    error: str = ""
+    pid: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def load_batch_items(path: str) -> list[BatchItem]:
+    """读取JSONL查询文件，每行为 {"id": ..., "query": ...} 或一个JSON字符串；缺少id时按查询内容生成"""
+    items: list[BatchItem] = []
+    seen: set[str] = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if isinstance(data, str):
+                data = {"query": data}
+            query = data["query"]
+            item_id = str(data.get("id") or hashlib.sha1(query.encode("utf-8")).hexdigest()[:12])
+            if item_id in seen:
+                raise ValueError(f"重复的查询id: {item_id}")
+            seen.add(item_id)
+            items.append(BatchItem(id=item_id, query=query))
+    return items
+
+
+def load_finished_ids(results_path: str) -> set[str]:
+    """结果文件中已成功完成的条目id；失败的条目会在重启时重新运行"""
+    finished: set[str] = set()
+    if not os.path.exists(results_path):
+        return finished
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "done":
+                finished.add(record["id"])
+    return finished
+
+
+def _safe_name(item_id: str) -> str:
+    return re.sub(r"[^\w.-]", "_", item_id)
+
+
+class BatchRunner:
+    """批量运行研究查询：条目间以asyncio并发，State以日志形式持续保存，结果逐行追加到JSONL
+
+    stream_reports为True时报告按章节边生成边写入<id>.md，否则在全部段落完成后一次性格式化。
+    """
+
+    def __init__(self,
+                 pipeline_factory: PipelineFactory,
+                 output_dir: str,
+                 results_path: str | None = None,
+                 concurrency: int = 2,
+                 stream_reports: bool = False):
+        self.pipeline_factory = pipeline_factory
+        self.output_dir = output_dir
+        self.results_path = results_path or os.path.join(output_dir, "results.jsonl")
+        self.concurrency = concurrency
+        self.stream_reports = stream_reports
+        self._write_lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def log_info(self, message: str):
+        print(f"[BatchRunner] {message}")
+
+    def log_error(self, message: str):
+        print(f"[BatchRunner] 错误: {message}")
+
+    def _write_result(self, result: BatchResult):
+        # 每条结果一次写入并立即刷新，多进程以追加模式写同一文件
+        line = json.dumps(result.to_dict(), ensure_ascii=False) + "\n"
+        with self._write_lock, open(self.results_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+
+    async def run_item(self, item: BatchItem, pipeline: ResearchPipeline) -> BatchResult:
+        name = _safe_name(item.id)
+        state_path = os.path.join(self.output_dir, f"{name}.json")
+        report_path = os.path.join(self.output_dir, f"{name}.md")
+        result = BatchResult(
+            id=item.id,
+            query=item.query,
+            status="running",
+            started_at=datetime.now().isoformat(),
+            resumed=os.path.exists(state_path),
+            state_path=state_path,
+            pid=os.getpid()
+        )
+        start = time.perf_counter()
+        state: State | None = None
+        try:
+            # 损坏或写了一半的State文件只让当前条目失败
+            if result.resumed:
+                state = State.load_from_file(state_path, resume_journal=True)
+            else:
+                state = State(query=item.query, report_title=item.query)
+                state.enable_journal(state_path)
+            if not state.report_title:
+                state.report_title = item.query
+            if self.stream_reports:
+                await pipeline.run(state, sink=FileSink(report_path))
+            else:
+                await pipeline.run(state)
+                with open(report_path, "w", encoding="utf-8") as f:
+                    f.write(state.final_report)
+            result.status = "done"
+            result.report_path = report_path
+        except Exception as e:
+            result.status = "failed"
+            result.error = str(e)
+            self.log_error(f"{item.id} 运行失败: {str(e)}")
+        finally:
+            if state is not None:
+                state.close_journal()
+                result.paragraphs = len(state.paragraphs)
+                result.completed_paragraphs = sum(1 for p in state.paragraphs if p.is_completed)
+            result.wall_time = time.perf_counter() - start
+            self._write_result(result)
+        return result
+
+    async def run(self, items: list[BatchItem]) -> list[BatchResult]:
+        finished = load_finished_ids(self.results_path)
+        pending = [item for item in items if item.id not in finished]
+        if len(pending) < len(items):
+            self.log_info(f"跳过 {len(items) - len(pending)} 个已完成的条目")
+        if not pending:
+            return []
+
+        pipeline = self.pipeline_factory()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(item: BatchItem) -> BatchResult:
+            async with semaphore:
+                return await self.run_item(item, pipeline)
+
+        outcomes = await asyncio.gather(*(run_one(item) for item in pending), return_exceptions=True)
+        results = []
+        for item, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                # run_item已记录普通异常，这里只会是取消等未被捕获的情况
+                self.log_error(f"{item.id} 运行中断: {outcome!r}")
+                outcome = BatchResult(id=item.id, query=item.query, status="failed",
+                                      started_at=datetime.now().isoformat(), error=repr(outcome), pid=os.getpid())
+            results.append(outcome)
+        return results
+
+
+def _run_shard(pipeline_factory: PipelineFactory,
+               output_dir: str,
+               results_path: str,
+               concurrency: int,
+               stream_reports: bool,
+               items: list[BatchItem]) -> list[dict[str, Any]]:
+    runner = BatchRunner(pipeline_factory, output_dir, results_path, concurrency, stream_reports)
+    return [r.to_dict() for r in asyncio.run(runner.run(items))]
+
+
+def run_batch(input_path: str,
+              output_dir: str,
+              pipeline_factory: PipelineFactory,
+              results_path: str | None = None,
+              concurrency: int = 2,
+              workers: int = 0,
+              stream_reports: bool = False) -> dict[str, Any]:
+    """运行整个批次并返回汇总；workers>0时将条目分片到多个进程，每个进程内再以concurrency并发
+
+    使用多进程时pipeline_factory需可被pickle（模块级函数或functools.partial）。
+    """
+    start = time.perf_counter()
+    items = load_batch_items(input_path)
+    runner = BatchRunner(pipeline_factory, output_dir, results_path, concurrency, stream_reports)
+    finished = load_finished_ids(runner.results_path)
+    pending = [item for item in items if item.id not in finished]
+
+    if workers > 0 and len(pending) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        shards = [pending[i::workers] for i in range(workers) if pending[i::workers]]
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            futures = [
+                executor.submit(_run_shard, pipeline_factory, output_dir, runner.results_path, concurrency, stream_reports, shard)
+                for shard in shards
+            ]
+            results = [record for future in futures for record in future.result()]
+    else:
+        results = [r.to_dict() for r in asyncio.run(runner.run(pending))]
+
+    return {
+        "total": len(items),
+        "skipped": len(items) - len(pending),
+        "done": sum(1 for r in results if r["status"] == "done"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "wall_time": time.perf_counter() - start,
+        "results_path": runner.results_path
+    }
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+from attrs import define, field, asdict
+from state.state import State, Paragraph
+from utils.metrics import record_queue_time
+
+ParagraphResearcher = Callable[[Paragraph], Awaitable[Any]]
+
+
+def estimate_remaining_work(paragraph: Paragraph, max_reflections: int = 2) -> int:
+    """估算段落剩余的工作量（LLM/搜索轮次），用于调度优先级"""
+    if paragraph.is_completed:
+        return 0
+    research = paragraph.research
+    work = max(max_reflections - research.reflection_iteration, 0)
+    if not research.search_history:
+        work += 1
+    if not research.latest_summary:
+        work += 1
+    # 未完成的段落至少还需要一次收尾，不能被当作已完成跳过
+    return max(work, 1)
+
+
+@define(auto_attribs=True, slots=True)
+class ParagraphTimeline:
+    """单个段落的调度时间线，时间为相对本次运行开始的秒数"""
+    order: int
+    title: str
+    priority: int
+    queued_at: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+    status: str = "pending"
+    error: str = ""
+
+    @property
+    def wait_time(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return self.started_at - self.queued_at
+
+    @property
+    def run_time(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["wait_time"] = self.wait_time
+        data["run_time"] = self.run_time
+        return data
+
+
+@define(auto_attribs=True, slots=True)
+class OrchestrationReport:
+    wall_time: float = 0.0
+    max_concurrency: int = 1
+    timelines: list[ParagraphTimeline] = field(factory=list)
+
+    @property
+    def total_run_time(self) -> float:
+        """各段落耗时之和，即串行执行所需的时间"""
+        return sum(t.run_time for t in self.timelines)
+
+    @property
+    def slowest_run_time(self) -> float:
+        return max((t.run_time for t in self.timelines), default=0.0)
+
+    @property
+    def failed(self) -> list[ParagraphTimeline]:
+        return [t for t in self.timelines if t.status == "failed"]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "wall_time": self.wall_time,
+            "max_concurrency": self.max_concurrency,
+            "total_run_time": self.total_run_time,
+            "slowest_run_time": self.slowest_run_time,
+            "timelines": [t.to_dict() for t in self.timelines]
+        }
+
+
+class ParagraphOrchestrator:
+    """并发研究State中的所有段落，剩余工作量最多的段落优先调度"""
+
+    def __init__(self,
+                 researcher: ParagraphResearcher,
+                 max_concurrency: int = 4,
+                 max_reflections: int = 2,
+                 fail_fast: bool = False):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency 必须大于等于1")
+        self.researcher = researcher
+        self.max_concurrency = max_concurrency
+        self.max_reflections = max_reflections
+        self.fail_fast = fail_fast
+
+    def log_info(self, message: str):
+        print(f"[ParagraphOrchestrator] {message}")
+
+    def log_error(self, message: str):
+        print(f"[ParagraphOrchestrator] 错误: {message}")
+
+    async def run(self, state: State) -> OrchestrationReport:
+        start = time.perf_counter()
+        queue: asyncio.PriorityQueue[tuple[int, int, Paragraph]] = asyncio.PriorityQueue()
+        timelines: dict[int, ParagraphTimeline] = {}
+
+        for paragraph in state.paragraphs:
+            work = estimate_remaining_work(paragraph, self.max_reflections)
+            timeline = ParagraphTimeline(order=paragraph.order, title=paragraph.title, priority=work)
+            timelines[paragraph.order] = timeline
+            if work == 0:
+                timeline.status = "skipped"
+                continue
+            queue.put_nowait((-work, paragraph.order, paragraph))
+
+        workers_count = min(self.max_concurrency, queue.qsize())
+        self.log_info(f"开始研究 {queue.qsize()} 个段落，并发数 {workers_count}")
+
+        async def worker():
+            while True:
+                try:
+                    _, order, paragraph = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                timeline = timelines[order]
+                timeline.started_at = time.perf_counter() - start
+                timeline.status = "running"
+                record_queue_time("paragraph", timeline.wait_time)
+                try:
+                    await self.researcher(paragraph)
+                    timeline.status = "done"
+                except Exception as e:
+                    timeline.status = "failed"
+                    timeline.error = str(e)
+                    self.log_error(f"段落 {order}（{paragraph.title}）研究失败: {str(e)}")
+                    if self.fail_fast:
+                        raise
+                finally:
+                    timeline.finished_at = time.perf_counter() - start
+
+        workers = [asyncio.create_task(worker()) for _ in range(workers_count)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+        state.update_completion()
+        report = OrchestrationReport(
+            wall_time=time.perf_counter() - start,
+            max_concurrency=self.max_concurrency,
+            timelines=sorted(timelines.values(), key=lambda t: t.order)
+        )
+        self.log_info(f"完成，总耗时 {report.wall_time:.2f}s，串行耗时 {report.total_run_time:.2f}s")
+        return report
+
+    def run_sync(self, state: State) -> OrchestrationReport:
+        return asyncio.run(self.run(state))
@@ -0,0 +1,198 @@
+import json
+from typing import Any, Protocol
+from llms.base import BaseLLM
+from nodes.search_node import FirstSearchNode, ReflectionNode
+from nodes.summary_node import FirstSummaryNode, ReflectionSummaryNode, SummaryCompressor
+import prompts
+from state.state import State, Paragraph
+from utils.metrics import get_registry
+from utils.novelty import ReflectionPolicy, research_novelty
+from utils.text_processing import extract_json_from_text, get_prompt_token_budget
+from .orchestrator import ParagraphOrchestrator, OrchestrationReport
+from .report_stream import ReportSink, StreamingReportAssembler
+
+
+class AsyncSearch(Protocol):
+    async def asearch(self, query: str, max_results: int = 5, **kwargs) -> list[dict[str, Any]]:
+        ...
+
+
+class ResearchPipeline:
+    """单个查询的完整研究流程：生成报告结构 → 并发研究各段落 → 格式化最终报告
+
+    每个阶段完成后都会写入State，已完成的阶段在恢复运行时直接跳过。
+    设置reflection时段落在首次总结后继续反思补充，新结果的信息增益不足即提前结束。
+    每次总结只发送上一版总结与新增结果中BM25最相关的passage_top_k个段落，总结超过max_summary_tokens时分层压缩。
+    columnar_history为True时各段落的search_history使用列式存储。
+    """
+
+    def __init__(self,
+                 llm: BaseLLM,
+                 search: AsyncSearch,
+                 max_concurrency: int = 4,
+                 max_results: int = 5,
+                 max_paragraphs: int = 5,
+                 token_budget: int | None = None,
+                 reflection: ReflectionPolicy | None = None,
+                 max_summary_tokens: int = 2000,
+                 passage_top_k: int | None = 8,
+                 columnar_history: bool = False):
+        self.llm = llm
+        self.search = search
+        self.max_concurrency = max_concurrency
+        self.max_results = max_results
+        self.max_paragraphs = max_paragraphs
+        self.token_budget = token_budget or get_prompt_token_budget(llm.config)
+        self.reflection = reflection
+        self.columnar_history = columnar_history
+        self.first_search_node = FirstSearchNode(llm)
+        self.reflection_node = ReflectionNode(llm)
+        compressor = SummaryCompressor(llm, max_tokens=max_summary_tokens)
+        self.first_summary_node = FirstSummaryNode(
+            llm, results_token_budget=self.token_budget, compressor=compressor, passage_top_k=passage_top_k
+        )
+        self.reflection_summary_node = ReflectionSummaryNode(
+            llm, results_token_budget=self.token_budget, compressor=compressor, passage_top_k=passage_top_k
+        )
+
+    def log_info(self, message: str):
+        print(f"[ResearchPipeline] {message}")
+
+    async def plan(self, state: State):
+        if state.paragraphs:
+            return
+        response = await self.llm.ainvoke([
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_REPORT_STRUCTURE},
+            {"role": "user", "content": state.query}
+        ])
+        outline = extract_json_from_text(response)
+        if isinstance(outline, dict):
+            outline = [outline]
+        for item in (outline or [])[:self.max_paragraphs]:
+            if isinstance(item, dict) and item.get("title"):
+                state.add_paragraph(item["title"], item.get("content", ""))
+        if not state.paragraphs:
+            raise ValueError(f"报告结构生成失败: {response[:200]}")
+        self.log_info(f"生成报告结构，共 {len(state.paragraphs)} 个段落")
+
+    async def research_paragraph(self, paragraph: Paragraph):
+        research = paragraph.research
+        if not research.latest_summary:
+            query = (await self.first_search_node.arun({
+                "title": paragraph.title,
+                "content": paragraph.content
+            }))["search_query"]
+            research.add_search_results(query, await self.search.asearch(query, max_results=self.max_results))
+            await self.first_summary_node.asummarize(paragraph, query)
+        if self.reflection is not None:
+            await self.reflect(paragraph)
+        research.mark_completed()
+
+    async def reflect(self, paragraph: Paragraph):
+        """反思循环：每轮先评估新结果相对已有总结与搜索历史的增益，增益不足时不再总结并结束"""
+        research = paragraph.research
+        registry = get_registry()
+        while self.reflection.should_reflect(research):
+            query = (await self.reflection_node.arun({
+                "title": paragraph.title,
+                "content": paragraph.content,
+                "paragraph_latest_state": research.latest_summary
+            }))["search_query"]
+            results = await self.search.asearch(query, max_results=self.max_results)
+            score = research_novelty(results, research, self.reflection.shingle_size)
+            registry.observe("reflection_gain", score.gain)
+            research.add_search_results(query, results)
+            research.increment_reflection()
+            registry.inc("reflection_rounds_total")
+            if not self.reflection.is_worthwhile(score):
+                registry.inc("reflection_stops_total", reason="low_gain")
+                self.log_info(f"段落 {paragraph.title} 第{research.reflection_iteration}轮增益 {score.gain:.2f}，提前结束反思")
+                return
+            await self.reflection_summary_node.asummarize(paragraph, query)
+        registry.inc("reflection_stops_total", reason="budget")
+
+    async def format_report(self, state: State) -> str:
+        paragraphs = [
+            {"title": p.title, "paragraph_latest_state": p.get_final_content()}
+            for p in state.paragraphs
+        ]
+        report = await self.llm.ainvoke([
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_REPORT_FORMATTING},
+            {"role": "user", "content": json.dumps(paragraphs, ensure_ascii=False)}
+        ])
+        state.set_final_report(report)
+        return report
+
+    async def run(self, state: State, sink: ReportSink | None = None) -> OrchestrationReport | None:
+        """运行完整流程；提供sink时每个段落完成后立即格式化对应章节并按顺序流式写出"""
+        if self.columnar_history:
+            state.use_columnar_history()
+        await self.plan(state)
+        report = None
+        state.update_completion()
+        assembler = None
+        if sink is not None and state.final_report:
+            await sink.write(state.final_report)
+            await sink.close()
+        elif sink is not None:
+            assembler = StreamingReportAssembler(self.llm, sink, max_concurrency=self.max_concurrency)
+            assembler.start(state)
+        if not state.is_completed:
+            researcher = self.research_paragraph
+            if assembler is not None:
+                async def researcher(paragraph: Paragraph):
+                    await self.research_paragraph(paragraph)
+                    assembler.submit(paragraph)
+
+            orchestrator = ParagraphOrchestrator(
+                researcher,
+                max_concurrency=self.max_concurrency,
+                max_reflections=self.reflection.max_rounds if self.reflection else 0
+            )
+            try:
+                report = await orchestrator.run(state)
+            except BaseException:
+                if assembler is not None:
+                    await assembler.abort()
+                raise
+            if report.failed:
+                if assembler is not None:
+                    await assembler.abort()
+                raise RuntimeError(f"{len(report.failed)} 个段落研究失败: {report.failed[0].error}")
+        if assembler is not None:
+            await assembler.finish(state)
+        elif not state.final_report:
+            await self.format_report(state)
+        return report
+
+def build_default_pipeline(fake: bool = False,
+                           max_concurrency: int = 4,
+                           search_backend: str | None = None,
+                           columnar_history: bool | None = None) -> ResearchPipeline:
+    """按Config构建真实的LLM与搜索后端；fake为True时使用离线的FakeLLM与FakeSearch
+
+    search_backend与columnar_history不为None时覆盖Config中的设置。
+    """
+    if fake:
+        from llms.fake_llm import FakeLLM
+        from tools.fake_search import FakeSearch
+        return ResearchPipeline(
+            FakeLLM(), FakeSearch(), max_concurrency=max_concurrency, reflection=ReflectionPolicy(),
+            columnar_history=bool(columnar_history)
+        )
+
+    from config import Config
+    from llms.factory import LLMFactory
+    from tools.search import create_search_backend
+    config = Config()
+    if search_backend:
+        config.search_backend = search_backend
+    if columnar_history is not None:
+        config.columnar_search_history = columnar_history
+    llm = LLMFactory.create(config.llm_provider, config.openai_model, config.get_llm_config())
+    search = create_search_backend(config.search_backend, config.get_search_config())
+    reflection = ReflectionPolicy(max_rounds=config.reflection_max_rounds, min_gain=config.reflection_min_gain)
+    return ResearchPipeline(
+        llm, search, max_concurrency=max_concurrency, reflection=reflection,
+        columnar_history=config.columnar_search_history
+    )
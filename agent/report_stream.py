@@ -0,0 +1,217 @@
+import sys
+import json
+import time
+import asyncio
+from typing import AsyncIterator, Protocol
+from llms.base import BaseLLM
+import prompts
+from state.state import State, Paragraph
+from utils.metrics import get_registry, record_fallback
+
+
+class ReportSink(Protocol):
+    async def write(self, text: str):
+        ...
+
+    async def close(self):
+        ...
+
+
+class FileSink:
+    """逐段写入Markdown文件，每次写入后立即刷新"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    async def write(self, text: str):
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(text)
+        self._file.flush()
+
+    async def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class StdoutSink:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    async def write(self, text: str):
+        self.stream.write(text)
+        self.stream.flush()
+
+    async def close(self):
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+_END = object()
+
+
+class QueueSink:
+    """以异步迭代器的形式对外提供报告片段：async for chunk in sink"""
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def write(self, text: str):
+        self._queue.put_nowait(text)
+
+    async def close(self):
+        self._queue.put_nowait(_END)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while True:
+            item = await self._queue.get()
+            if item is _END:
+                return
+            yield item
+
+
+class _Section:
+    __slots__ = ("task", "queue", "parts")
+
+    def __init__(self):
+        self.task: asyncio.Task | None = None
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.parts: list[str] = []
+
+
+class StreamingReportAssembler:
+    """段落完成后立即以astream格式化对应章节，并按段落顺序写入sink
+
+    报告以"# 标题"开头，排在前面的章节边生成边输出，先完成的后续章节缓冲到轮到它为止；
+    所有段落完成后再生成全文结论，写完后拼接为State.final_report。
+    """
+
+    def __init__(self, llm: BaseLLM, sink: ReportSink, max_concurrency: int = 4, separator: str = "\n\n"):
+        self.llm = llm
+        self.sink = sink
+        self.separator = separator
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._sections: list[_Section] = []
+        self._writer: asyncio.Task | None = None
+        self._title = ""
+        self._paragraphs: list[Paragraph] = []
+        self._start = 0.0
+
+    def log_info(self, message: str):
+        print(f"[StreamingReportAssembler] {message}")
+
+    def start(self, state: State):
+        self._start = time.perf_counter()
+        self._title = state.report_title or state.query
+        self._paragraphs = list(state.paragraphs)
+        self._sections = [_Section() for _ in self._paragraphs]
+        if self._paragraphs:
+            # 最后一节为全文结论，所有段落都提交后才生成
+            self._sections.append(_Section())
+        self._writer = asyncio.create_task(self._write_all())
+        for paragraph in state.paragraphs:
+            if paragraph.is_completed:
+                self.submit(paragraph)
+
+    def submit(self, paragraph: Paragraph):
+        """段落完成后调用，开始格式化该章节；重复提交会被忽略"""
+        section = self._sections[paragraph.order]
+        if section.task is not None:
+            return
+        fallback = f"## {paragraph.title}\n\n{paragraph.get_final_content()}"
+        section.task = asyncio.create_task(self._format(self._build_messages(paragraph), section, fallback))
+        conclusion = self._sections[-1]
+        if conclusion.task is None and all(s.task is not None for s in self._sections[:-1]):
+            conclusion.task = asyncio.create_task(self._format(self._build_conclusion_messages(), conclusion))
+
+    def _build_messages(self, paragraph: Paragraph) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_SECTION_FORMATTING},
+            {"role": "user", "content": json.dumps({
+                "title": paragraph.title,
+                "paragraph_latest_state": paragraph.get_final_content()
+            }, ensure_ascii=False)}
+        ]
+
+    def _build_conclusion_messages(self) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_REPORT_CONCLUSION},
+            {"role": "user", "content": json.dumps([
+                {"title": p.title, "paragraph_latest_state": p.get_final_content()}
+                for p in self._paragraphs
+            ], ensure_ascii=False)}
+        ]
+
+    def _emit(self, section: _Section, chunk: str):
+        section.parts.append(chunk)
+        section.queue.put_nowait(chunk)
+
+    async def _format(self, messages: list[dict[str, str]], section: _Section, fallback: str | None = None):
+        try:
+            async with self._semaphore:
+                async for chunk in self.llm.astream(messages):
+                    self._emit(section, chunk)
+        except Exception as e:
+            if section.parts:
+                section.queue.put_nowait(e)
+                return
+            # 尚未输出任何内容时退回到未经格式化的段落内容；结论生成失败则省略
+            if fallback is None:
+                record_fallback("StreamingReportAssembler", "no_conclusion")
+            else:
+                record_fallback("StreamingReportAssembler", "raw_section")
+                self._emit(section, fallback)
+        section.queue.put_nowait(_END)
+
+    async def _write_all(self):
+        written = False
+        if self._title:
+            await self.sink.write(f"# {self._title}")
+            written = True
+        for index, section in enumerate(self._sections):
+            started = False
+            while True:
+                item = await section.queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                # 分隔符在章节的第一个片段之前写出，空章节不产生多余的分隔
+                if not started and written:
+                    await self.sink.write(self.separator)
+                started = written = True
+                await self.sink.write(item)
+            if index == 0:
+                elapsed = time.perf_counter() - self._start
+                get_registry().observe("report_first_section_seconds", elapsed)
+                self.log_info(f"第一个章节已输出，耗时 {elapsed:.2f}s")
+
+    async def finish(self, state: State) -> str:
+        """等待所有章节写出，保存并返回完整报告；写出失败时取消其余章节"""
+        try:
+            await self._writer
+        except BaseException:
+            await self._cancel_sections()
+            raise
+        finally:
+            await self.sink.close()
+        parts = [f"# {self._title}"] if self._title else []
+        parts.extend("".join(section.parts) for section in self._sections if section.parts)
+        report = self.separator.join(parts)
+        state.set_final_report(report)
+        return report
+
+    async def _cancel_sections(self):
+        tasks = [s.task for s in self._sections if s.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def abort(self):
+        await self._cancel_sections()
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+        await self.sink.close()
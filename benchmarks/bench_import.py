@@ -0,0 +1,86 @@
+"""导入耗时基准：基于 python -X importtime 统计各入口模块的冷启动导入时间
+
+用法: python -m benchmarks.bench_import [--repeat 5] [--budget-ms 120]
+每个模块在独立的子进程中导入，取多次的中位数；超过预算或导入了重型SDK时以非零状态退出。
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_MODULES = ["main", "agent", "llms", "nodes.search_node", "tools.search", "prompts", "state.state"]
+# 这些SDK应在第一次使用时才导入
+HEAVY_MODULES = ["openai", "tavily", "httpx", "dotenv", "numpy"]
+# 中位数上限，test/test_lazy_imports.py 会以此为准检查
+DEFAULT_BUDGET_MS = 120.0
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """解析 -X importtime 输出，返回 {模块名: 累计微秒}"""
+    timings: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings.setdefault(name.strip(), int(cumulative))
+    return timings
+
+
+def import_timings(module: str) -> dict[str, int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def heavy_imports(timings: dict[str, int]) -> list[str]:
+    return [name for name in HEAVY_MODULES if name in timings]
+
+
+def find_heavy_imports(module: str) -> list[str]:
+    return heavy_imports(import_timings(module))
+
+
+def measure(module: str, repeat: int = 5) -> dict[str, Any]:
+    samples, timings = [], {}
+    for _ in range(repeat):
+        timings = import_timings(module)
+        samples.append(timings[module] / 1000)
+    samples.sort()
+    return {
+        "module": module,
+        "median_ms": samples[len(samples) // 2],
+        "min_ms": samples[0],
+        "heavy_imports": heavy_imports(timings)
+    }
+
+
+def run(modules: list[str] = ENTRY_MODULES, repeat: int = 5, budget_ms: float = DEFAULT_BUDGET_MS) -> dict[str, Any]:
+    results = [measure(module, repeat) for module in modules]
+    for result in results:
+        result["within_budget"] = result["median_ms"] <= budget_ms and not result["heavy_imports"]
+    return {"budget_ms": budget_ms, "results": results, "ok": all(r["within_budget"] for r in results)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="每个入口模块导入耗时的上限（毫秒）")
+    parser.add_argument("modules", nargs="*", default=ENTRY_MODULES)
+    args = parser.parse_args()
+
+    report = run(args.modules, args.repeat, args.budget_ms)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""search_history存储布局基准：对比Search对象列表与列式SearchColumns的内存占用与追加吞吐
+
+用法: python -m benchmarks.bench_search_history [--rows 20000] [--batch 10] [--content-chars 200]
+正文在各行之间共享，内存差异只反映每行的结构开销。
+"""
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Any
+from state.state import Research
+
+LAYOUTS = ("list", "columnar")
+
+
+def make_batches(rows: int, batch: int, content_chars: int) -> list[tuple[str, list[dict[str, Any]]]]:
+    content = "搜索结果正文" * (content_chars // 6)
+    batches = []
+    for start in range(0, rows, batch):
+        query = f"查询{start // batch % 500}"
+        batches.append((query, [
+            {"title": f"结果{i}", "url": f"https://example.com/{i}", "content": content, "score": (i % 100) / 100}
+            for i in range(start, min(start + batch, rows))
+        ]))
+    return batches
+
+
+def new_research(layout: str) -> Research:
+    research = Research()
+    if layout == "columnar":
+        research.use_columnar_history()
+    return research
+
+
+def fill(layout: str, batches: list[tuple[str, list[dict[str, Any]]]]) -> Research:
+    research = new_research(layout)
+    for query, results in batches:
+        research.add_search_results(query, results, deduplicate=False)
+    return research
+
+
+def measure(layout: str, batches: list[tuple[str, list[dict[str, Any]]]]) -> dict[str, Any]:
+    rows = sum(len(results) for _, results in batches)
+    gc.collect()
+    start = time.perf_counter()
+    research = fill(layout, batches)
+    elapsed = time.perf_counter() - start
+
+    access_start = time.perf_counter()
+    for i in range(0, rows, max(rows // 1000, 1)):
+        research.search_history[i].score
+    access = time.perf_counter() - access_start
+
+    to_dict_start = time.perf_counter()
+    research.to_dict()
+    to_dict = time.perf_counter() - to_dict_start
+    del research
+
+    gc.collect()
+    tracemalloc.start()
+    research = fill(layout, batches)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "layout": layout,
+        "rows": rows,
+        "append_rows_per_s": rows / elapsed,
+        "memory_mb": memory / 1024 / 1024,
+        "bytes_per_row": memory / rows,
+        "access_1000_ms": access * 1000,
+        "to_dict_ms": to_dict * 1000
+    }
+
+
+def run(rows: int = 20000, batch: int = 10, content_chars: int = 200) -> dict[str, Any]:
+    batches = make_batches(rows, batch, content_chars)
+    results = {layout: measure(layout, batches) for layout in LAYOUTS}
+    results["memory_ratio"] = results["columnar"]["memory_mb"] / results["list"]["memory_mb"]
+    results["append_speedup"] = results["columnar"]["append_rows_per_s"] / results["list"]["append_rows_per_s"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--content-chars", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.batch, args.content_chars), indent=2, ensure_ascii=False))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
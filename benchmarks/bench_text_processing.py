@@ -0,0 +1,77 @@
+"""LLM输出JSON提取的微基准
+
+用法: python -m benchmarks.bench_text_processing [--repeat N] [--output result.json]
+统计各类输出的平均解析耗时、直接解析/扫描回退/失败的比例。
+"""
+import argparse
+import json
+import random
+import time
+from utils.text_processing import extract_json_detailed
+
+PAYLOAD = {
+    "search_query": "2025年A股走势 宏观经济 资金面",
+    "reasoning": "需要同时覆盖政策、资金面与基本面的信息。" * 20
+}
+
+
+def build_cases(seed: int = 42) -> dict[str, str]:
+    rng = random.Random(seed)
+    body = json.dumps(PAYLOAD, ensure_ascii=False)
+    noise = "".join(rng.choice("这是一段无关的解释文字，包含 {括号} 与 [方括号]。 ") for _ in range(2000))
+    large_value = json.dumps({"search_query": "q", "reasoning": "x" * 1_000_000})
+    return {
+        "clean": body,
+        "code_fence": f"```json\n{body}\n```",
+        "reasoning_prefix": f"思考：先分析用户的问题。\n{body}",
+        "prose_around": f"好的，下面是结果：\n{body}\n希望对你有帮助！",
+        "multiple_objects": f"草稿 {{\"search_query\": \"draft\"}} 修订后 {body}",
+        "noisy_prefix": f"{noise}\n{body}",
+        "large_string": large_value,
+        "large_noisy": f"{noise * 50}\n{body}\n{noise * 50}",
+        "truncated": body[:-10],
+    }
+
+
+def run(repeat: int = 50) -> dict[str, dict[str, float | str]]:
+    results = {}
+    for name, text in build_cases().items():
+        paths: dict[str, int] = {}
+        start = time.perf_counter()
+        for _ in range(repeat):
+            _, path = extract_json_detailed(text)
+            paths[path] = paths.get(path, 0) + 1
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "size": len(text),
+            "mean_us": elapsed / repeat * 1e6,
+            "path": max(paths, key=paths.get)
+        }
+    total = len(results)
+    results["_summary"] = {
+        "fallback_rate": sum(1 for r in results.values() if r["path"] == "scan") / total,
+        "failure_rate": sum(1 for r in results.values() if r["path"] == "failed") / total
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON提取微基准")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", type=str, default="")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    for name, row in results.items():
+        if name.startswith("_"):
+            continue
+        print(f"{name:<18} {row['size']:>9} chars {row['mean_us']:>12.1f} us  {row['path']}")
+    print(f"回退率: {results['_summary']['fallback_rate']:.0%}  失败率: {results['_summary']['failure_rate']:.0%}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
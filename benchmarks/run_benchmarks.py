@@ -0,0 +1,207 @@
+"""离线端到端基准：用FakeLLM与FakeSearch替代OpenAI与Tavily
+
+用法: python -m benchmarks.run_benchmarks [--paragraphs 6] [--concurrency 6] [--output bench.json]
+覆盖节点延迟、整篇报告吞吐、State内存占用、序列化、文本处理与段落检索开销，结果可保存为JSON。
+"""
+import io
+import os
+import gc
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+from typing import Any, Callable
+from agent.orchestrator import ParagraphOrchestrator
+from agent.pipeline import ResearchPipeline
+from llms.fake_llm import FakeLLM
+from nodes.search_node import FirstSearchNode
+from state.state import State
+from tools.fake_search import FakeSearch
+from tools.local_search import LocalSearch
+from utils.bm25 import PassageIndex
+from utils.text_processing import pack_search_results
+from benchmarks import bench_text_processing
+
+
+def timeit(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000
+    }
+
+
+def build_state(paragraphs: int, results_per_paragraph: int, content_chars: int) -> State:
+    search = FakeSearch(content_chars=content_chars)
+    state = State(query="基准测试")
+    for i in range(paragraphs):
+        state.add_paragraph(f"段落{i}", f"内容{i}")
+        research = state.paragraphs[i].research
+        for round_ in range(max(results_per_paragraph // 5, 1)):
+            research.add_search_results(f"段落{i} 查询{round_}", search.search(f"段落{i} 查询{round_}"))
+        research.update_summary("总结" * 200)
+    return state
+
+
+def make_researcher(llm: FakeLLM, search: FakeSearch, token_budget: int):
+    return ResearchPipeline(llm, search, token_budget=token_budget).research_paragraph
+
+
+def bench_node_latency(llm_latency: float, repeat: int) -> dict[str, Any]:
+    node = FirstSearchNode(FakeLLM(latency=llm_latency))
+    payload = {"title": "A股走势", "content": "预测未来走势"}
+    return {
+        "run": timeit(lambda: node.run(payload), repeat),
+        "arun": timeit(lambda: asyncio.run(node.arun(payload)), repeat),
+        "llm_latency_ms": llm_latency * 1000
+    }
+
+
+def bench_report_throughput(paragraphs: int, concurrency: int, llm_latency: float,
+                            tokens_per_second: float, search_latency: float) -> dict[str, Any]:
+    llm = FakeLLM(latency=llm_latency, tokens_per_second=tokens_per_second)
+    search = FakeSearch(latency=search_latency)
+    state = State(query="基准测试")
+    for i in range(paragraphs):
+        state.add_paragraph(f"段落{i}", f"内容{i}")
+
+    orchestrator = ParagraphOrchestrator(make_researcher(llm, search, 4000), max_concurrency=concurrency)
+    report = orchestrator.run_sync(state)
+    return {
+        "paragraphs": paragraphs,
+        "concurrency": concurrency,
+        "wall_time_s": report.wall_time,
+        "serial_time_s": report.total_run_time,
+        "paragraphs_per_s": paragraphs / report.wall_time if report.wall_time else 0.0,
+        "llm_calls": llm.calls,
+        "prompt_tokens": llm.prompt_tokens,
+        "completion_tokens": llm.completion_tokens,
+        "search_calls": search.calls,
+        "completed": state.is_completed
+    }
+
+
+def bench_state_memory(paragraphs: int, results_per_paragraph: int, content_chars: int) -> dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    state = build_state(paragraphs, results_per_paragraph, content_chars)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "paragraphs": paragraphs,
+        "searches": sum(p.research.get_search_count() for p in state.paragraphs),
+        "current_mb": current / 1024 / 1024,
+        "peak_mb": peak / 1024 / 1024
+    }
+
+
+def bench_serialization(paragraphs: int, results_per_paragraph: int, content_chars: int, repeat: int) -> dict[str, Any]:
+    state = build_state(paragraphs, results_per_paragraph, content_chars)
+    json_str = state.to_json()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "state.json")
+        journal = state.enable_journal(path, compact_every=10_000)
+        research = state.paragraphs[0].research
+        results = {
+            "json_bytes": len(json_str.encode("utf-8")),
+            "to_json": timeit(state.to_json, repeat),
+            "from_json": timeit(lambda: State.from_json(json_str), repeat),
+            "save_to_file": timeit(lambda: State.save_to_file(state, os.path.join(tmp, "plain.json")), repeat),
+            "journal_checkpoint": timeit(lambda: research.increment_reflection(), repeat),
+        }
+        journal.close()
+    return results
+
+
+def bench_passage_index(passages: int, repeat: int) -> dict[str, Any]:
+    search = FakeSearch(content_chars=1500)
+    index = PassageIndex()
+    start = time.perf_counter()
+    doc_id = 0
+    while len(index) < passages:
+        for result in search.search(f"段落检索{doc_id}", max_results=5):
+            index.add_document(doc_id, result["content"], result["title"], result["url"])
+            doc_id += 1
+    return {
+        "passages": len(index),
+        "index_ms": (time.perf_counter() - start) * 1000,
+        "search": timeit(lambda: index.search("外资净流入 估值修复 central bank easing", k=8), repeat)
+    }
+
+
+def bench_local_search(documents: int, repeat: int) -> dict[str, Any]:
+    search = FakeSearch(content_chars=1500)
+    corpus = [result for i in range(0, documents, 5) for result in search.search(f"本地语料{i}", max_results=5)]
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = LocalSearch(os.path.join(tmp, "index.db"))
+        start = time.perf_counter()
+        backend.add_documents(corpus)
+        ingest = time.perf_counter() - start
+        start = time.perf_counter()
+        reindex = backend.add_documents(corpus)
+        result = {
+            "documents": len(backend),
+            "ingest_ms": ingest * 1000,
+            "reindex_unchanged_ms": (time.perf_counter() - start) * 1000,
+            "unchanged": reindex.unchanged,
+            "search": timeit(lambda: backend.search("外资净流入 估值修复 central bank easing", max_results=5), repeat)
+        }
+        backend.close()
+    return result
+
+
+def bench_text(repeat: int) -> dict[str, Any]:
+    results = FakeSearch(content_chars=20000).search("文本处理基准", max_results=10)
+    return {
+        "extract_json": bench_text_processing.run(repeat),
+        "pack_search_results": timeit(lambda: pack_search_results(results, 4000, query="文本处理"), repeat),
+        "passage_index": bench_passage_index(3000, repeat),
+        "local_search": bench_local_search(2000, repeat)
+    }
+
+
+def run_all(args: argparse.Namespace) -> dict[str, Any]:
+    # 节点内部的日志输出不计入结果
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            "node_latency": bench_node_latency(args.llm_latency, args.repeat),
+            "report_throughput": bench_report_throughput(
+                args.paragraphs, args.concurrency, args.llm_latency, args.tokens_per_second, args.search_latency
+            ),
+            "state_memory": bench_state_memory(args.paragraphs, args.results, args.content_chars),
+            "serialization": bench_serialization(args.paragraphs, args.results, args.content_chars, args.repeat),
+            "text_processing": bench_text(args.repeat),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DeepSearchAgent 离线基准")
+    parser.add_argument("--paragraphs", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--results", type=int, default=20, help="每个段落的搜索结果数")
+    parser.add_argument("--content-chars", type=int, default=4000)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=2000)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", type=str, default="")
+    args = parser.parse_args()
+
+    results = run_all(args)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
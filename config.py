@@ -1,21 +1,93 @@
 import os
-from attrs import define
+from typing import Any
+from attrs import define, Factory
+
+_env_loaded = False
+
+
+def load_env():
+    """第一次需要环境变量时才读取.env，避免导入模块时的文件IO"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def env_default(name: str) -> Factory:
+    def factory():
+        load_env()
+        return os.getenv(name)
+    return Factory(factory)
+
 
 @define(auto_attribs=True, slots=True)
 class Config:
     llm_provider: str = "openai"
     openai_model: str = "gpt-5-mini"
-    openai_api_key: str = os.getenv("OPENAI_API_KEY")
-    openai_base_url: str = os.getenv("OPENAI_BASE_URL")
+    openai_api_key: str = env_default("OPENAI_API_KEY")
+    openai_base_url: str = env_default("OPENAI_BASE_URL")
+    # 逗号分隔的多个OpenAI兼容地址，llm_provider为router时在其间路由
+    openai_base_urls: str | None = env_default("OPENAI_BASE_URLS")
+    context_window: int = 128000
+    llm_max_retries: int = 3
+    llm_deadline: float | None = 120.0
+    llm_hedge_quantile: float | None = None
+    llm_requests_per_minute: float | None = None
+    llm_tokens_per_minute: float | None = None
+    # 设置后按AIMD自适应调整每个服务地址的并发，初始并发为该值；None表示不限制并发
+    llm_adaptive_concurrency: int | None = None
+    # 每个段落最多的反思轮次，新结果的信息增益低于reflection_min_gain时提前停止
+    reflection_max_rounds: int = 3
+    reflection_min_gain: float = 0.15
+    # 为True时search_history改用列式存储，搜索结果很多的长会话内存占用约为列表的四成
+    columnar_search_history: bool = False
+    # 搜索后端：tavily、local（SQLite FTS5本地语料，离线可用）或fake
+    search_backend: str = "tavily"
+    local_search_index: str | None = env_default("LOCAL_SEARCH_INDEX")
+    # 本地语料目录或JSONL文件，创建后端时增量导入
+    local_search_corpus: str | None = env_default("LOCAL_SEARCH_CORPUS")
 
     def get_llm_config(self) -> dict[str, str]:
         match self.llm_provider:
+            case "router":
+                urls = [url.strip() for url in (self.openai_base_urls or "").split(",") if url.strip()]
+                config = self._openai_config()
+                config["endpoints"] = [{"provider": "openai", "base_url": url} for url in urls]
+                return config
             case "openai":
+                return self._openai_config()
+            case _:
+                raise ValueError(f"未知的LLM提供商： {self.llm_provider}")
+
+    def get_search_config(self) -> dict[str, Any]:
+        match self.search_backend:
+            case "tavily" | "fake":
+                return {}
+            case "local":
                 return {
-                    "api_key": self.openai_api_key,
-                    "base_url": self.openai_base_url,
-                    "temperature": 0.7,
-                    "max_tokens": 4096
+                    "index_path": self.local_search_index or "local_search.db",
+                    "corpus": self.local_search_corpus
                 }
             case _:
-                raise ValueError(f"未知的LLM提供商： {self.llm_provider}")
+                raise ValueError(f"未知的搜索后端： {self.search_backend}")
+
+    def _openai_config(self) -> dict[str, str]:
+        return {
+            "api_key": self.openai_api_key,
+            "base_url": self.openai_base_url,
+            "temperature": 0.7,
+            "max_tokens": 4096,
+            "context_window": self.context_window,
+            "sdk_max_retries": 0,
+            "resilience": {
+                "max_retries": self.llm_max_retries,
+                "deadline": self.llm_deadline,
+                "hedge_quantile": self.llm_hedge_quantile
+            },
+            "rate_limit": {
+                "requests_per_minute": self.llm_requests_per_minute,
+                "tokens_per_minute": self.llm_tokens_per_minute,
+                "aimd": {"initial": self.llm_adaptive_concurrency} if self.llm_adaptive_concurrency else None
+            }
+        }
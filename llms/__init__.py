@@ -1,5 +1,22 @@
+import importlib
 from .base import BaseLLM
-from .factory import LLMFactory
-from .openai_llm import OpenAILLM
 
-__all__ = ["BaseLLM", "LLMFactory", "OpenAILLM"]
\ No newline at end of file
+# 具体实现按需导入：openai等SDK较重，只在第一次用到对应类时才加载
+_LAZY_EXPORTS = {
+    "CachedLLM": ".cache",
+    "LLMFactory": ".factory",
+    "OpenAILLM": ".openai_llm",
+    "RouterLLM": ".router",
+    "ResiliencePolicy": ".resilience",
+    "ResilientLLM": ".resilience"
+}
+
+__all__ = ["BaseLLM", "CachedLLM", "LLMFactory", "OpenAILLM", "ResiliencePolicy", "ResilientLLM", "RouterLLM"]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,17 @@
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
 from typing import Any,  Literal, TypedDict, Generator, AsyncGenerator
+from utils.metrics import instrument
+from utils.rate_limit import RateLimiter, AIMDConfig, get_rate_limiter
+from utils.text_processing import estimate_tokens
+
+INSTRUMENTED_LLM_METHODS = ("invoke", "ainvoke", "stream", "astream")
+
+_instrument_llm = instrument(
+    "llm_call",
+    "llm",
+    lambda llm, method: {"component": llm.__class__.__name__, "model": llm.model_name, "method": method}
+)
 
 class LLMMessage(TypedDict):
     role: Literal["system", "user", "assistant"]
@@ -13,6 +25,40 @@ class BaseLLM(ABC):
 
         self.api_key = config.get("api_key")
         self.base_url = config.get("base_url")
+        self.rate_limiter = self._get_rate_limiter(config)
+
+    def _get_rate_limiter(self, config: dict[str, Any]) -> RateLimiter | None:
+        # 同一服务地址的所有LLM实例共享一个限流器
+        # 未配置RPM/TPM预算或AIMD时不限流，不影响原有吞吐
+        options = {key: value for key, value in (config.get("rate_limit") or {}).items() if value is not None}
+        if not any(options.get(key) for key in ("requests_per_minute", "tokens_per_minute", "aimd")):
+            return None
+        name = options.pop("name", None) or f"llm:{self.base_url or self.__class__.__name__}"
+        aimd = options.pop("aimd", None)
+        return get_rate_limiter(name, aimd=AIMDConfig(**aimd) if aimd else None, **options)
+
+    def _rate_limit(self, messages: list[LLMMessage]):
+        """调用服务前的限流上下文，按提示词长度预留token"""
+        if self.rate_limiter is None:
+            return nullcontext()
+        return self.rate_limiter.limit(sum(estimate_tokens(m["content"]) for m in messages))
+
+    def _arate_limit(self, messages: list[LLMMessage]):
+        if self.rate_limiter is None:
+            return nullcontext()
+        return self.rate_limiter.alimit(sum(estimate_tokens(m["content"]) for m in messages))
+
+    def _charge_completion_tokens(self, completion_tokens: int | None):
+        if self.rate_limiter is not None and completion_tokens:
+            self.rate_limiter.charge_tokens(completion_tokens)
+
+    def __init_subclass__(cls, **kwargs):
+        # 子类实现的调用方法自动记录耗时、调用次数与trace span
+        super().__init_subclass__(**kwargs)
+        for name in INSTRUMENTED_LLM_METHODS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "__isabstractmethod__", False):
+                setattr(cls, name, _instrument_llm(method))
 
     @abstractmethod
     def invoke(self, messages: list[LLMMessage], **kwargs) -> str:
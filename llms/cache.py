@@ -0,0 +1,177 @@
+import json
+import time
+import hashlib
+from typing import Any, Generator, AsyncGenerator
+from attrs import define
+from utils.cache import CacheStats, LRUCache, SQLiteCache
+from .base import BaseLLM, LLMMessage
+
+
+def normalize_messages(messages: list[LLMMessage]) -> list[dict[str, str]]:
+    """统一换行符并去除首尾空白，使仅有格式差异的消息命中同一缓存"""
+    return [
+        {
+            "role": message["role"],
+            "content": (message.get("content") or "").replace("\r\n", "\n").strip()
+        }
+        for message in messages
+    ]
+
+
+def make_cache_key(model_name: str, messages: list[LLMMessage], params: dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"model": model_name, "messages": normalize_messages(messages), "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# 只有影响生成结果的参数进入缓存键，timeout等传输参数不参与
+SAMPLING_PARAMS = (
+    "temperature", "top_p", "max_tokens", "max_completion_tokens", "stop", "seed", "n",
+    "response_format", "presence_penalty", "frequency_penalty", "logit_bias",
+    "tools", "tool_choice", "reasoning_effort"
+)
+
+
+@define(auto_attribs=True, slots=True)
+class LLMCacheStats(CacheStats):
+    saved_seconds: float = 0.0
+    saved_chars: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        data = super().to_dict()
+        data["saved_seconds"] = self.saved_seconds
+        data["saved_chars"] = self.saved_chars
+        return data
+
+
+class CachedLLM(BaseLLM):
+    """为任意BaseLLM增加两级响应缓存：内存LRU在前，SQLite磁盘在后"""
+
+    def __init__(self,
+                 llm: BaseLLM,
+                 cache_path: str | None = None,
+                 memory_size: int = 256,
+                 ttl: float | None = None,
+                 max_disk_bytes: int | None = 256 * 1024 * 1024,
+                 stream_chunk_size: int = 32):
+        super().__init__(llm.model_name, llm.config)
+        self.llm = llm
+        self.ttl = ttl
+        self.stream_chunk_size = stream_chunk_size
+        self.memory = LRUCache(max_entries=memory_size, ttl=ttl)
+        self.disk = SQLiteCache(cache_path, ttl=ttl, max_bytes=max_disk_bytes) if cache_path else None
+        self.stats = LLMCacheStats()
+
+    def _sampling_params(self, **kwargs) -> dict[str, Any]:
+        params = {
+            "temperature": kwargs.get("temperature", self.config.get("temperature", 0.7)),
+            "max_tokens": kwargs.get("max_tokens", self.config.get("max_tokens", 4096)),
+        }
+        for key in SAMPLING_PARAMS:
+            if key in kwargs:
+                params.setdefault(key, kwargs[key])
+        return params
+
+    def cache_key(self, messages: list[LLMMessage], **kwargs) -> str:
+        return make_cache_key(self.model_name, messages, self._sampling_params(**kwargs))
+
+    def _lookup(self, key: str) -> dict[str, Any] | None:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.stats.memory_hits += 1
+        elif self.disk is not None:
+            stored = self.disk.get_entry(key)
+            if stored is not None:
+                raw, expires_at = stored
+                entry = json.loads(raw)
+                # 提升到内存时沿用磁盘条目的过期时间，不重新计时
+                if expires_at is None:
+                    self.memory.set(key, entry)
+                elif expires_at > time.time():
+                    self.memory.set(key, entry, ttl=expires_at - time.time())
+                self.stats.disk_hits += 1
+
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self.stats.saved_seconds += entry.get("latency", 0.0)
+        self.stats.saved_chars += len(entry.get("text", ""))
+        return entry
+
+    def _store(self, key: str, text: str, latency: float):
+        entry = {"text": text, "latency": latency, "model": self.model_name}
+        self.stats.evictions += self.memory.set(key, entry)
+        if self.disk is not None:
+            self.disk.set(key, json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+    def invoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        key = self.cache_key(messages, **kwargs)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry["text"]
+
+        start = time.perf_counter()
+        text = self.llm.invoke(messages, **kwargs)
+        self._store(key, text, time.perf_counter() - start)
+        return text
+
+    async def ainvoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        key = self.cache_key(messages, **kwargs)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry["text"]
+
+        start = time.perf_counter()
+        text = await self.llm.ainvoke(messages, **kwargs)
+        self._store(key, text, time.perf_counter() - start)
+        return text
+
+    def _replay(self, text: str) -> Generator[str, Any, Any]:
+        size = max(self.stream_chunk_size, 1)
+        for i in range(0, len(text), size):
+            yield text[i:i + size]
+
+    def stream(self, messages: list[LLMMessage], **kwargs) -> Generator[str, Any, Any]:
+        key = self.cache_key(messages, **kwargs)
+        entry = self._lookup(key)
+        if entry is not None:
+            yield from self._replay(entry["text"])
+            return
+
+        start = time.perf_counter()
+        chunks = []
+        for chunk in self.llm.stream(messages, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # 只缓存完整结束的流，中途被关闭的流会在yield处抛出GeneratorExit
+        self._store(key, self.validate_response("".join(chunks)), time.perf_counter() - start)
+
+    async def astream(self, messages: list[LLMMessage], **kwargs) -> AsyncGenerator[str, Any]:
+        key = self.cache_key(messages, **kwargs)
+        entry = self._lookup(key)
+        if entry is not None:
+            for chunk in self._replay(entry["text"]):
+                yield chunk
+            return
+
+        start = time.perf_counter()
+        chunks = []
+        async for chunk in self.llm.astream(messages, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self._store(key, self.validate_response("".join(chunks)), time.perf_counter() - start)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def get_model_info(self) -> dict[str, Any]:
+        info = self.llm.get_model_info()
+        info["cache"] = self.stats.to_dict()
+        return info
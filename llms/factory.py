@@ -1,26 +1,65 @@
+import importlib
 from typing import Any, Type
 from .base import BaseLLM
 
 class LLMFactory:
 
     _register: dict[str, Type[BaseLLM]] = {}
+    # 内置后端按需导入，避免未使用的SDK在导入时加载
+    _builtin: dict[str, str] = {
+        "openai": "llms.openai_llm:OpenAILLM",
+        "fake": "llms.fake_llm:FakeLLM"
+    }
 
     @classmethod
     def register(cls, name: str, llm_class: Type[BaseLLM]) -> None:
         cls._register[name.lower()] = llm_class
 
+    @classmethod
+    def get_class(cls, provider: str) -> Type[BaseLLM]:
+        provider = provider.lower()
+        if provider not in cls._register:
+            if provider not in cls._builtin:
+                raise ValueError(f"未知的 LLM 提供商：{provider}")
+            module_name, class_name = cls._builtin[provider].split(":")
+            cls._register[provider] = getattr(importlib.import_module(module_name), class_name)
+        return cls._register[provider]
+
+    @staticmethod
+    def _apply_resilience(llm: BaseLLM, config: dict[str, Any]) -> BaseLLM:
+        # config中带有resilience配置时包装重试、截止时间与对冲
+        if not config.get("resilience"):
+            return llm
+        from .resilience import ResiliencePolicy, ResilientLLM
+        return ResilientLLM(llm, ResiliencePolicy(**config["resilience"]))
+
     @classmethod
     def create(cls, provider: str, model_name: str, config: dict[str, Any]):
         provider = provider.lower()
+        if provider == "router":
+            return cls._apply_resilience(cls.create_router(model_name, config), config)
+        llm_class = cls.get_class(provider)
+        return cls._apply_resilience(llm_class(model_name, config), config)
 
-        match provider:
-            case "openai":
-                from .openai_llm import OpenAILLM
-                return OpenAILLM(model_name, config)
-        #后续增加
-            case _:
-                raise ValueError(f"未知的 LLM 提供商：{provider}")
+    @classmethod
+    def create_router(cls, model_name: str, config: dict[str, Any]) -> BaseLLM:
+        """按config["endpoints"]构建路由LLM
 
-        llm_class = cls._regiter[provider]
-        return llm_class(model_name, config)
+        每个端点是一个dict，可覆盖 provider / model_name / name 以及 base_url、api_key 等配置项，
+        未覆盖的配置沿用外层config。重试由路由外层统一处理，端点本身不再包装。
+        """
+        from .router import RouterLLM
 
+        endpoints = config.get("endpoints") or []
+        if not endpoints:
+            raise ValueError("router 需要在config中提供endpoints")
+        shared = {k: v for k, v in config.items() if k not in ("endpoints", "resilience", "router")}
+        llms, names = [], []
+        for i, endpoint in enumerate(endpoints):
+            endpoint = dict(endpoint)
+            provider = endpoint.pop("provider", "openai")
+            endpoint_model = endpoint.pop("model_name", model_name)
+            name = endpoint.pop("name", None) or f"{provider}:{endpoint.get('base_url') or endpoint_model}#{i}"
+            llms.append(cls.get_class(provider)(endpoint_model, {**shared, **endpoint}))
+            names.append(name)
+        return RouterLLM(llms, names=names, **config.get("router", {}))
@@ -0,0 +1,134 @@
+import json
+import time
+import random
+import asyncio
+from typing import Any, Callable, Generator, AsyncGenerator
+import prompts
+from utils.metrics import record_token_usage
+from utils.text_processing import estimate_tokens
+from .base import BaseLLM, LLMMessage
+
+
+class FakeLLMError(RuntimeError):
+    # 模拟服务端的临时故障，按503处理，可重试与切换端点
+    status_code = 503
+
+
+def _load_user_input(messages: list[LLMMessage]) -> Any:
+    content = messages[-1]["content"] if messages else ""
+    try:
+        return json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return {"title": content, "content": content}
+
+
+def default_responder(messages: list[LLMMessage]) -> str:
+    """按系统提示词返回符合对应输出schema的确定性响应"""
+    system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+    data = _load_user_input(messages)
+    title = data.get("title", "") if isinstance(data, dict) else ""
+
+    if system in (prompts.SYSTEM_PROMPT_FIRST_SEARCH, prompts.SYSTEM_PROMPT_REFLECTION):
+        return json.dumps({
+            "search_query": f"{title} 最新进展",
+            "reasoning": f"需要补充关于{title}的数据与权威来源"
+        }, ensure_ascii=False)
+    if system in (prompts.SYSTEM_PROMPT_FIRST_SUMMARY, prompts.SYSTEM_PROMPT_REFLECTION_SUMMARY):
+        results = data.get("search_results", []) if isinstance(data, dict) else []
+        previous = data.get("paragraph_latest_state", "") if isinstance(data, dict) else ""
+        digest = " ".join(str(r)[:80] for r in results)
+        summary = f"{previous}\n{title}：{digest}".strip()
+        key = "paragraph_latest" if system == prompts.SYSTEM_PROMPT_FIRST_SUMMARY else "updated_paragraph_latest_state"
+        return json.dumps({key: summary}, ensure_ascii=False)
+    if system == prompts.SYSTEM_PROMPT_SUMMARY_COMPRESSION:
+        state = data.get("paragraph_latest_state", "") if isinstance(data, dict) else ""
+        max_length = data.get("max_length", len(state)) if isinstance(data, dict) else len(state)
+        return json.dumps({"compressed_paragraph_state": state[:max_length]}, ensure_ascii=False)
+    if system == prompts.SYSTEM_PROMPT_REPORT_STRUCTURE:
+        query = messages[-1]["content"]
+        return json.dumps([
+            {"title": f"{query}：{section}", "content": f"{section}相关内容"}
+            for section in ("背景", "现状", "影响", "展望", "结论")
+        ], ensure_ascii=False)
+    if system == prompts.SYSTEM_PROMPT_SECTION_FORMATTING:
+        return f"## {title}\n\n{data.get('paragraph_latest_state', '') if isinstance(data, dict) else ''}"
+    if system == prompts.SYSTEM_PROMPT_REPORT_FORMATTING:
+        paragraphs = data if isinstance(data, list) else [data]
+        return "\n\n".join(
+            f"## {p.get('title', '')}\n\n{p.get('paragraph_latest_state', '')}" for p in paragraphs
+        )
+    if system == prompts.SYSTEM_PROMPT_REPORT_CONCLUSION:
+        paragraphs = data if isinstance(data, list) else [data]
+        return "## 结论\n\n" + "；".join(p.get("title", "") for p in paragraphs)
+    return messages[-1]["content"] if messages else ""
+
+
+class FakeLLM(BaseLLM):
+    """离线确定性LLM，用于测试与基准：可配置首字延迟、输出速率与失败率"""
+
+    def __init__(self,
+                 model_name: str = "fake-llm",
+                 config: dict[str, Any] | None = None,
+                 latency: float = 0.0,
+                 tokens_per_second: float | None = None,
+                 failure_rate: float = 0.0,
+                 seed: int = 0,
+                 responder: Callable[[list[LLMMessage]], str] = default_responder):
+        super().__init__(model_name, config or {"temperature": 0.7, "max_tokens": 4096})
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.responder = responder
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _prepare(self, messages: list[LLMMessage]) -> tuple[str, float]:
+        self.calls += 1
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            self.failures += 1
+            raise FakeLLMError("模拟的LLM调用失败")
+        text = self.responder(messages)
+        completion_tokens = estimate_tokens(text)
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        record_token_usage(self.model_name, prompt_tokens, completion_tokens)
+        self._charge_completion_tokens(completion_tokens)
+        generation_time = completion_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        return text, generation_time
+
+    def _chunks(self, text: str, size: int = 16) -> list[str]:
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def invoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        with self._rate_limit(messages):
+            text, generation_time = self._prepare(messages)
+            time.sleep(self.latency + generation_time)
+        return self.validate_response(text)
+
+    async def ainvoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        async with self._arate_limit(messages):
+            text, generation_time = self._prepare(messages)
+            await asyncio.sleep(self.latency + generation_time)
+        return self.validate_response(text)
+
+    def stream(self, messages: list[LLMMessage], **kwargs) -> Generator[str, Any, Any]:
+        with self._rate_limit(messages):
+            text, generation_time = self._prepare(messages)
+            chunks = self._chunks(text)
+            time.sleep(self.latency)
+            for chunk in chunks:
+                time.sleep(generation_time / len(chunks))
+                yield chunk
+
+    async def astream(self, messages: list[LLMMessage], **kwargs) -> AsyncGenerator[str, Any]:
+        async with self._arate_limit(messages):
+            text, generation_time = self._prepare(messages)
+            chunks = self._chunks(text)
+            await asyncio.sleep(self.latency)
+            for chunk in chunks:
+                await asyncio.sleep(generation_time / len(chunks))
+                yield chunk
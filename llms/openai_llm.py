@@ -1,5 +1,5 @@
-from openai import OpenAI, AsyncOpenAI
 from typing import Any, Generator, AsyncGenerator
+from utils.metrics import record_usage_from_response
 from .base import BaseLLM, LLMMessage
 
 class OpenAILLM(BaseLLM):
@@ -12,28 +12,63 @@ class OpenAILLM(BaseLLM):
         if not self.base_url:
             raise ValueError("OpenAI Base Url 未设置，请在config提供")
 
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
-            )
-
-        self.async_client = AsyncOpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url)
+        self._client = None
+        self._async_client = None
+
+    # openai SDK导入较慢，客户端在第一次调用时才创建
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(**self._client_options())
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(**self._client_options())
+        return self._async_client
+
+    def _client_options(self) -> dict[str, Any]:
+        return {
+            "api_key": self.api_key,
+            "base_url": self.base_url,
+            # 由ResilientLLM统一重试时应将SDK内置重试设为0，避免重试次数叠加
+            "max_retries": self.config.get("sdk_max_retries", 2)
+        }
 
     def _build_params(self, messages,  **kwargs) -> dict[str, Any]:
-        return {
+        params = {
             "model": self.model_name,
             "messages": messages,
             "temperature": kwargs.get("temperature", self.config.get("temperature", 0.7)),
             "max_tokens": kwargs.get("max_tokens", self.config.get("max_tokens", 4096)),
         }
+        # 单次请求超时（秒），由调用方的截止时间推算
+        if kwargs.get("timeout") is not None:
+            params["timeout"] = kwargs["timeout"]
+        return params
+
+    def _build_stream_params(self, messages, **kwargs) -> dict[str, Any]:
+        # 流式响应默认不带usage，需显式请求在最后一个chunk中返回
+        params = self._build_params(messages, **kwargs)
+        params["stream_options"] = {"include_usage": True}
+        return params
+
 
+    def _record_usage(self, response: Any):
+        record_usage_from_response(self.model_name, response)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self._charge_completion_tokens(getattr(usage, "completion_tokens", 0))
 
     def invoke(self, messages: list[LLMMessage], **kwargs) ->  str:
 
         try:
-            response = self.client.chat.completions.create(**self._build_params(messages, **kwargs))
+            with self._rate_limit(messages):
+                response = self.client.chat.completions.create(**self._build_params(messages, **kwargs))
+                self._record_usage(response)
 
             content = response.choices[0].message.content if response.choices else ""
 
@@ -45,7 +80,9 @@ class OpenAILLM(BaseLLM):
 
     async def ainvoke(self, messages: list[LLMMessage], **kwargs) ->  str:
         try:
-            response = await self.async_client.chat.completions.create(**self._build_params(messages, **kwargs))
+            async with self._arate_limit(messages):
+                response = await self.async_client.chat.completions.create(**self._build_params(messages, **kwargs))
+                self._record_usage(response)
 
             content = response.choices[0].message.content if response.choices else ""
 
@@ -57,24 +94,32 @@ class OpenAILLM(BaseLLM):
 
     def stream(self, messages: list[LLMMessage], **kwargs) -> Generator[str, Any, Any]:
         try:
-            with self.client.chat.completions.stream(**self._build_params(messages, **kwargs)) as stream:
+            with self._rate_limit(messages), \
+                    self.client.chat.completions.stream(**self._build_stream_params(messages, **kwargs)) as stream:
                 for event in stream:
-                    if getattr(event, "type", None) == "content.delta":
+                    event_type = getattr(event, "type", None)
+                    if event_type == "content.delta":
                         chunk = event.delta
                         if chunk:
                             yield chunk
+                    elif event_type == "chunk":
+                        self._record_usage(event.chunk)
         except Exception as e:
             print(f"[OpenAILLM] 同步流式调用错误：{e}")
             raise
 
     async def astream(self, messages: list[LLMMessage], **kwargs) -> AsyncGenerator[str, Any]:
         try:
-            async with self.async_client.chat.completions.stream(**self._build_params(messages, **kwargs)) as stream:
+            async with self._arate_limit(messages), \
+                    self.async_client.chat.completions.stream(**self._build_stream_params(messages, **kwargs)) as stream:
                 async for event in stream:
-                    if getattr(event, "type", None) == "content.delta":
+                    event_type = getattr(event, "type", None)
+                    if event_type == "content.delta":
                         chunk = event.delta
                         if chunk:
                             yield chunk
+                    elif event_type == "chunk":
+                        self._record_usage(event.chunk)
         except Exception as e:
             print(f"[OpenAILLM] 异步流式调用错误：{e}")
             raise
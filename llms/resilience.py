@@ -0,0 +1,273 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Generator, AsyncGenerator
+from attrs import define
+from utils.metrics import get_registry
+from .base import BaseLLM, LLMMessage
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError"}
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """超时、连接错误、429与5xx可重试，参数错误与鉴权失败等不重试"""
+    if isinstance(error, LLMDeadlineExceeded):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    status = getattr(error, "status_code", None)
+    return status in RETRYABLE_STATUS_CODES or (isinstance(status, int) and status >= 500)
+
+
+@define(auto_attribs=True, slots=True)
+class ResiliencePolicy:
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    # 单次调用（含所有重试与对冲）的总截止时间，None表示不限制
+    deadline: float | None = 120.0
+    # 延迟超过该分位数时发出对冲请求，None表示不对冲
+    hedge_quantile: float | None = None
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 1.0
+    latency_window: int = 200
+    retryable: Callable[[BaseException], bool] = is_retryable_error
+
+    def backoff(self, attempt: int, rng: random.Random) -> float:
+        """指数退避 + full jitter"""
+        return rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """最近若干次成功调用的延迟，用于计算对冲阈值"""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+class ResilientLLM(BaseLLM):
+    """为任意BaseLLM增加重试、总截止时间与对冲请求"""
+
+    def __init__(self, llm: BaseLLM, policy: ResiliencePolicy | None = None, seed: int | None = None):
+        super().__init__(llm.model_name, llm.config)
+        self.llm = llm
+        self.policy = policy or ResiliencePolicy()
+        self.latency = LatencyTracker(self.policy.latency_window)
+        self._rng = random.Random(seed)
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _labels(self) -> dict[str, str]:
+        return {"component": self.llm.__class__.__name__, "model": self.model_name}
+
+    def _hedge_delay(self) -> float | None:
+        policy = self.policy
+        if policy.hedge_quantile is None or len(self.latency) < policy.hedge_min_samples:
+            return None
+        return max(self.latency.quantile(policy.hedge_quantile), policy.hedge_min_delay)
+
+    def _remaining(self, started: float) -> float | None:
+        if self.policy.deadline is None:
+            return None
+        remaining = self.policy.deadline - (time.perf_counter() - started)
+        if remaining <= 0:
+            get_registry().inc("llm_deadline_exceeded_total", **self._labels())
+            raise LLMDeadlineExceeded(f"LLM调用超过截止时间 {self.policy.deadline}s")
+        return remaining
+
+    def _should_retry(self, error: BaseException, attempt: int, started: float) -> float | None:
+        """返回重试前的等待时间，不应重试时返回None"""
+        if attempt >= self.policy.max_retries or not self.policy.retryable(error):
+            return None
+        delay = self.policy.backoff(attempt, self._rng)
+        remaining = self._remaining(started)
+        if remaining is not None and delay >= remaining:
+            return None
+        get_registry().inc("llm_retries_total", reason=type(error).__name__, **self._labels())
+        print(f"[ResilientLLM] 第{attempt + 1}次重试（{delay:.2f}s后）: {str(error)}")
+        return delay
+
+    @staticmethod
+    def _with_timeout(kwargs: dict[str, Any], remaining: float | None) -> dict[str, Any]:
+        if remaining is None:
+            return kwargs
+        return {**kwargs, "timeout": min(kwargs.get("timeout", remaining), remaining)}
+
+    # 同步调用
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+        return self._executor
+
+    def _invoke_once(self, messages: list[LLMMessage], remaining: float | None, **kwargs) -> str:
+        hedge_delay = self._hedge_delay()
+        call = lambda: self._timed_invoke(messages, **self._with_timeout(kwargs, remaining))
+        if hedge_delay is None or (remaining is not None and hedge_delay >= remaining):
+            return call()
+
+        # 截止时间只计算一次，首个请求失败后继续等待也不会超出整体预算
+        deadline = None if remaining is None else time.perf_counter() + remaining
+        executor = self._get_executor()
+        futures = {executor.submit(call)}
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            get_registry().inc("llm_hedges_total", **self._labels())
+            futures.add(executor.submit(call))
+        pending = futures
+        error: BaseException | None = None
+        while pending:
+            budget = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            done, pending = wait(pending, timeout=budget, return_when=FIRST_COMPLETED)
+            if not done:
+                raise LLMDeadlineExceeded(f"LLM调用超过截止时间 {self.policy.deadline}s")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _timed_invoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        start = time.perf_counter()
+        result = self.llm.invoke(messages, **kwargs)
+        self.latency.add(time.perf_counter() - start)
+        return result
+
+    def invoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            remaining = self._remaining(started)
+            try:
+                return self._invoke_once(messages, remaining, **kwargs)
+            except Exception as e:
+                delay = self._should_retry(e, attempt, started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    # 异步调用
+    async def _timed_ainvoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        start = time.perf_counter()
+        result = await self.llm.ainvoke(messages, **kwargs)
+        self.latency.add(time.perf_counter() - start)
+        return result
+
+    async def _ainvoke_once(self, messages: list[LLMMessage], **kwargs) -> str:
+        hedge_delay = self._hedge_delay()
+        primary = asyncio.create_task(self._timed_ainvoke(messages, **kwargs))
+        if hedge_delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                get_registry().inc("llm_hedges_total", **self._labels())
+                tasks.add(asyncio.create_task(self._timed_ainvoke(messages, **kwargs)))
+            error: BaseException | None = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            get_registry().inc("llm_hedge_wins_total", **self._labels())
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def ainvoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            remaining = self._remaining(started)
+            try:
+                return await asyncio.wait_for(self._ainvoke_once(messages, **kwargs), timeout=remaining)
+            except TimeoutError as e:
+                if self.policy.deadline is not None and time.perf_counter() - started >= self.policy.deadline:
+                    get_registry().inc("llm_deadline_exceeded_total", **self._labels())
+                    raise LLMDeadlineExceeded(f"LLM调用超过截止时间 {self.policy.deadline}s") from e
+                delay = self._should_retry(e, attempt, started)
+                if delay is None:
+                    raise
+            except Exception as e:
+                delay = self._should_retry(e, attempt, started)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    # 流式调用：只在尚未输出任何内容时重试，不做对冲
+    def stream(self, messages: list[LLMMessage], **kwargs) -> Generator[str, Any, Any]:
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            remaining = self._remaining(started)
+            emitted = False
+            try:
+                for chunk in self.llm.stream(messages, **self._with_timeout(kwargs, remaining)):
+                    emitted = True
+                    yield chunk
+                return
+            except Exception as e:
+                delay = None if emitted else self._should_retry(e, attempt, started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    async def astream(self, messages: list[LLMMessage], **kwargs) -> AsyncGenerator[str, Any]:
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            remaining = self._remaining(started)
+            emitted = False
+            try:
+                async for chunk in self.llm.astream(messages, **self._with_timeout(kwargs, remaining)):
+                    emitted = True
+                    yield chunk
+                return
+            except Exception as e:
+                delay = None if emitted else self._should_retry(e, attempt, started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def get_model_info(self) -> dict[str, Any]:
+        info = self.llm.get_model_info()
+        info["resilience"] = {
+            "max_retries": self.policy.max_retries,
+            "deadline": self.policy.deadline,
+            "hedge_quantile": self.policy.hedge_quantile,
+            "hedge_delay": self._hedge_delay()
+        }
+        return info
@@ -0,0 +1,233 @@
+import time
+import random
+import threading
+from typing import Any, Generator, AsyncGenerator
+from attrs import define
+from utils.metrics import get_registry
+from .base import BaseLLM, LLMMessage
+from .resilience import is_retryable_error
+
+
+@define(auto_attribs=True, slots=True)
+class EndpointHealth:
+    name: str
+    calls: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    in_flight: int = 0
+    latency_ewma: float | None = None
+    error_ewma: float = 0.0
+    ejected_until: float = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def score(self, default_latency: float) -> float:
+        """越小越好：延迟随排队数放大，错误率越高惩罚越大"""
+        latency = self.latency_ewma if self.latency_ewma is not None else default_latency
+        return latency * (1 + self.in_flight) / max(1.0 - self.error_ewma, 0.05)
+
+    def to_dict(self, now: float) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "in_flight": self.in_flight,
+            "latency_ewma": self.latency_ewma,
+            "error_rate": self.error_ewma,
+            "healthy": self.is_available(now),
+            "ejected_for": max(self.ejected_until - now, 0.0)
+        }
+
+
+class RouterLLM(BaseLLM):
+    """在多个LLM后端之间按观测到的延迟与错误率路由，端点故障时自动切换"""
+
+    def __init__(self,
+                 endpoints: list[BaseLLM],
+                 names: list[str] | None = None,
+                 alpha: float = 0.2,
+                 failure_threshold: int = 3,
+                 eject_seconds: float = 30.0,
+                 seed: int | None = None):
+        if not endpoints:
+            raise ValueError("RouterLLM 至少需要一个端点")
+        super().__init__(endpoints[0].model_name, endpoints[0].config)
+        names = names or [f"{llm.base_url or llm.__class__.__name__}#{i}" for i, llm in enumerate(endpoints)]
+        self.endpoints = endpoints
+        self.health = [EndpointHealth(name=name) for name in names]
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _default_latency(self) -> float:
+        known = [h.latency_ewma for h in self.health if h.latency_ewma is not None]
+        # 没有观测数据的端点按已知最快的端点估计，保证新端点也能被探测到
+        return min(known) if known else 1.0
+
+    def _plan(self) -> list[int]:
+        """返回本次调用尝试端点的顺序：两次随机选择取较优者在前，其余按得分，被摘除的端点放最后兜底"""
+        with self._lock:
+            now = time.monotonic()
+            default = self._default_latency()
+            available = [i for i, h in enumerate(self.health) if h.is_available(now)]
+            ejected = sorted(
+                (i for i, h in enumerate(self.health) if not h.is_available(now)),
+                key=lambda i: self.health[i].ejected_until
+            )
+            order = sorted(available, key=lambda i: self.health[i].score(default))
+            if len(available) >= 2:
+                a, b = self._rng.sample(available, 2)
+                first = min(a, b, key=lambda i: self.health[i].score(default))
+                order.remove(first)
+                order.insert(0, first)
+            return order + ejected
+
+    def _start(self, index: int) -> float:
+        with self._lock:
+            self.health[index].in_flight += 1
+        return time.perf_counter()
+
+    def _release(self, index: int):
+        with self._lock:
+            self.health[index].in_flight -= 1
+
+    def _finish(self, index: int, start: float, error: BaseException | None):
+        if error is not None and not is_retryable_error(error):
+            # 参数错误、上下文超长等是请求本身的问题，不计入端点健康状况
+            self._release(index)
+            return
+        latency = time.perf_counter() - start
+        health = self.health[index]
+        with self._lock:
+            health.in_flight -= 1
+            health.calls += 1
+            health.error_ewma = (1 - self.alpha) * health.error_ewma + self.alpha * (error is not None)
+            if error is None:
+                health.consecutive_failures = 0
+                health.ejected_until = 0.0
+                health.latency_ewma = latency if health.latency_ewma is None \
+                    else (1 - self.alpha) * health.latency_ewma + self.alpha * latency
+                return
+            health.failures += 1
+            health.consecutive_failures += 1
+            if health.consecutive_failures >= self.failure_threshold:
+                # 摘除一段时间，到期后重新参与路由（半开探测）
+                health.ejected_until = time.monotonic() + self.eject_seconds
+        get_registry().inc("llm_endpoint_failures_total", endpoint=health.name, reason=type(error).__name__)
+
+    def _failover(self, index: int, error: BaseException, remaining: int) -> bool:
+        """返回是否切换到下一个端点；不可重试的错误在其他端点上同样会失败，直接抛出"""
+        name = self.health[index].name
+        if not is_retryable_error(error):
+            print(f"[RouterLLM] 端点 {name} 返回不可重试的错误: {str(error)}")
+            return False
+        print(f"[RouterLLM] 端点 {name} 调用失败: {str(error)}" + ("，切换到下一个端点" if remaining else ""))
+        if remaining:
+            get_registry().inc("llm_failovers_total", endpoint=name)
+        return bool(remaining)
+
+    # 取消（截止时间、对冲落败）等非Exception的退出只释放并发计数，不计分
+    def invoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        plan = self._plan()
+        for n, index in enumerate(plan):
+            start = self._start(index)
+            finished = False
+            try:
+                result = self.endpoints[index].invoke(messages, **kwargs)
+                finished = True
+                self._finish(index, start, None)
+                return result
+            except Exception as e:
+                finished = True
+                self._finish(index, start, e)
+                if not self._failover(index, e, len(plan) - n - 1):
+                    raise
+            finally:
+                if not finished:
+                    self._release(index)
+
+    async def ainvoke(self, messages: list[LLMMessage], **kwargs) -> str:
+        plan = self._plan()
+        for n, index in enumerate(plan):
+            start = self._start(index)
+            finished = False
+            try:
+                result = await self.endpoints[index].ainvoke(messages, **kwargs)
+                finished = True
+                self._finish(index, start, None)
+                return result
+            except Exception as e:
+                finished = True
+                self._finish(index, start, e)
+                if not self._failover(index, e, len(plan) - n - 1):
+                    raise
+            finally:
+                if not finished:
+                    self._release(index)
+
+    # 流式调用以首个chunk的延迟计分，已输出内容后出错不再切换端点
+    def stream(self, messages: list[LLMMessage], **kwargs) -> Generator[str, Any, Any]:
+        plan = self._plan()
+        for n, index in enumerate(plan):
+            start = self._start(index)
+            finished = False
+            try:
+                for chunk in self.endpoints[index].stream(messages, **kwargs):
+                    if not finished:
+                        finished = True
+                        self._finish(index, start, None)
+                    yield chunk
+                if not finished:
+                    finished = True
+                    self._finish(index, start, None)
+                return
+            except Exception as e:
+                if finished:
+                    raise
+                finished = True
+                self._finish(index, start, e)
+                if not self._failover(index, e, len(plan) - n - 1):
+                    raise
+            finally:
+                if not finished:
+                    self._release(index)
+
+    async def astream(self, messages: list[LLMMessage], **kwargs) -> AsyncGenerator[str, Any]:
+        plan = self._plan()
+        for n, index in enumerate(plan):
+            start = self._start(index)
+            finished = False
+            try:
+                async for chunk in self.endpoints[index].astream(messages, **kwargs):
+                    if not finished:
+                        finished = True
+                        self._finish(index, start, None)
+                    yield chunk
+                if not finished:
+                    finished = True
+                    self._finish(index, start, None)
+                return
+            except Exception as e:
+                if finished:
+                    raise
+                finished = True
+                self._finish(index, start, e)
+                if not self._failover(index, e, len(plan) - n - 1):
+                    raise
+            finally:
+                if not finished:
+                    self._release(index)
+
+    def health_stats(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [health.to_dict(now) for health in self.health]
+
+    def get_model_info(self) -> dict[str, Any]:
+        info = super().get_model_info()
+        info["endpoints"] = self.health_stats()
+        return info
@@ -1,5 +1,47 @@
-def main():
-    print("Hello from deepsearchagent!")
+import json
+import argparse
+import functools
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="批量运行深度研究查询，可中断后重新运行以继续")
+    parser.add_argument("input", help="查询JSONL文件，每行 {\"id\": ..., \"query\": ...}")
+    parser.add_argument("--output-dir", default="runs", help="保存State、日志与报告的目录")
+    parser.add_argument("--results", default=None, help="结果JSONL路径，默认为 <output-dir>/results.jsonl")
+    parser.add_argument("--concurrency", type=int, default=2, help="每个进程内同时运行的查询数")
+    parser.add_argument("--paragraph-concurrency", type=int, default=4, help="每个查询内同时研究的段落数")
+    parser.add_argument("--workers", type=int, default=0, help="工作进程数，0表示在当前进程运行")
+    parser.add_argument("--stream-reports", action="store_true", help="段落完成后即格式化并写出对应章节")
+    parser.add_argument("--fake", action="store_true", help="使用离线的FakeLLM与FakeSearch（冒烟测试）")
+    parser.add_argument("--search-backend", choices=("tavily", "local", "fake"), default=None,
+                        help="搜索后端，默认按Config；local使用LOCAL_SEARCH_INDEX与LOCAL_SEARCH_CORPUS指定的本地语料")
+    parser.add_argument("--columnar-history", action="store_true", default=None,
+                        help="search_history使用列式存储，降低长会话的内存占用；默认按Config")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    # 研究流程在解析完参数后才导入，--help等不需要加载asyncio与各SDK
+    from agent.batch import run_batch
+    from agent.pipeline import build_default_pipeline
+    args = parse_args(argv)
+    pipeline_factory = functools.partial(
+        build_default_pipeline,
+        fake=args.fake,
+        search_backend=args.search_backend,
+        columnar_history=args.columnar_history,
+        max_concurrency=args.paragraph_concurrency
+    )
+    summary = run_batch(
+        args.input,
+        args.output_dir,
+        pipeline_factory,
+        results_path=args.results,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        stream_reports=args.stream_reports
+    )
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
 
 
 if __name__ == "__main__":
@@ -2,16 +2,37 @@ from abc import ABC, abstractmethod
 from typing import Any
 from llms.base import BaseLLM
 from state.state import State
+from utils.metrics import instrument
+
+INSTRUMENTED_NODE_METHODS = ("run", "arun", "run_streaming", "arun_streaming")
+
+_instrument_node = instrument(
+    "node_run",
+    "node",
+    lambda node, method: {"component": node.node_name, "method": method}
+)
 
 class BaseNode(ABC):
     def __init__(self, llm_client: BaseLLM, node_name: str = ""):
         self.llm_client = llm_client
         self.node_name = node_name or self.__class__.__name__
 
+    def __init_subclass__(cls, **kwargs):
+        # 子类定义的执行方法自动记录耗时、调用次数与trace span
+        super().__init_subclass__(**kwargs)
+        for name in INSTRUMENTED_NODE_METHODS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "__isabstractmethod__", False):
+                setattr(cls, name, _instrument_node(method))
+
     @abstractmethod
     def run(self, input_data: Any, **kwargs) -> Any:
         pass
 
+    async def arun(self, input_data: Any, **kwargs) -> Any:
+        """异步执行，默认将同步run放入线程中执行，子类可基于ainvoke重写"""
+        import asyncio
+        return await asyncio.to_thread(self.run, input_data, **kwargs)
 
     def validate_input(self, input_data: Any) -> bool:
         return True
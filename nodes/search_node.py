@@ -1,18 +1,20 @@
 import json
-from typing import Any
+from typing import Any, AsyncGenerator, Generator
 from json.decoder import JSONDecodeError
 from nodes.base_node import BaseNode
 
-from prompts import SYSTEM_PROMPT_FIRST_SEARCH, SYSTEM_PROMPT_REFLECTION
+import prompts
 from utils.text_processing import (
     remove_reasoning_from_output,
     clean_code_block_tags,
     extract_json_from_text
 )
+from utils.stream_json import StreamingJSONParser
+from utils.metrics import record_fallback
 
 class FirstSearchNode(BaseNode):
     def __init__(self, llm_client, node_name = ""):
-        super().__init__(llm_client, "FirstSearchNode")
+        super().__init__(llm_client, node_name or "FirstSearchNode")
 
     def validate_input(self, input_data: Any) -> bool:
         if isinstance(input_data, str):
@@ -28,22 +30,24 @@ class FirstSearchNode(BaseNode):
     def before_run(self, input_data: Any):
         self.log_info("开始进行首次查询")
 
+    def _build_messages(self, input_data: Any) -> list[dict[str, str]]:
+        if not self.validate_input(input_data):
+            raise ValueError("输入格式错误，需要包含title和content字段")
+
+        if isinstance(input_data, dict):
+            message = json.dumps(input_data, ensure_ascii=False)
+        else:
+            message = input_data
+
+        return [
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_FIRST_SEARCH},
+            {"role": "user", "content": message}
+            ]
+
     def run(self, input_data: Any, **kwargs) -> dict[str, Any]:
         self.before_run(input_data)
         try:
-            if not self.validate_input(input_data):
-                raise ValueError("输入格式错误，需要包含title和content字段")
-
-            if isinstance(input_data, dict):
-                message = json.dumps(input_data, ensure_ascii=False)
-            else:
-                message = input_data
-
-            response =self.llm_client.invoke(
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT_FIRST_SEARCH},
-                    {"role": "user", "content": message}
-                    ])
+            response =self.llm_client.invoke(messages=self._build_messages(input_data))
             result = self.process_output(response)
             self.after_run(result)
             return result
@@ -52,6 +56,80 @@ class FirstSearchNode(BaseNode):
             self.log_error(f"生成首次搜索查询失败: {str(e)}")
             raise e
 
+    async def arun(self, input_data: Any, **kwargs) -> dict[str, Any]:
+        self.before_run(input_data)
+        try:
+            response = await self.llm_client.ainvoke(messages=self._build_messages(input_data))
+            result = self.process_output(response)
+            self.after_run(result)
+            return result
+
+        except Exception as e:
+            self.log_error(f"生成首次搜索查询失败: {str(e)}")
+            raise e
+
+    def stream_fields(self, input_data: Any, stop_early: bool = True) -> Generator[tuple[str, Any], Any, Any]:
+        """基于stream逐个产出已完成的JSON字段；stop_early时拿到search_query即关闭流"""
+        parser = StreamingJSONParser(required_fields=("search_query",))
+        stream = self.llm_client.stream(messages=self._build_messages(input_data))
+        try:
+            for chunk in stream:
+                yield from parser.feed(chunk)
+                if stop_early and parser.has_required:
+                    break
+        finally:
+            stream.close()
+        if not parser.has_required:
+            # 流结束仍未解析出字段时，按完整输出走常规解析
+            yield ("_raw", parser.text)
+
+    async def astream_fields(self, input_data: Any, stop_early: bool = True) -> AsyncGenerator[tuple[str, Any], Any]:
+        """stream_fields的异步版本，调用方可在search_query产出后立即发起搜索"""
+        parser = StreamingJSONParser(required_fields=("search_query",))
+        stream = self.llm_client.astream(messages=self._build_messages(input_data))
+        try:
+            async for chunk in stream:
+                for item in parser.feed(chunk):
+                    yield item
+                if stop_early and parser.has_required:
+                    break
+        finally:
+            await stream.aclose()
+        if not parser.has_required:
+            yield ("_raw", parser.text)
+
+    def _collect_fields(self, fields: dict[str, Any]) -> dict[str, Any]:
+        if "_raw" in fields:
+            return self.process_output(fields["_raw"])
+        return {
+            "search_query": fields.get("search_query", ""),
+            "reasoning": fields.get("reasoning", "")
+        }
+
+    def run_streaming(self, input_data: Any, stop_early: bool = True, **kwargs) -> dict[str, Any]:
+        self.before_run(input_data)
+        try:
+            fields = dict(self.stream_fields(input_data, stop_early=stop_early))
+            result = self._collect_fields(fields)
+            self.after_run(result)
+            return result
+
+        except Exception as e:
+            self.log_error(f"流式生成首次搜索查询失败: {str(e)}")
+            raise e
+
+    async def arun_streaming(self, input_data: Any, stop_early: bool = True, **kwargs) -> dict[str, Any]:
+        self.before_run(input_data)
+        try:
+            fields = {key: value async for key, value in self.astream_fields(input_data, stop_early=stop_early)}
+            result = self._collect_fields(fields)
+            self.after_run(result)
+            return result
+
+        except Exception as e:
+            self.log_error(f"流式生成首次搜索查询失败: {str(e)}")
+            raise e
+
     def after_run(self, result: Any):
         self.log_info(f"生成搜索查询：{result.get('search_query', 'N/A')}")
 
@@ -64,6 +142,7 @@ class FirstSearchNode(BaseNode):
             try:
                 result = json.loads(cleaned_output)
             except JSONDecodeError:
+                record_fallback(self.node_name, "json_extract")
                 result = extract_json_from_text(cleaned_output)
                 if "error" in result:
                     raise ValueError("JSON解析失败")
@@ -71,7 +150,7 @@ class FirstSearchNode(BaseNode):
             search_query = result.get("search_query", "")
             reasoning = result.get("reasoning", "")
 
-            if not search_query:
+            if not isinstance(search_query, str) or not search_query.strip():
                 raise ValueError("未找到搜索查询")
 
             return {
@@ -82,41 +161,44 @@ class FirstSearchNode(BaseNode):
 
         except Exception as e:
             self.log_error(f"处理输出失败：{str(e)}")
+            record_fallback(self.node_name, "default_query")
             return {
                 "search_query": "相关主题研究",
                 "reasoning": "解析失败，使用默认搜索查询"
             }
 
-class ReflectionNode(BaseNode):
+class ReflectionNode(FirstSearchNode):
+    """根据段落当前内容找出缺失信息并生成补充搜索查询，输出格式与FirstSearchNode一致"""
+
     def __init__(self, llm_client, node_name = ""):
-        super().__init__(llm_client, "ReflectionNode")
+        super().__init__(llm_client, node_name or "ReflectionNode")
 
     def validate_input(self, input_data: Any) -> bool:
+        if isinstance(input_data, str):
+            try:
+                input_data = json.loads(input_data)
+            except JSONDecodeError:
+                return False
+        return isinstance(input_data, dict) and all(
+            key in input_data for key in ("title", "content", "paragraph_latest_state")
+        )
 
-        return super().validate_input(input_data)
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    def before_run(self, input_data: Any):
+        self.log_info("开始反思段落内容")
 
+    def _build_messages(self, input_data: Any) -> list[dict[str, str]]:
+        if not self.validate_input(input_data):
+            raise ValueError("输入格式错误，需要包含title、content和paragraph_latest_state字段")
 
+        if isinstance(input_data, dict):
+            message = json.dumps(input_data, ensure_ascii=False)
+        else:
+            message = input_data
 
+        return [
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_REFLECTION},
+            {"role": "user", "content": message}
+            ]
 
+    def after_run(self, result: Any):
+        self.log_info(f"生成反思查询：{result.get('search_query', 'N/A')}")
@@ -0,0 +1,189 @@
+import json
+from typing import Any
+from nodes.base_node import BaseNode
+
+import prompts
+from state.state import Paragraph
+from utils.bm25 import passages_to_results
+from utils.metrics import get_registry, record_fallback
+from utils.text_processing import (
+    estimate_tokens,
+    truncate_to_tokens,
+    extract_json_from_text,
+    pack_search_results,
+    split_into_chunks
+)
+
+class SummaryCompressor:
+    """分层压缩段落总结：切块后并发压缩各块再拼接，仍超限时在结果上继续压缩
+
+    每层把总长度压到约ratio倍，达到max_levels层后按token直接截断，保证总结长度有上界。
+    """
+
+    def __init__(self, llm_client, max_tokens: int = 2000, chunk_tokens: int = 800, ratio: float = 0.5, max_levels: int = 3):
+        self.llm_client = llm_client
+        self.max_tokens = max_tokens
+        self.chunk_tokens = chunk_tokens
+        self.ratio = ratio
+        self.max_levels = max_levels
+
+    def needs_compression(self, summary: str) -> bool:
+        return estimate_tokens(summary) > self.max_tokens
+
+    def _build_messages(self, paragraph: Paragraph, chunk: str) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": prompts.SYSTEM_PROMPT_SUMMARY_COMPRESSION},
+            {"role": "user", "content": json.dumps({
+                "title": paragraph.title,
+                "content": paragraph.content,
+                "paragraph_latest_state": chunk,
+                "max_length": max(int(len(chunk) * self.ratio), 1)
+            }, ensure_ascii=False)}
+        ]
+
+    def _parse(self, response: str, chunk: str) -> str:
+        result = extract_json_from_text(response)
+        compressed = result.get("compressed_paragraph_state", "") if isinstance(result, dict) else ""
+        if not compressed:
+            record_fallback("SummaryCompressor", "keep_chunk")
+            return chunk
+        return compressed
+
+    def _finish(self, summary: str, levels: int) -> str:
+        if self.needs_compression(summary):
+            record_fallback("SummaryCompressor", "truncate")
+            summary = truncate_to_tokens(summary, self.max_tokens)
+        get_registry().inc("summary_compressions_total", levels=levels)
+        print(f"[SummaryCompressor] 总结经过 {levels} 层压缩后约 {estimate_tokens(summary)} tokens")
+        return summary
+
+    def compress(self, paragraph: Paragraph, summary: str) -> str:
+        level = 0
+        while self.needs_compression(summary) and level < self.max_levels:
+            chunks = split_into_chunks(summary, self.chunk_tokens)
+            summary = "".join(
+                self._parse(self.llm_client.invoke(self._build_messages(paragraph, chunk)), chunk) for chunk in chunks
+            )
+            level += 1
+        return self._finish(summary, level) if level else summary
+
+    async def acompress(self, paragraph: Paragraph, summary: str) -> str:
+        import asyncio
+        level = 0
+        while self.needs_compression(summary) and level < self.max_levels:
+            chunks = split_into_chunks(summary, self.chunk_tokens)
+            responses = await asyncio.gather(*(
+                self.llm_client.ainvoke(self._build_messages(paragraph, chunk)) for chunk in chunks
+            ))
+            summary = "".join(self._parse(response, chunk) for response, chunk in zip(responses, chunks))
+            level += 1
+        return self._finish(summary, level) if level else summary
+
+
+class FirstSummaryNode(BaseNode):
+    """基于首次搜索的结果生成段落的第一版内容
+
+    输入只包含上次总结之后新增的搜索结果（Research.get_pending_searches），
+    设置passage_top_k时只发送这些结果中与段落主题BM25得分最高的段落。
+    总结超过max_summary_tokens时分层压缩，每轮prompt大小不随反思轮次增长。
+    """
+    system_prompt_name = "SYSTEM_PROMPT_FIRST_SUMMARY"
+    output_key = "paragraph_latest"
+    include_previous = False
+
+    def __init__(self,
+                 llm_client,
+                 node_name: str = "",
+                 results_token_budget: int = 8000,
+                 max_summary_tokens: int = 2000,
+                 compressor: SummaryCompressor | None = None,
+                 passage_top_k: int | None = 8):
+        super().__init__(llm_client, node_name or self.__class__.__name__)
+        self.results_token_budget = results_token_budget
+        self.passage_top_k = passage_top_k
+        self.compressor = compressor or SummaryCompressor(llm_client, max_tokens=max_summary_tokens)
+
+    def validate_input(self, input_data: Any) -> bool:
+        required = ("title", "content", "search_results")
+        if self.include_previous:
+            required += ("paragraph_latest_state",)
+        return isinstance(input_data, dict) and all(key in input_data for key in required)
+
+    def select_results(self, paragraph: Paragraph, query: str) -> list[dict[str, Any]]:
+        research = paragraph.research
+        if self.passage_top_k:
+            matches = research.search_passages(
+                f"{paragraph.title} {paragraph.content} {query}",
+                k=self.passage_top_k,
+                start=research.summarized_count
+            )
+            if matches:
+                return passages_to_results(matches)
+        # 没有任何段落命中时退回到完整的新增结果
+        return [s.to_dict() for s in research.get_pending_searches()]
+
+    def build_input(self, paragraph: Paragraph, query: str) -> dict[str, Any]:
+        results = self.select_results(paragraph, query)
+        packed = pack_search_results(results, self.results_token_budget, query=query, deduplicate=False)
+        data = {
+            "title": paragraph.title,
+            "content": paragraph.content,
+            "search_query": query,
+            "search_results": [packed.text]
+        }
+        if self.include_previous:
+            data["paragraph_latest_state"] = paragraph.research.latest_summary
+        return data
+
+    def _build_messages(self, input_data: dict[str, Any]) -> list[dict[str, str]]:
+        if not self.validate_input(input_data):
+            raise ValueError("输入格式错误，缺少总结所需字段")
+        messages = [
+            {"role": "system", "content": getattr(prompts, self.system_prompt_name)},
+            {"role": "user", "content": json.dumps(input_data, ensure_ascii=False)}
+        ]
+        get_registry().observe("summary_prompt_tokens", estimate_tokens(messages[1]["content"]), node=self.node_name)
+        return messages
+
+    def run(self, input_data: dict[str, Any], **kwargs) -> str:
+        try:
+            return self.process_output(self.llm_client.invoke(self._build_messages(input_data)))
+        except Exception as e:
+            self.log_error(f"生成段落总结失败: {str(e)}")
+            raise e
+
+    async def arun(self, input_data: dict[str, Any], **kwargs) -> str:
+        try:
+            return self.process_output(await self.llm_client.ainvoke(self._build_messages(input_data)))
+        except Exception as e:
+            self.log_error(f"生成段落总结失败: {str(e)}")
+            raise e
+
+    def process_output(self, output: str) -> str:
+        result = extract_json_from_text(output)
+        if isinstance(result, dict) and result.get(self.output_key):
+            return result[self.output_key]
+        record_fallback(self.node_name, "raw_output")
+        return output
+
+    def summarize(self, paragraph: Paragraph, query: str) -> str:
+        """总结新增结果、必要时压缩，并写回Research"""
+        research = paragraph.research
+        summarized_count = len(research.search_history)
+        summary = self.compressor.compress(paragraph, self.run(self.build_input(paragraph, query)))
+        research.update_summary(summary, summarized_count)
+        return summary
+
+    async def asummarize(self, paragraph: Paragraph, query: str) -> str:
+        research = paragraph.research
+        summarized_count = len(research.search_history)
+        summary = await self.compressor.acompress(paragraph, await self.arun(self.build_input(paragraph, query)))
+        research.update_summary(summary, summarized_count)
+        return summary
+
+
+class ReflectionSummaryNode(FirstSummaryNode):
+    """把反思搜索的新增结果合入已有段落内容"""
+    system_prompt_name = "SYSTEM_PROMPT_REFLECTION_SUMMARY"
+    output_key = "updated_paragraph_latest_state"
+    include_previous = True
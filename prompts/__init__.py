@@ -1,17 +1,13 @@
-
+from . import prompts as _prompts
 from .prompts import (
-    SYSTEM_PROMPT_REPORT_STRUCTURE,
-    SYSTEM_PROMPT_FIRST_SEARCH,
-    SYSTEM_PROMPT_FIRST_SUMMARY,
-    SYSTEM_PROMPT_REFLECTION,
-    SYSTEM_PROMPT_REFLECTION_SUMMARY,
-    SYSTEM_PROMPT_REPORT_FORMATTING,
     output_schema_report_structure,
     output_schema_first_search,
     output_schema_first_summary,
     output_schema_reflection,
     output_schema_reflection_summary,
-    input_schema_report_formatting
+    output_schema_summary_compression,
+    input_schema_report_formatting,
+    input_schema_section_formatting
 )
 
 __all__ = [
@@ -20,11 +16,21 @@ __all__ = [
     "SYSTEM_PROMPT_FIRST_SUMMARY",
     "SYSTEM_PROMPT_REFLECTION",
     "SYSTEM_PROMPT_REFLECTION_SUMMARY",
+    "SYSTEM_PROMPT_SUMMARY_COMPRESSION",
     "SYSTEM_PROMPT_REPORT_FORMATTING",
+    "SYSTEM_PROMPT_SECTION_FORMATTING",
+    "SYSTEM_PROMPT_REPORT_CONCLUSION",
     "output_schema_report_structure",
     "output_schema_first_search",
     "output_schema_first_summary",
     "output_schema_reflection",
     "output_schema_reflection_summary",
-    "input_schema_report_formatting"
+    "output_schema_summary_compression",
+    "input_schema_report_formatting",
+    "input_schema_section_formatting"
 ]
+
+
+def __getattr__(name: str):
+    # SYSTEM_PROMPT_* 在第一次访问时构建
+    return getattr(_prompts, name)
@@ -81,6 +81,24 @@ output_schema_reflection_summary = {
     }
 }
 
+# summary compression
+input_schema_summary_compression = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "content": {"type": "string"},
+        "paragraph_latest_state": {"type": "string"},
+        "max_length": {"type": "integer"}
+    }
+}
+
+output_schema_summary_compression = {
+    "type": "object",
+    "properties": {
+        "compressed_paragraph_state": {"type": "string"}
+    }
+}
+
 # report
 input_schema_report_formatting = {
     "type": "array",
@@ -93,6 +111,14 @@ input_schema_report_formatting = {
     }
 }
 
+input_schema_section_formatting = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "paragraph_latest_state": {"type": "string"}
+    }
+}
+
 output_schema_report_structure = {
     "type": "array",
     "item": {
@@ -128,7 +154,8 @@ You must return **only** the JSON object/
 """
 
 # first search
-SYSTEM_PROMPT_FIRST_SEARCH = f"""
+def _build_system_prompt_first_search() -> str:
+    return f"""
 {PROMPT_HEADER}
 
 TASK:
@@ -145,7 +172,8 @@ Given a paragraph title and expected content, generate optimized search queries
 """
 
 # first summary
-SYSTEM_PROMPT_FIRST_SUMMARY = f"""
+def _build_system_prompt_first_summary() -> str:
+    return f"""
 {PROMPT_HEADER}
 
 TASK:
@@ -162,7 +190,8 @@ The output must summarize finfings, stay consistent with the topic, and be ready
 """
 
 # relecttion
-SYSTEM_PROMPT_REFLECTION = f"""
+def _build_system_prompt_reflection() -> str:
+    return f"""
 {PROMPT_HEADER}
 
 TASKS:
@@ -178,7 +207,8 @@ Identify missing critical information and generate improved search queries ('que
 </OUTPUT JSON SCHEMA>
 """
 
-SYSTEM_PROMPT_REFLECTION_SUMMARY = f"""
+def _build_system_prompt_reflection_summary() -> str:
+    return f"""
 {PROMPT_HEADER}
 TASK:
 Using the new search results, revise and enrich the paragraph's existing content.
@@ -193,9 +223,26 @@ You must preserve important information from the previous version and only add m
 </OUTPUT JSON SCHEMA>
 """
 
+def _build_system_prompt_summary_compression() -> str:
+    return f"""
+{PROMPT_HEADER}
+TASK:
+Compress the given part of the paragraph content to at most 'max_length' characters.
+Keep every concrete fact, number, date and source; remove repetition and filler wording.
+
+<INPUT JSON SCHEMA>
+{json.dumps(input_schema_summary_compression, indent=2, ensure_ascii=False)}
+</INPUT JSON SCHEMA>
+
+<OUTPUT JSON SCHEMA>
+{json.dumps(output_schema_summary_compression, indent=2, ensure_ascii=False)}
+</OUTPUT JSON SCHEMA>
+"""
+
 
 # report output
-SYSTEM_PROMPT_REPORT_STRUCTURE = f"""
+def _build_system_prompt_report_structure() -> str:
+    return f"""
 {PROMPT_HEADER}
 
 TASK:
@@ -211,7 +258,8 @@ Ensure the order is logical and suitable for deep research.
 </OUTPUT JSON SCHEMA>
 """
 
-SYSTEM_PROMPT_REPORT_FORMATTING = f"""
+def _build_system_prompt_report_formatting() -> str:
+    return f"""
 {PROMPT_HEADER}
 
 TASK:
@@ -225,24 +273,57 @@ If the report lacks a conclusion, generate a conclusion based on the paragraph c
 # Note: Final output must be a Markdown string, not JSON.
 """
 
+def _build_system_prompt_section_formatting() -> str:
+    return f"""
+{PROMPT_HEADER}
 
+TASK:
+Format one paragraph of a research report as a polished Markdown section.
+Start with a level-2 heading ('## ') using the title, and keep every fact from the paragraph content.
+Other sections are formatted separately: do not add an introduction or conclusion for the whole report.
 
+<INPUT JSON SCHEMA>
+{json.dumps(input_schema_section_formatting, indent=2, ensure_ascii=False)}
+</INPUT JSON SCHEMA>
 
+# Note: Final output must be a Markdown string, not JSON.
+"""
 
+def _build_system_prompt_report_conclusion() -> str:
+    return f"""
+{PROMPT_HEADER}
 
+TASK:
+Write only the conclusion section of a research report whose paragraphs are formatted separately.
+Start with a level-2 heading ('## ') for the conclusion, in the same language as the paragraphs,
+and summarize the key findings across all paragraphs without repeating them verbatim.
 
+<INPUT JSON SCHEMA>
+{json.dumps(input_schema_report_formatting, indent=2, ensure_ascii=False)}
+</INPUT JSON SCHEMA>
 
+# Note: Final output must be a Markdown string, not JSON.
+"""
 
 
+# 系统提示词在第一次访问时才构建并缓存，导入本模块不做json序列化
+_PROMPT_BUILDERS = {
+    "SYSTEM_PROMPT_FIRST_SEARCH": _build_system_prompt_first_search,
+    "SYSTEM_PROMPT_FIRST_SUMMARY": _build_system_prompt_first_summary,
+    "SYSTEM_PROMPT_REFLECTION": _build_system_prompt_reflection,
+    "SYSTEM_PROMPT_REFLECTION_SUMMARY": _build_system_prompt_reflection_summary,
+    "SYSTEM_PROMPT_SUMMARY_COMPRESSION": _build_system_prompt_summary_compression,
+    "SYSTEM_PROMPT_REPORT_STRUCTURE": _build_system_prompt_report_structure,
+    "SYSTEM_PROMPT_REPORT_FORMATTING": _build_system_prompt_report_formatting,
+    "SYSTEM_PROMPT_SECTION_FORMATTING": _build_system_prompt_section_formatting,
+    "SYSTEM_PROMPT_REPORT_CONCLUSION": _build_system_prompt_report_conclusion
+}
 
 
-
-
-
-
-
-
-
-
-
-
+def __getattr__(name: str) -> str:
+    builder = _PROMPT_BUILDERS.get(name)
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = builder()
+    globals()[name] = value
+    return value
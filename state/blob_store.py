@@ -0,0 +1,57 @@
+import os
+import mmap
+import zlib
+import hashlib
+
+
+class BlobStore:
+    """内容寻址的blob存储：以正文的sha256为键，zlib压缩后按哈希前缀分目录存放
+
+    相同内容只存一份；读取时对blob文件做内存映射后解压，不经过额外的缓冲拷贝。
+    """
+
+    def __init__(self, root: str, compress_level: int = 6):
+        self.root = root
+        self.compress_level = compress_level
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def for_state_file(cls, filepath: str) -> "BlobStore":
+        """与State文件相邻的默认blob目录"""
+        return cls(f"{filepath}.blobs")
+
+    @staticmethod
+    def make_ref(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.root, ref[:2], f"{ref}.z")
+
+    def exists(self, ref: str) -> bool:
+        return os.path.exists(self._path(ref))
+
+    def put(self, text: str) -> str:
+        ref = self.make_ref(text)
+        path = self._path(ref)
+        if os.path.exists(path):
+            return ref
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(text.encode("utf-8"), self.compress_level))
+        os.replace(tmp_path, path)
+        return ref
+
+    def get(self, ref: str) -> str:
+        path = self._path(ref)
+        if not os.path.exists(path):
+            raise KeyError(f"blob不存在：{ref}")
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return zlib.decompress(mm).decode("utf-8")
+
+    def size(self) -> int:
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        return total
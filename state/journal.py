@@ -0,0 +1,132 @@
+import os
+import json
+from typing import Any
+from datetime import datetime
+from state.state import State, Paragraph, Search
+
+
+class StateJournal:
+    """State的追加式日志持久化
+
+    快照文件保存完整的State（附带已包含的最大记录序号journal_seq），
+    每次变更以一行JSON追加到 <快照路径>.log，累计compact_every条后压缩为新快照。
+    加载时读取快照并重放序号更大的日志记录，写到一半的最后一行会被忽略。
+    """
+
+    def __init__(self, path: str, compact_every: int = 200, fsync: bool = False):
+        self.path = path
+        self.log_path = self.log_path_for(path)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.seq = 0
+        self.pending = 0
+        self.state: State | None = None
+        self._log_file = None
+
+    @staticmethod
+    def log_path_for(path: str) -> str:
+        return f"{path}.log"
+
+    def attach(self, state: State, seq: int = 0):
+        self.state = state
+        self.seq = seq
+        state._journal = self
+        for paragraph in state.paragraphs:
+            self.bind_paragraph(paragraph)
+        # 以新快照开始，避免在可能残缺的旧日志尾部继续追加
+        self.compact()
+
+    def bind_paragraph(self, paragraph: Paragraph):
+        order = paragraph.order
+        paragraph.research._listener = lambda op, payload: self.record(op, paragraph=order, **payload)
+
+    def record(self, op: str, **payload):
+        self.seq += 1
+        entry = {"seq": self.seq, "op": op, "at": datetime.now().isoformat(), **payload}
+        self._log_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._log_file.flush()
+        if self.fsync:
+            os.fsync(self._log_file.fileno())
+        self.pending += 1
+        if self.pending >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """将当前State写成快照（原子替换）并清空日志"""
+        data = self.state.to_dict()
+        data["journal_seq"] = self.seq
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, ensure_ascii=False))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        if self._log_file is not None:
+            self._log_file.close()
+        self._log_file = open(self.log_path, "w", encoding="utf-8")
+        self.pending = 0
+
+    def close(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+        if self.state is not None and self.state._journal is self:
+            self.state._journal = None
+            for paragraph in self.state.paragraphs:
+                paragraph.research._listener = None
+
+    @classmethod
+    def load(cls, path: str, resume: bool = False, compact_every: int = 200) -> State:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        state = State.from_dict(data)
+        seq = data.get("journal_seq", 0)
+
+        log_path = cls.log_path_for(path)
+        if os.path.exists(log_path):
+            with open(log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 崩溃时写到一半的记录
+                        break
+                    if entry["seq"] <= seq:
+                        continue
+                    apply_entry(state, entry)
+                    seq = entry["seq"]
+
+        if resume:
+            journal = cls(path, compact_every=compact_every)
+            journal.attach(state, seq=seq)
+        return state
+
+
+def apply_entry(state: State, entry: dict[str, Any]):
+    """在State上重放一条日志记录（重放时不会再次写日志）"""
+    op = entry["op"]
+    at = entry.get("at", datetime.now().isoformat())
+
+    if op == "add_paragraph":
+        state.add_paragraph(entry["title"], entry["content"])
+    elif op == "set_final_report":
+        state.final_report = entry["report"]
+    else:
+        research = state.paragraphs[entry["paragraph"]].research
+        match op:
+            case "add_search":
+                research.add_search(Search.from_dict(entry["search"]))
+            case "update_search":
+                research.update_search(entry["index"], **entry["changes"])
+            case "update_summary":
+                research.update_summary(entry["summary"], entry.get("summarized_count"))
+            case "increment_reflection":
+                research.increment_reflection()
+            case "mark_completed":
+                research.mark_completed()
+            case _:
+                raise ValueError(f"未知的日志记录类型：{op}")
+        research.updated_at = at
+    state.updated_at = at
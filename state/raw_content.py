@@ -0,0 +1,173 @@
+import os
+import mmap
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator
+from utils.metrics import get_registry
+
+_stores: "weakref.WeakValueDictionary[str, RawContentStore]" = weakref.WeakValueDictionary()
+_SESSION_MARKER = "SESSION"
+
+
+class RawContentHandle:
+    """原始网页正文的延迟句柄，访问时才对溢出文件做内存映射读取"""
+
+    __slots__ = ("store", "ref", "size")
+
+    def __init__(self, store: "RawContentStore", ref: str, size: int):
+        self.store = store
+        self.ref = ref
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"RawContentHandle({self.ref!r}, size={self.size})"
+
+    @property
+    def is_available(self) -> bool:
+        return self.store.contains(self.ref)
+
+    @contextmanager
+    def open(self) -> Iterator[mmap.mmap]:
+        """以只读mmap打开正文，可直接在字节上查找而不解码整页"""
+        with self.store.open(self.ref) as mm:
+            yield mm
+
+    def read(self) -> str:
+        with self.open() as mm:
+            return mm[:].decode("utf-8")
+
+
+class RawContentStore:
+    """单个会话的原始正文溢出目录：正文以未压缩的UTF-8文件保存以便内存映射
+
+    总字节数超过max_bytes时按最近最少访问淘汰，被淘汰的句柄不再可用。
+    未指定root时在base_dir（默认为系统临时目录）下新建会话目录，并在close、对象回收或进程退出时删除。
+    指定root时只恢复同一session_id留下的正文，其他会话的文件既不计入容量也不会被引用。
+    """
+
+    def __init__(self,
+                 root: str | None = None,
+                 max_bytes: int = 256 * 1024 * 1024,
+                 session_id: str | None = None,
+                 base_dir: str | None = None):
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.owns_root = root is None
+        if base_dir is not None:
+            os.makedirs(base_dir, exist_ok=True)
+        self.root = root or tempfile.mkdtemp(prefix=f"deepsearch-raw-{self.session_id}-", dir=base_dir)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._load_existing()
+        _stores[self.session_id] = self
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.root, True) if self.owns_root else None
+
+    def _load_existing(self):
+        # 目录中记录了写入它的会话；只有同一会话重新打开时才恢复已有正文，并按修改时间恢复淘汰顺序
+        marker = os.path.join(self.root, _SESSION_MARKER)
+        try:
+            with open(marker, "r", encoding="utf-8") as f:
+                owner = f.read().strip()
+        except FileNotFoundError:
+            owner = None
+        if owner != self.session_id:
+            with open(marker, "w", encoding="utf-8") as f:
+                f.write(self.session_id)
+            return
+        files = [entry for entry in os.scandir(self.root) if entry.name.endswith(".txt")]
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            self._entries[entry.name[:-4]] = entry.stat().st_size
+            self.total_bytes += entry.stat().st_size
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, f"{digest}.txt")
+
+    def _split(self, ref: str) -> str:
+        session, _, digest = ref.partition("/")
+        if session != self.session_id:
+            raise KeyError(f"不属于当前会话的正文引用：{ref}")
+        return digest
+
+    def put(self, text: str) -> RawContentHandle | None:
+        """保存正文并返回句柄；单篇超过max_bytes时不保存"""
+        data = text.encode("utf-8")
+        if not data or len(data) > self.max_bytes:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+            else:
+                self._evict(len(data))
+                tmp_path = f"{self._path(digest)}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(digest))
+                self._entries[digest] = len(data)
+                self.total_bytes += len(data)
+        get_registry().inc("raw_content_spilled_bytes_total", len(data))
+        return RawContentHandle(self, f"{self.session_id}/{digest}", len(data))
+
+    def _evict(self, incoming: int):
+        while self._entries and self.total_bytes + incoming > self.max_bytes:
+            digest, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+            get_registry().inc("raw_content_evictions_total")
+
+    def contains(self, ref: str) -> bool:
+        try:
+            return self._split(ref) in self._entries
+        except KeyError:
+            return False
+
+    def handle(self, ref: str) -> RawContentHandle | None:
+        digest = self._split(ref)
+        size = self._entries.get(digest)
+        return RawContentHandle(self, ref, size) if size is not None else None
+
+    @contextmanager
+    def open(self, ref: str) -> Iterator[mmap.mmap]:
+        digest = self._split(ref)
+        with self._lock:
+            if digest not in self._entries:
+                raise KeyError(f"正文已被淘汰或不存在：{ref}")
+            self._entries.move_to_end(digest)
+        with open(self._path(digest), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+    def close(self):
+        _stores.pop(self.session_id, None)
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self) -> "RawContentStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def resolve_raw_content(ref: str) -> RawContentHandle | None:
+    """按引用找到所属会话的存储并返回句柄；会话已关闭或正文已淘汰时返回None"""
+    if not ref:
+        return None
+    store = _stores.get(ref.partition("/")[0])
+    return store.handle(ref) if store is not None else None
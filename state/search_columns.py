@@ -0,0 +1,201 @@
+import math
+from array import array
+from collections.abc import Sequence
+from typing import Any, Iterable, Iterator, overload
+from state.blob_store import BlobStore
+from state.state import Search
+
+
+class SearchColumns:
+    """列式存储的search_history：查询字符串驻留、得分存为数值列，时间戳每批只存一份，批量追加
+
+    访问单条记录时按行构造Search视图。视图是快照，修改需通过Research.update_search写回；
+    每行的created_at/updated_at不再单独保存，视图中与timestamp相同。
+    """
+
+    def __init__(self, searches: Iterable[Search] = ()):
+        self._queries: list[str] = []
+        self._query_ids: dict[str, int] = {}
+        self.query_ids = array("I")
+        self.urls: list[str] = []
+        self.titles: list[str] = []
+        self.contents: list[str | None] = []
+        self.content_refs: list[str] = []
+        self.raw_content_refs: list[str] = []
+        self.scores = array("d")
+        # 同一批结果共用一个时间戳：每行只存批次下标，时间戳原样保存，不做解析与时区换算
+        self.batch_ids = array("I")
+        self._timestamps: list[str] = []
+        self.blob_store: BlobStore | None = None
+        self.extend(searches)
+
+    def _intern(self, query: str) -> int:
+        query_id = self._query_ids.get(query)
+        if query_id is None:
+            query_id = self._query_ids[query] = len(self._queries)
+            self._queries.append(query)
+        return query_id
+
+    def _batch(self, timestamp: str) -> int:
+        if not self._timestamps or self._timestamps[-1] != timestamp:
+            self._timestamps.append(timestamp)
+        return len(self._timestamps) - 1
+
+    def append(self, search: Search):
+        self.extend((search,))
+
+    def extend(self, searches: Iterable[Search]):
+        for search in searches:
+            self.query_ids.append(self._intern(search.query))
+            self.urls.append(search.url)
+            self.titles.append(search.title)
+            # 已外置的正文保持为None，不在这里触发加载
+            self.contents.append(search._content)
+            self.content_refs.append(search.content_ref)
+            self.raw_content_refs.append(search.raw_content_ref)
+            self.scores.append(math.nan if search.score is None else search.score)
+            self.batch_ids.append(self._batch(search.timestamp))
+
+    def add_rows(self, query: str, rows: list[dict[str, Any]], timestamp: str) -> "SearchRows":
+        """把一批搜索结果字典直接写入各列，不构造Search，返回新增行的惰性视图"""
+        start = len(self)
+        count = len(rows)
+        self.query_ids.extend([self._intern(query)] * count)
+        self.urls.extend([row.get("url", "") for row in rows])
+        self.titles.extend([row.get("title", "") for row in rows])
+        self.contents.extend([row.get("content", "") for row in rows])
+        self.content_refs.extend([""] * count)
+        self.raw_content_refs.extend([row.get("raw_content_ref", "") for row in rows])
+        scores = [row.get("score") for row in rows]
+        self.scores.extend([math.nan if score is None else score for score in scores])
+        self.batch_ids.extend([self._batch(timestamp)] * count)
+        return SearchRows(self, start, len(self))
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __bool__(self) -> bool:
+        return bool(self.urls)
+
+    @overload
+    def __getitem__(self, index: int) -> Search: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Search]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("search_history下标越界")
+        return self._view(index)
+
+    def __iter__(self) -> Iterator[Search]:
+        for i in range(len(self)):
+            yield self._view(i)
+
+    def _view(self, i: int) -> Search:
+        timestamp = self._timestamps[self.batch_ids[i]]
+        score = self.scores[i]
+        search = Search(
+            query=self._queries[self.query_ids[i]],
+            url=self.urls[i],
+            title=self.titles[i],
+            content=self.contents[i],
+            score=None if math.isnan(score) else score,
+            timestamp=timestamp,
+            content_ref=self.content_refs[i],
+            raw_content_ref=self.raw_content_refs[i],
+            created_at=timestamp,
+            updated_at=timestamp
+        )
+        search._blob_store = self.blob_store
+        return search
+
+    def update(self, index: int, **changes):
+        for key, value in changes.items():
+            match key:
+                case "query":
+                    self.query_ids[index] = self._intern(value)
+                case "url":
+                    self.urls[index] = value
+                case "title":
+                    self.titles[index] = value
+                case "content":
+                    self.contents[index] = value
+                    self.content_refs[index] = ""
+                case "content_ref":
+                    self.content_refs[index] = value
+                case "raw_content_ref":
+                    self.raw_content_refs[index] = value
+                case "score":
+                    self.scores[index] = math.nan if value is None else value
+                case "timestamp":
+                    self.batch_ids[index] = self._batch(value)
+                case _:
+                    raise AttributeError(f"Search没有可更新的字段：{key}")
+
+    def get_score_array(self):
+        """得分列的numpy视图（None为NaN），用于批量排序与统计"""
+        import numpy as np
+        return np.frombuffer(self.scores, dtype=np.float64).copy()
+
+    def to_list(self) -> list[dict[str, Any]]:
+        # 直接从列生成与Search.to_dict相同的字典，不逐行构造视图
+        rows = []
+        for i in range(len(self)):
+            timestamp = self._timestamps[self.batch_ids[i]]
+            score = self.scores[i]
+            rows.append({
+                "version": 1,
+                "created_at": timestamp,
+                "updated_at": timestamp,
+                "query": self._queries[self.query_ids[i]],
+                "url": self.urls[i],
+                "title": self.titles[i],
+                "content": self.contents[i],
+                "score": None if math.isnan(score) else score,
+                "timestamp": timestamp,
+                "content_ref": self.content_refs[i],
+                "raw_content_ref": self.raw_content_refs[i]
+            })
+        return rows
+
+    def attach_blob_store(self, store: BlobStore):
+        self.blob_store = store
+
+    def externalize(self, store: BlobStore, min_size: int = 0) -> int:
+        """将大于min_size的正文写入BlobStore，列中只保留引用，返回外置的条数"""
+        self.blob_store = store
+        count = 0
+        for i, content in enumerate(self.contents):
+            if content is not None and len(content) >= min_size:
+                self.content_refs[i] = store.put(content)
+                self.contents[i] = None
+                count += 1
+        return count
+
+
+class SearchRows(Sequence):
+    """SearchColumns中一段连续行的只读视图，访问时才构造Search"""
+
+    __slots__ = ("_columns", "_start", "_stop")
+
+    def __init__(self, columns: SearchColumns, start: int, stop: int):
+        self._columns = columns
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._columns._view(self._start + i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("search_history下标越界")
+        return self._columns._view(self._start + index)
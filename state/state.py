@@ -1,8 +1,17 @@
-from attrs import field, define, asdict
-from typing import Any
+from attrs import field, define, fields
+from typing import TYPE_CHECKING, Any, Callable
+from collections.abc import Sequence
 import json
 import os
 from datetime import datetime
+from utils.dedup import SearchDeduplicator
+from state.blob_store import BlobStore
+from state.raw_content import RawContentHandle, resolve_raw_content
+
+if TYPE_CHECKING:
+    from utils.bm25 import Passage, PassageIndex
+    from utils.novelty import KnownContent
+    from state.search_columns import SearchColumns
 
 @define(auto_attribs=True, slots=True)
 class Serializable:
@@ -15,54 +24,293 @@ class Serializable:
         self.updated_at = datetime.now().isoformat()
 
     def to_dict(self) -> dict[str, Any]:
-        return asdict(self)
+        # init=False 的字段为运行时内部状态，不参与序列化；私有字段以其别名作为键
+        return {
+            attr.alias: _to_plain(getattr(self, attr.name))
+            for attr in fields(type(self))
+            if attr.init
+        }
 
     def to_json(self, indent: int = 2) -> str:
         return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
 
 
+def _to_plain(value: Any) -> Any:
+    if isinstance(value, Serializable):
+        return value.to_dict()
+    if hasattr(value, "to_list"):
+        return value.to_list()
+    if isinstance(value, list):
+        return [_to_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    return value
+
+
 @define(auto_attribs=True, slots=True)
 class Search(Serializable):
     query: str = ""
     url: str = ""
     title: str = ""
-    content: str = ""
+    # 正文外置到BlobStore后为None，访问content时按content_ref延迟加载
+    _content: str | None = ""
     score: float | None = None
     timestamp: str = field(factory=lambda: datetime.now().isoformat())
+    content_ref: str = ""
+    raw_content_ref: str = ""
+    _blob_store: BlobStore | None = field(default=None, init=False, repr=False, eq=False)
+
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            if not self.content_ref:
+                return ""
+            if self._blob_store is None:
+                # 引用无法解析时不能当作空正文，否则总结会静默地基于空文本进行
+                raise KeyError(f"正文已外置但未绑定BlobStore，无法读取：{self.content_ref}")
+            self._content = self._blob_store.get(self.content_ref)
+        return self._content
+
+    @content.setter
+    def content(self, value: str):
+        self._content = value
+        self.content_ref = ""
+
+    @property
+    def raw_content(self) -> RawContentHandle | None:
+        """原始网页正文的延迟句柄，会话已结束或正文已被淘汰时为None"""
+        return resolve_raw_content(self.raw_content_ref)
+
+    @property
+    def is_content_loaded(self) -> bool:
+        return self._content is not None
+
+    def externalize(self, store: BlobStore, min_size: int = 0) -> bool:
+        """将正文写入BlobStore并释放内存中的副本，返回是否外置"""
+        self._blob_store = store
+        if self._content is None or len(self._content) < min_size:
+            return False
+        self.content_ref = store.put(self._content)
+        self._content = None
+        return True
+
+    def release_content(self):
+        """释放已加载的正文，下次访问时重新从BlobStore读取"""
+        if self.content_ref and self._blob_store is not None:
+            self._content = None
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "Search":
+        content_ref = data.get("content_ref", "")
+        content = data.get("content")
+        if content is None and not content_ref:
+            content = ""
         return cls(
             query=data.get("query", ""),
             url=data.get("url", ""),
             title=data.get("title", ""),
-            content=data.get("content", ""),
+            content=content,
             score=data.get("score"),
-            timestamp=data.get("timestamp", datetime.now().isoformat())
+            timestamp=data.get("timestamp", datetime.now().isoformat()),
+            content_ref=content_ref,
+            raw_content_ref=data.get("raw_content_ref", "")
         )
 
+def _merge_changes(search: Search, result: dict[str, Any]) -> dict[str, Any]:
+    """重复结果需要合并的字段：保留更高的得分、更完整的正文与原始正文引用"""
+    return _merge_fields(search.score, search.content, search.raw_content_ref, result)
+
+
+def _merge_fields(score: float | None, content: str, raw_content_ref: str, result: dict[str, Any]) -> dict[str, Any]:
+    changed = {}
+    new_score = result.get("score")
+    if new_score is not None and (score is None or new_score > score):
+        changed["score"] = new_score
+    new_content = result.get("content", "")
+    if len(new_content) > len(content):
+        changed["content"] = new_content
+    if result.get("raw_content_ref") and not raw_content_ref:
+        changed["raw_content_ref"] = result["raw_content_ref"]
+    return changed
+
+
 @define(auto_attribs=True, slots=True)
 class Research(Serializable):
-    search_history: list[Search] = field(factory=list)
+    # 默认为Search列表，use_columnar_history后为列式的SearchColumns
+    search_history: "list[Search] | SearchColumns" = field(factory=list)
     latest_summary: str = ""
+    # search_history中已被纳入latest_summary的条目数，之后的条目为待总结的增量
+    summarized_count: int = 0
     reflection_iteration: int = 0
     is_completed: bool = False
+    _dedup: SearchDeduplicator | None = field(default=None, init=False, repr=False, eq=False)
+    _passages: "PassageIndex | None" = field(default=None, init=False, repr=False, eq=False)
+    _known: "KnownContent | None" = field(default=None, init=False, repr=False, eq=False)
+    _listener: Callable[[str, dict[str, Any]], None] | None = field(default=None, init=False, repr=False, eq=False)
+
+    def _emit(self, op: str, **payload):
+        """向日志监听者上报变更记录"""
+        if self._listener is not None:
+            self._listener(op, payload)
+
+    def _get_deduplicator(self) -> SearchDeduplicator:
+        if self._dedup is None:
+            self._dedup = SearchDeduplicator()
+            for i, search in enumerate(self.search_history):
+                self._dedup.add(i, search.url, search.content)
+        return self._dedup
+
+    def get_passage_index(self) -> "PassageIndex":
+        """本段落已获取正文的BM25段落索引，第一次使用时构建，之后随新增结果增量更新"""
+        if self._passages is None:
+            from utils.bm25 import PassageIndex
+            self._passages = PassageIndex()
+            for i, search in enumerate(self.search_history):
+                self._passages.add_document(i, search.content, search.title, search.url)
+        return self._passages
+
+    def get_known_content(self, k: int = 5) -> "KnownContent":
+        """总结与搜索记录中已知的URL与k-gram，第一次使用时构建，之后随新增结果与总结增量更新"""
+        if self._known is None or self._known.k != k:
+            from utils.novelty import KnownContent
+            self._known = KnownContent(k)
+            self._known.add_text(self.latest_summary)
+            for search in self.search_history:
+                self._known.add_search(search.url, search.content)
+        return self._known
+
+    def search_passages(self, query: str, k: int = 8, start: int = 0) -> list[tuple["Passage", float]]:
+        """按BM25检索与query最相关的k个段落；start之前的搜索记录不参与检索"""
+        index = self.get_passage_index()
+        doc_ids = range(start, len(self.search_history)) if start else None
+        return index.search(query, k, doc_ids)
+
+    def _index_new(self, start: int, searches: Sequence[Search]):
+        if self._passages is None and self._listener is None:
+            return
+        for i, search in enumerate(searches, start):
+            if self._passages is not None:
+                self._passages.add_document(i, search.content, search.title, search.url)
+            self._emit("add_search", search=search.to_dict())
 
     def add_search(self, search: Search):
         self.search_history.append(search)
+        if self._dedup is not None:
+            self._dedup.add(len(self.search_history) - 1, search.url, search.content)
+        if self._known is not None:
+            self._known.add_search(search.url, search.content)
+        self._index_new(len(self.search_history) - 1, [search])
         self._touch()
 
-    def add_search_results(self, query: str, results: list[dict[str, Any]]):
+    def add_search_results(self, query: str, results: list[dict[str, Any]], deduplicate: bool = True) -> Sequence[Search]:
+        """添加搜索结果，URL重复或正文近似重复的结果合并到已有记录，返回新增的记录
+
+        同一批结果共用一个时间戳并一次性追加，只更新一次updated_at。
+        列式存储时结果直接写入各列，返回的是按需构造Search的视图。
+        """
+        deduplicator = self._get_deduplicator() if deduplicate else None
+        start = len(self.search_history)
+        timestamp = datetime.now().isoformat()
+        rows: list[dict[str, Any]] = []
         for result in results:
-            search = Search(
-                query=query,
-                url=result.get("url", ""),
-                title=result.get("title", ""),
-                content=result.get("content", ""),
-                score=result.get("score")
-            )
-            self.add_search(search)
+            url, content = result.get("url", ""), result.get("content", "")
+            if deduplicator is not None:
+                duplicate, signature = deduplicator.lookup(url, content)
+                if duplicate is not None and duplicate < start:
+                    self._merge_duplicate(duplicate, result)
+                    continue
+                if duplicate is not None:
+                    # 与同一批中尚未写入的结果重复，合并到待写入的行；复制后再改，不修改调用方的字典
+                    pending = rows[duplicate - start]
+                    changes = _merge_fields(
+                        pending.get("score"), pending.get("content", ""), pending.get("raw_content_ref", ""), result
+                    )
+                    rows[duplicate - start] = {**pending, **changes}
+                    continue
+                deduplicator.add(start + len(rows), url, content, signature)
+            rows.append(result)
+        added: Sequence[Search] = []
+        if rows:
+            if isinstance(self.search_history, list):
+                added = [
+                    Search(
+                        query=query,
+                        url=row.get("url", ""),
+                        title=row.get("title", ""),
+                        content=row.get("content", ""),
+                        score=row.get("score"),
+                        timestamp=timestamp,
+                        raw_content_ref=row.get("raw_content_ref", ""),
+                        created_at=timestamp,
+                        updated_at=timestamp
+                    )
+                    for row in rows
+                ]
+                self.search_history.extend(added)
+            else:
+                added = self.search_history.add_rows(query, rows, timestamp)
+            if deduplicator is None and self._dedup is not None:
+                for i, row in enumerate(rows, start):
+                    self._dedup.add(i, row.get("url", ""), row.get("content", ""))
+            if self._known is not None:
+                for row in rows:
+                    self._known.add_search(row.get("url", ""), row.get("content", ""))
+            self._index_new(start, added)
         self._touch()
+        return added
+
+    def _merge_duplicate(self, index: int, result: dict[str, Any]):
+        changed = _merge_changes(self.search_history[index], result)
+        if changed:
+            self.update_search(index, **changed)
+
+    def update_search(self, index: int, **changes):
+        if isinstance(self.search_history, list):
+            search = self.search_history[index]
+            for key, value in changes.items():
+                setattr(search, key, value)
+            search._touch()
+        else:
+            self.search_history.update(index, **changes)
+        if "content" in changes and self._passages is not None:
+            search = self.search_history[index]
+            self._passages.add_document(index, search.content, search.title, search.url)
+        if "content" in changes and self._known is not None:
+            self._known.add_text(changes["content"])
+        self._touch()
+        self._emit("update_search", index=index, changes=changes)
+
+    def use_columnar_history(self):
+        """把search_history切换为列式存储，适合搜索结果很多的长会话"""
+        if isinstance(self.search_history, list):
+            from state.search_columns import SearchColumns
+            self.search_history = SearchColumns(self.search_history)
+
+    def attach_blob_store(self, store: BlobStore):
+        if isinstance(self.search_history, list):
+            for search in self.search_history:
+                search._blob_store = store
+        else:
+            self.search_history.attach_blob_store(store)
+
+    def externalize_content(self, store: BlobStore, min_size: int = 1024) -> int:
+        if isinstance(self.search_history, list):
+            return sum(1 for search in self.search_history if search.externalize(store, min_size))
+        return self.search_history.externalize(store, min_size)
+
+    def update_summary(self, summary: str, summarized_count: int | None = None):
+        """更新总结；summarized_count默认为当前全部搜索记录，即所有结果均已纳入总结"""
+        self.latest_summary = summary
+        self.summarized_count = len(self.search_history) if summarized_count is None else summarized_count
+        if self._known is not None:
+            # 旧总结中的信息仍视为已知，只补充新总结的k-gram
+            self._known.add_text(summary)
+        self._touch()
+        self._emit("update_summary", summary=summary, summarized_count=self.summarized_count)
+
+    def get_pending_searches(self) -> list[Search]:
+        """上次总结之后新增的搜索记录"""
+        return self.search_history[self.summarized_count:]
 
     def get_search_count(self) -> int:
         return len(self.search_history)
@@ -70,20 +318,33 @@ class Research(Serializable):
     def increment_reflection(self):
         self.reflection_iteration += 1
         self._touch()
+        self._emit("increment_reflection")
 
     def mark_completed(self):
         self.is_completed = True
         self._touch()
+        self._emit("mark_completed")
+
+    def to_dict(self) -> dict[str, Any]:
+        data = super().to_dict()
+        # 列式存储序列化后与列表相同，需要单独记录以便加载时恢复
+        if not isinstance(self.search_history, list):
+            data["columnar_history"] = True
+        return data
 
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "Research":
         search_history = [Search.from_dict(search_data) for search_data in data.get("search_history", [])]
-        return cls(
+        research = cls(
             search_history=search_history,
             latest_summary=data.get("latest_summary", ""),
+            summarized_count=data.get("summarized_count", len(search_history) if data.get("latest_summary") else 0),
             reflection_iteration=data.get("reflection_iteration", 0),
             is_completed=data.get("is_completed", False)
         )
+        if data.get("columnar_history"):
+            research.use_columnar_history()
+        return research
 
 @define(auto_attribs=True, slots=True)
 class Paragraph(Serializable):
@@ -118,6 +379,8 @@ class State(Serializable):
     paragraphs: list[Paragraph] = field(factory=list)
     final_report: str = ""
     is_completed: bool = False
+    _journal: Any = field(default=None, init=False, repr=False, eq=False)
+    _columnar_history: bool = field(default=False, init=False, repr=False, eq=False)
 
     def update_completion(self):
         """自动同步整体完成状态"""
@@ -133,10 +396,21 @@ class State(Serializable):
     def add_paragraph(self, title: str, content: str) -> int:
         order = len(self.paragraphs)
         paragraph = Paragraph(title=title, content=content, order=order)
+        if self._columnar_history:
+            paragraph.research.use_columnar_history()
         self.paragraphs.append(paragraph)
         self._touch()
+        if self._journal is not None:
+            self._journal.record("add_paragraph", title=title, content=content)
+            self._journal.bind_paragraph(paragraph)
         return order
 
+    def set_final_report(self, report: str):
+        self.final_report = report
+        self._touch()
+        if self._journal is not None:
+            self._journal.record("set_final_report", report=report)
+
     def get_paragraph(self, index: int) -> Paragraph | None:
         if 0 <= index < len(self.paragraphs):
             return self.paragraphs[index]
@@ -155,11 +429,17 @@ class State(Serializable):
             "updated_at": self.updated_at
         }
 
+    def to_dict(self) -> dict[str, Any]:
+        data = super().to_dict()
+        if self._columnar_history:
+            data["columnar_history"] = True
+        return data
+
     @classmethod
     def from_dict(cls, data: dict[str, Any]) -> "State":
         paragraphs = [Paragraph.from_dict(p_data) for p_data in data.get("paragraphs", [])]
 
-        return cls(
+        state = cls(
             query=data.get("query", ""),
             report_title=data.get("report_title", ""),
             paragraphs=paragraphs,
@@ -168,18 +448,65 @@ class State(Serializable):
             created_at=data.get("created_at", datetime.now().isoformat()),
             updated_at=data.get("updated_at", datetime.now().isoformat())
         )
+        if data.get("columnar_history"):
+            state.use_columnar_history()
+        return state
 
     @classmethod
     def from_json(cls, json_str: str) -> "State":
         data = json.loads(json_str)
         return cls.from_dict(data)
 
-    def save_to_file(self, filepath: str):
+    def iter_searches(self):
+        for paragraph in self.paragraphs:
+            yield from paragraph.research.search_history
+
+    def attach_blob_store(self, store: BlobStore):
+        for paragraph in self.paragraphs:
+            paragraph.research.attach_blob_store(store)
+
+    def externalize_content(self, store: BlobStore, min_size: int = 1024) -> int:
+        """将大于min_size的正文移入BlobStore，State中只保留引用，返回外置的条数"""
+        return sum(paragraph.research.externalize_content(store, min_size) for paragraph in self.paragraphs)
+
+    def use_columnar_history(self):
+        """所有段落（包括之后新增的段落）改用列式的search_history"""
+        self._columnar_history = True
+        for paragraph in self.paragraphs:
+            paragraph.research.use_columnar_history()
+
+    def save_to_file(self, filepath: str, blob_store: BlobStore | None = None, min_blob_size: int = 1024):
+        """保存State；提供blob_store时大段正文以内容寻址的blob保存，文件中只存引用"""
+        if blob_store is not None:
+            self.externalize_content(blob_store, min_blob_size)
+        if self._journal is not None and self._journal.path == filepath:
+            self._journal.compact()
+            return
         with open(filepath, "w", encoding='utf-8') as f:
             f.write(self.to_json())
 
+    def enable_journal(self, filepath: str, compact_every: int = 200, fsync: bool = False):
+        """开启日志持久化：之后的每次变更以追加记录写入 filepath.log，定期压缩为快照"""
+        from state.journal import StateJournal
+        journal = StateJournal(filepath, compact_every=compact_every, fsync=fsync)
+        journal.attach(self)
+        return journal
+
+    def close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+
     @classmethod
-    def load_from_file(cls, filepath: str) -> "State":
-        with open(filepath, "r", encoding='utf-8') as f:
-            json_str = f.read()
-        return cls.from_json(json_str)
\ No newline at end of file
+    def load_from_file(cls, filepath: str, resume_journal: bool = False, blob_store: BlobStore | None = None) -> "State":
+        """读取快照并重放日志尾部；resume_journal为True时继续在同一日志上记录。
+        提供blob_store时外置的正文在首次访问时才加载"""
+        from state.journal import StateJournal
+        if resume_journal or os.path.exists(StateJournal.log_path_for(filepath)):
+            state = StateJournal.load(filepath, resume=resume_journal)
+        else:
+            with open(filepath, "r", encoding='utf-8') as f:
+                json_str = f.read()
+            state = cls.from_json(json_str)
+        if blob_store is not None:
+            state.attach_blob_store(blob_store)
+        return state
\ No newline at end of file
@@ -0,0 +1,96 @@
+import os
+import json
+import asyncio
+import functools
+from agent.batch import BatchRunner, load_batch_items, load_finished_ids, run_batch
+from agent.pipeline import ResearchPipeline, build_default_pipeline
+from llms.fake_llm import FakeLLM
+from state.state import State
+from tools.fake_search import FakeSearch
+
+
+def write_queries(path, queries):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, query in enumerate(queries):
+            f.write(json.dumps({"id": f"q{i}", "query": query}, ensure_ascii=False) + "\n")
+
+
+def read_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_pipeline_runs_end_to_end():
+    state = State(query="人工智能对就业的影响")
+    asyncio.run(ResearchPipeline(FakeLLM(), FakeSearch()).run(state))
+    assert len(state.paragraphs) == 5
+    assert state.is_completed
+    assert state.final_report.startswith("## ")
+
+
+def test_batch_skips_finished_items(tmp_path):
+    input_path = tmp_path / "queries.jsonl"
+    write_queries(input_path, ["新能源汽车", "半导体产业", "消费复苏"])
+    output_dir = str(tmp_path / "runs")
+    factory = functools.partial(build_default_pipeline, fake=True)
+
+    summary = run_batch(str(input_path), output_dir, factory, concurrency=2)
+    assert summary["done"] == 3 and summary["skipped"] == 0
+    records = read_results(summary["results_path"])
+    assert {r["id"] for r in records} == {"q0", "q1", "q2"}
+    assert all(r["status"] == "done" and r["wall_time"] > 0 for r in records)
+    assert os.path.exists(os.path.join(output_dir, "q0.md"))
+
+    summary = run_batch(str(input_path), output_dir, factory, concurrency=2)
+    assert summary["skipped"] == 3 and summary["done"] == 0
+    assert len(read_results(summary["results_path"])) == 3
+
+
+class FlakyPipeline(ResearchPipeline):
+    async def research_paragraph(self, paragraph):
+        if paragraph.order >= 3:
+            raise RuntimeError("模拟的段落失败")
+        await super().research_paragraph(paragraph)
+
+
+def test_batch_resumes_failed_item(tmp_path):
+    output_dir = str(tmp_path / "runs")
+    input_path = tmp_path / "queries.jsonl"
+    write_queries(input_path, ["宏观经济"])
+    item = load_batch_items(str(input_path))[0]
+
+    first = asyncio.run(BatchRunner(lambda: FlakyPipeline(FakeLLM(), FakeSearch()), output_dir).run([item]))[0]
+    assert first.status == "failed"
+    assert first.paragraphs == 5 and first.completed_paragraphs == 3
+
+    llm = FakeLLM()
+    runner = BatchRunner(lambda: ResearchPipeline(llm, FakeSearch()), output_dir)
+    result = asyncio.run(runner.run([item]))[0]
+    assert result.status == "done" and result.resumed
+    # 只重跑失败的两个段落（各2次调用）和最终的格式化
+    assert llm.calls == 5
+    assert load_finished_ids(runner.results_path) == {item.id}
+
+
+def test_batch_with_worker_processes(tmp_path):
+    input_path = tmp_path / "queries.jsonl"
+    write_queries(input_path, [f"主题{i}" for i in range(4)])
+    summary = run_batch(str(input_path), str(tmp_path / "runs"),
+                        functools.partial(build_default_pipeline, fake=True), workers=2)
+    assert summary["done"] == 4
+    records = read_results(summary["results_path"])
+    assert len({r["pid"] for r in records}) == 2
+
+
+def test_corrupt_state_fails_only_its_item(tmp_path):
+    input_path = tmp_path / "queries.jsonl"
+    write_queries(input_path, ["损坏的条目", "正常的条目"])
+    output_dir = tmp_path / "runs"
+    output_dir.mkdir()
+    (output_dir / "q0.json").write_text('{"query": "损坏', encoding="utf-8")
+
+    summary = run_batch(str(input_path), str(output_dir), functools.partial(build_default_pipeline, fake=True))
+    assert (summary["done"], summary["failed"]) == (1, 1)
+    records = {r["id"]: r for r in read_results(summary["results_path"])}
+    assert records["q0"]["status"] == "failed" and records["q0"]["error"]
+    assert State.load_from_file(str(output_dir / "q1.json")).report_title == "正常的条目"
@@ -0,0 +1,71 @@
+import json
+import pytest
+from state.state import State, Search
+from state.blob_store import BlobStore
+
+PAGE = "这是一段很长的网页正文。" * 2000
+
+
+def _make_state() -> State:
+    state = State(query="测试")
+    state.add_paragraph("背景", "介绍背景")
+    state.paragraphs[0].research.add_search_results("q", [
+        {"url": "https://a.com", "content": PAGE, "score": 0.5},
+        {"url": "https://b.com", "content": "短内容", "score": 0.3},
+    ], deduplicate=False)
+    state.add_paragraph("转载", "同一正文")
+    state.paragraphs[1].research.add_search_results("q", [{"url": "https://c.com", "content": PAGE}])
+    return state
+
+
+def test_blob_store_dedups_identical_content(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    ref = store.put(PAGE)
+    assert store.put(PAGE) == ref
+    assert store.get(ref) == PAGE
+    assert store.size() < len(PAGE.encode("utf-8"))
+
+
+def test_save_with_blob_store_shrinks_file_and_loads_lazily(tmp_path):
+    plain_path = str(tmp_path / "plain.json")
+    blob_path = str(tmp_path / "state.json")
+    _make_state().save_to_file(plain_path)
+
+    state = _make_state()
+    store = BlobStore.for_state_file(blob_path)
+    state.save_to_file(blob_path, blob_store=store)
+    assert len(open(blob_path, encoding="utf-8").read()) * 5 < len(open(plain_path, encoding="utf-8").read())
+
+    with open(blob_path, encoding="utf-8") as f:
+        saved = json.load(f)
+    searches = saved["paragraphs"][0]["research"]["search_history"]
+    assert searches[0]["content"] is None and searches[0]["content_ref"]
+    assert searches[1]["content"] == "短内容"
+    assert saved["paragraphs"][1]["research"]["search_history"][0]["content_ref"] == searches[0]["content_ref"]
+
+    loaded = State.load_from_file(blob_path, blob_store=store)
+    search = loaded.paragraphs[0].research.search_history[0]
+    assert not search.is_content_loaded
+    assert search.content == PAGE
+    assert search.is_content_loaded
+    search.release_content()
+    assert not search.is_content_loaded
+
+
+def test_search_content_setter_clears_ref():
+    search = Search(content="a")
+    assert search.to_dict()["content"] == "a"
+    search.content_ref = "abc"
+    search.content = "b"
+    assert search.content_ref == ""
+
+
+def test_unresolvable_content_ref_raises(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    search = Search(content=PAGE)
+    search.externalize(store)
+    detached = Search.from_dict(search.to_dict())
+    with pytest.raises(KeyError):
+        detached.content
+    detached._blob_store = store
+    assert detached.content == PAGE
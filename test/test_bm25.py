@@ -0,0 +1,72 @@
+import time
+from nodes.summary_node import FirstSummaryNode
+from llms.fake_llm import FakeLLM
+from state.state import Research, State
+from tools.fake_search import FakeSearch
+from utils.bm25 import PassageIndex, passages_to_results
+from utils.text_processing import tokenize
+
+BOILERPLATE = "首页 新闻 登录 注册 版权所有 联系我们 隐私政策。" * 30
+
+
+def test_tokenize_is_cjk_aware():
+    assert tokenize("半导体ETF涨幅") == ["半导", "导体", "etf", "涨幅"]
+    assert tokenize("央") == ["央"]
+
+
+def test_index_ranks_relevant_passage_and_supports_removal():
+    index = PassageIndex(passage_tokens=60)
+    index.add_document(0, BOILERPLATE + "光伏组件价格本月下跌百分之十。" + BOILERPLATE, "光伏", "https://a.com")
+    index.add_document(1, "锂电池产能扩张放缓，上游材料价格企稳。", "锂电", "https://b.com")
+    top, score = index.search("光伏组件价格", k=1)[0]
+    assert "光伏组件" in top.text and score > 0
+    assert [p.doc_id for p, _ in index.search("价格", k=3, doc_ids=[1])] == [1]
+
+    index.remove_document(1)
+    assert 1 not in index
+    assert all(p.doc_id == 0 for p, _ in index.search("锂电池产能", k=5))
+
+    results = passages_to_results(index.search("光伏组件价格", k=3))
+    assert len(results) == 1 and results[0]["url"] == "https://a.com" and results[0]["score"] == 1.0
+
+
+def test_research_indexes_incrementally():
+    research = Research()
+    research.add_search_results("q", [{"url": "https://a.com", "content": "央行下调存款准备金率。"}])
+    assert research.search_passages("准备金率")[0][0].doc_id == 0
+    research.add_search_results("q", [{"url": "https://b.com", "content": "外资连续三周净流入。"}])
+    assert len(research.get_passage_index()) == 2
+    assert research.search_passages("外资净流入", start=1)[0][0].url == "https://b.com"
+    # 合并重复结果时更新正文会重建该文档的段落
+    research.add_search_results("q", [{"url": "https://b.com", "content": "外资连续三周净流入，北向资金成交额显著放大。"}])
+    assert "北向资金" in research.search_passages("北向资金")[0][0].text
+
+
+def test_summary_prompt_carries_relevant_passages_only():
+    state = State(query="q")
+    paragraph = state.paragraphs[state.add_paragraph("光伏组件价格", "价格走势")]
+    paragraph.research.add_search_results("光伏", [{
+        "url": "https://a.com",
+        "content": BOILERPLATE + "光伏组件价格本月下跌百分之十。" + BOILERPLATE
+    }])
+    node = FirstSummaryNode(FakeLLM(), passage_top_k=1)
+    data = node.build_input(paragraph, "光伏组件价格")
+    assert "光伏组件价格本月下跌" in data["search_results"][0]
+    assert data["search_results"][0].count("版权所有") < 30
+
+
+def test_search_stays_fast_with_thousands_of_passages():
+    index = PassageIndex()
+    search = FakeSearch(content_chars=1500)
+    doc_id = 0
+    while len(index) < 3000:
+        for result in search.search(f"主题{doc_id}", max_results=5):
+            index.add_document(doc_id, result["content"])
+            doc_id += 1
+    index.search("外资净流入", k=8)
+    samples = []
+    for _ in range(20):
+        start = time.perf_counter()
+        index.search("外资净流入 估值修复 central bank easing", k=8)
+        samples.append(time.perf_counter() - start)
+    assert sorted(samples)[10] < 0.005
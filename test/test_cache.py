@@ -0,0 +1,32 @@
+from utils.cache import LRUCache, SQLiteCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    assert cache.set("c", 3) == 1
+    assert "a" in cache and "c" in cache
+    assert cache.get("b") is None
+
+
+def test_sqlite_cache_size_eviction(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), max_bytes=1000, compress=False)
+    for i in range(5):
+        cache.set(f"k{i}", b"x" * 300)
+    assert cache.total_bytes <= 1000
+    assert cache.get("k0") is None
+    assert cache.get("k4") == b"x" * 300
+    assert cache.stats.evictions == 2
+
+
+def test_sqlite_cache_ttl_and_compression(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = SQLiteCache(path)
+    cache.set("k", "内容".encode("utf-8") * 100)
+    assert cache.get("k").decode("utf-8") == "内容" * 100
+
+    expired = SQLiteCache(path, ttl=-1)
+    assert expired.get("k") is None
+    assert len(expired) == 0
@@ -0,0 +1,87 @@
+import utils.dedup
+from state.state import Research
+from utils.dedup import (
+    canonicalize_url,
+    deduplicate_results,
+    estimate_jaccard,
+    minhash_signature
+)
+
+ARTICLE = (
+    "The central bank kept interest rates unchanged on Wednesday, citing persistent inflation "
+    "in services and a resilient labour market. Officials signalled that cuts remain possible later "
+    "this year if price pressures ease, while markets priced in two reductions by December."
+)
+
+
+def test_canonicalize_url_strips_tracking_and_variants():
+    base = canonicalize_url("https://example.com/news/a")
+    assert canonicalize_url("http://www.example.com/news/a/?utm_source=x&utm_medium=y#top") == base
+    assert canonicalize_url("https://EXAMPLE.com:443/news/a?spm=1.2.3") == base
+    assert canonicalize_url("https://example.com/news/a?id=2&page=1") == canonicalize_url("https://example.com/news/a?page=1&id=2")
+    assert canonicalize_url("https://example.com/news/a?id=2") != base
+
+
+def test_canonicalize_url_keeps_content_params_and_spa_routes():
+    assert canonicalize_url("https://github.com/o/r/blob/x?ref=main") != canonicalize_url("https://github.com/o/r/blob/x?ref=dev")
+    assert canonicalize_url("https://forum.com/t?from=2&gclid=abc") == canonicalize_url("https://forum.com/t?from=2")
+    assert canonicalize_url("https://app.com/#/a") != canonicalize_url("https://app.com/#/b")
+    assert canonicalize_url("https://app.com/#!/a") == "https://app.com/#!/a"
+    assert canonicalize_url("https://app.com/page#section") == canonicalize_url("https://app.com/page")
+
+
+def test_minhash_similarity():
+    syndicated = ARTICLE.replace("Wednesday", "Wednesday afternoon") + " Reporting by staff."
+    unrelated = "A new smartphone with a folding screen went on sale across Asia, drawing long queues at stores."
+    assert estimate_jaccard(minhash_signature(ARTICLE), minhash_signature(syndicated)) > 0.7
+    assert estimate_jaccard(minhash_signature(ARTICLE), minhash_signature(unrelated)) < 0.2
+
+
+def test_deduplicate_results_merges_score():
+    results = [
+        {"url": "https://a.com/x", "content": ARTICLE, "score": 0.5},
+        {"url": "https://a.com/x?utm_campaign=z", "content": ARTICLE, "score": 0.9},
+        {"url": "https://mirror.net/copy", "content": ARTICLE + " Syndicated.", "score": 0.1},
+        {"url": "https://b.com/y", "content": "完全不同的内容，关于新能源汽车的销量与价格战。" * 3, "score": 0.4},
+    ]
+    kept = deduplicate_results(results)
+    assert [r["url"] for r in kept] == ["https://a.com/x", "https://b.com/y"]
+    assert kept[0]["score"] == 0.9
+    assert kept[0]["content"].endswith("Syndicated.")
+
+
+def test_research_add_search_results_skips_duplicates_across_rounds():
+    research = Research()
+    first = research.add_search_results("q1", [{"url": "https://a.com/x", "content": ARTICLE, "score": 0.3}])
+    second = research.add_search_results("q2", [
+        {"url": "https://www.a.com/x/?fbclid=1", "content": ARTICLE, "score": 0.8},
+        {"url": "https://c.com/z", "content": "另一篇文章" * 20}
+    ])
+    assert len(first) == 1 and len(second) == 1
+    assert research.get_search_count() == 2
+    assert research.search_history[0].score == 0.8
+    assert "_dedup" not in research.to_dict()
+
+    restored = Research.from_dict(research.to_dict())
+    assert restored.add_search_results("q3", [{"url": "https://a.com/x", "content": ARTICLE}]) == []
+    assert len(research.add_search_results("q3", [{"url": "https://a.com/x"}], deduplicate=False)) == 1
+
+
+def test_signature_is_computed_once_per_result(monkeypatch):
+    calls = []
+
+    def counting_signature(text, num_hashes=64, k=5):
+        calls.append(text)
+        return minhash_signature(text, num_hashes, k)
+
+    monkeypatch.setattr(utils.dedup, "minhash_signature", counting_signature)
+    results = [
+        {"url": f"https://example.com/{i}", "content": "".join(chr(0x4e00 + i * 500 + j) for j in range(200))}
+        for i in range(3)
+    ]
+    assert len(deduplicate_results(results)) == 3
+    assert len(calls) == 3
+
+    calls.clear()
+    Research().add_search_results("q", results)
+    assert len(calls) == 3
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from llms.fake_llm import FakeLLM, FakeLLMError
+from nodes.search_node import FirstSearchNode
+from tools.fake_search import FakeSearch
+from benchmarks.run_benchmarks import bench_report_throughput
+
+
+def test_first_search_node_offline():
+    llm = FakeLLM()
+    result = FirstSearchNode(llm).run({"title": "2025年A股走势分析", "content": "预测走势"})
+    assert result["search_query"] == "2025年A股走势分析 最新进展"
+    assert llm.calls == 1 and llm.completion_tokens > 0
+
+
+def test_fake_llm_failure_rate_is_deterministic():
+    def failures(seed):
+        llm = FakeLLM(failure_rate=0.5, seed=seed)
+        outcome = []
+        for _ in range(10):
+            try:
+                llm.invoke([{"role": "user", "content": "hi"}])
+                outcome.append(True)
+            except FakeLLMError:
+                outcome.append(False)
+        return outcome
+
+    assert failures(1) == failures(1)
+    assert not all(failures(1))
+    with pytest.raises(FakeLLMError):
+        asyncio.run(FakeLLM(failure_rate=1.0).ainvoke([{"role": "user", "content": "hi"}]))
+
+
+def test_fake_search_is_deterministic_and_ordered():
+    search = FakeSearch(content_chars=200)
+    assert search.search("A股") == search.search("A股")
+    many = asyncio.run(search.asearch_many(["A股", "港股"], max_results=2))
+    assert [r[0]["title"] for r in many] == ["A股 - 结果1", "港股 - 结果1"]
+
+
+def test_report_throughput_benchmark_smoke():
+    result = bench_report_throughput(paragraphs=3, concurrency=3, llm_latency=0.0,
+                                     tokens_per_second=0, search_latency=0.0)
+    assert result["completed"]
+    assert result["llm_calls"] == 6
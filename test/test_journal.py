@@ -0,0 +1,63 @@
+import os
+from state.state import State
+from state.journal import StateJournal
+
+
+def _run_session(state: State):
+    index = state.add_paragraph("背景", "介绍背景")
+    research = state.paragraphs[index].research
+    research.add_search_results("q1", [{"url": "https://a.com", "title": "A", "content": "内容A", "score": 0.4}])
+    research.add_search_results("q2", [{"url": "https://a.com?utm_source=x", "content": "内容A更完整", "score": 0.9}])
+    research.update_summary("第一版总结")
+    research.increment_reflection()
+    research.mark_completed()
+    state.add_paragraph("结论", "总结")
+
+
+def test_journal_appends_and_resumes(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = State(query="测试")
+    journal = state.enable_journal(path, compact_every=1000)
+    _run_session(state)
+
+    assert os.path.getsize(path) < 500
+    with open(journal.log_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 7
+
+    # 模拟崩溃：不关闭日志，直接从磁盘恢复
+    restored = State.load_from_file(path)
+    assert restored.to_dict()["paragraphs"][0]["research"]["latest_summary"] == "第一版总结"
+    assert [p.title for p in restored.paragraphs] == ["背景", "结论"]
+    research = restored.paragraphs[0].research
+    assert research.search_history[0].score == 0.9
+    assert research.search_history[0].content == "内容A更完整"
+    assert research.reflection_iteration == 1
+    assert research.is_completed
+    journal.close()
+
+
+def test_journal_compacts_and_ignores_torn_tail(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = State(query="测试")
+    state.enable_journal(path, compact_every=3)
+    _run_session(state)
+
+    with open(StateJournal.log_path_for(path), "a", encoding="utf-8") as f:
+        f.write('{"seq": 999, "op": "mark_comp')
+
+    restored = State.load_from_file(path, resume_journal=True)
+    assert restored.get_progress_summary()["total_paragraphs"] == 2
+    restored.paragraphs[1].research.update_summary("结论总结")
+    restored.paragraphs[1].research.mark_completed()
+
+    final = State.load_from_file(path)
+    assert final.is_completed is False
+    assert final.get_progress_summary()["is_completed"]
+
+
+def test_plain_save_still_works(tmp_path):
+    path = str(tmp_path / "plain.json")
+    state = State(query="测试")
+    _run_session(state)
+    state.save_to_file(path)
+    assert State.load_from_file(path).paragraphs[0].research.latest_summary == "第一版总结"
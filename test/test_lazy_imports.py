@@ -0,0 +1,47 @@
+import subprocess
+import sys
+from benchmarks.bench_import import ROOT, find_heavy_imports, parse_importtime
+
+
+def test_entry_points_do_not_import_heavy_sdks():
+    for module in ("main", "llms", "tools.search", "nodes.search_node"):
+        assert find_heavy_imports(module) == [], module
+
+
+def test_cli_entry_defers_asyncio_and_pipeline():
+    code = (
+        "import sys, main, agent, tools.search;"
+        "assert 'asyncio' not in sys.modules;"
+        "assert 'agent.pipeline' not in sys.modules;"
+        "agent.BatchItem; assert 'agent.batch' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+
+def test_prompts_are_built_on_first_access():
+    code = (
+        "import prompts.prompts as p, prompts;"
+        "assert 'SYSTEM_PROMPT_FIRST_SEARCH' not in vars(p);"
+        "assert 'OUTPUT JSON SCHEMA' in prompts.SYSTEM_PROMPT_FIRST_SEARCH;"
+        "assert 'SYSTEM_PROMPT_FIRST_SEARCH' in vars(p)"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+
+def test_llm_clients_are_created_lazily():
+    code = (
+        "import sys; from llms import OpenAILLM;"
+        "llm = OpenAILLM('m', {'api_key': 'k', 'base_url': 'http://localhost'});"
+        "assert 'openai' not in sys.modules;"
+        "llm.client; assert 'openai' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |   json.decoder\n"
+        "import time:       200 |        300 | json\n"
+    )
+    assert parse_importtime(stderr) == {"json.decoder": 100, "json": 300}
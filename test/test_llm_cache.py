@@ -0,0 +1,110 @@
+import asyncio
+from llms.base import BaseLLM
+from llms.cache import CachedLLM, make_cache_key
+
+
+class CountingLLM(BaseLLM):
+    def __init__(self):
+        super().__init__("fake-model", {"temperature": 0.7, "max_tokens": 128})
+        self.calls = 0
+
+    def invoke(self, messages, **kwargs) -> str:
+        self.calls += 1
+        return f"answer-{messages[-1]['content']}"
+
+    async def ainvoke(self, messages, **kwargs) -> str:
+        return self.invoke(messages, **kwargs)
+
+    def stream(self, messages, **kwargs):
+        self.calls += 1
+        yield "hello "
+        yield "world"
+
+
+MESSAGES = [
+    {"role": "system", "content": "system prompt"},
+    {"role": "user", "content": "{\"title\": \"A股\"}"}
+]
+
+
+def test_cache_key_normalizes_messages_and_params():
+    messy = [
+        {"role": "system", "content": "system prompt\r\n"},
+        {"role": "user", "content": "  {\"title\": \"A股\"}"}
+    ]
+    params = {"temperature": 0.7}
+    assert make_cache_key("m", MESSAGES, params) == make_cache_key("m", messy, params)
+    assert make_cache_key("m", MESSAGES, params) != make_cache_key("m", MESSAGES, {"temperature": 0.1})
+    assert make_cache_key("m", MESSAGES, params) != make_cache_key("other", MESSAGES, params)
+
+
+def test_invoke_and_ainvoke_hit_memory_tier():
+    inner = CountingLLM()
+    llm = CachedLLM(inner)
+
+    assert llm.invoke(MESSAGES) == llm.invoke(MESSAGES)
+    assert asyncio.run(llm.ainvoke(MESSAGES)) == "answer-{\"title\": \"A股\"}"
+    assert inner.calls == 1
+    assert llm.stats.hits == 2 and llm.stats.misses == 1
+
+    llm.invoke(MESSAGES, temperature=0.0)
+    assert inner.calls == 2
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    first = CachedLLM(CountingLLM(), cache_path=path)
+    first.invoke(MESSAGES)
+
+    inner = CountingLLM()
+    second = CachedLLM(inner, cache_path=path)
+    assert second.invoke(MESSAGES) == "answer-{\"title\": \"A股\"}"
+    assert inner.calls == 0
+    assert second.stats.disk_hits == 1
+
+
+def test_stream_replays_cached_text():
+    inner = CountingLLM()
+    llm = CachedLLM(inner, stream_chunk_size=3)
+
+    assert "".join(llm.stream(MESSAGES)) == "hello world"
+    replayed = list(llm.stream(MESSAGES))
+    assert "".join(replayed) == "hello world"
+    assert len(replayed) == 4
+    assert inner.calls == 1
+
+
+def test_ttl_expires_entries():
+    inner = CountingLLM()
+    llm = CachedLLM(inner, ttl=-1)
+    llm.invoke(MESSAGES)
+    llm.invoke(MESSAGES)
+    assert inner.calls == 2
+
+
+def test_transport_kwargs_do_not_split_cache():
+    from llms.resilience import ResilientLLM
+    inner = CountingLLM()
+    llm = ResilientLLM(CachedLLM(inner))
+    llm.invoke(MESSAGES)
+    llm.invoke(MESSAGES)
+    assert inner.calls == 1
+    cached = CachedLLM(CountingLLM())
+    assert cached.cache_key(MESSAGES, timeout=1) == cached.cache_key(MESSAGES, timeout=2)
+    assert cached.cache_key(MESSAGES, seed=1) != cached.cache_key(MESSAGES, seed=2)
+
+
+def test_disk_hit_keeps_original_expiry(tmp_path, monkeypatch):
+    import time
+    path = str(tmp_path / "llm_cache.sqlite")
+    CachedLLM(CountingLLM(), cache_path=path, ttl=100).invoke(MESSAGES)
+
+    later = time.time() + 90
+    monkeypatch.setattr(time, "time", lambda: later)
+    inner = CountingLLM()
+    llm = CachedLLM(inner, cache_path=path, ttl=100)
+    llm.invoke(MESSAGES)
+    assert inner.calls == 0
+    # 提升到内存的条目剩余约10秒，而不是重新获得100秒
+    _, expires_at = llm.memory._data[llm.cache_key(MESSAGES)]
+    assert expires_at <= later + 11
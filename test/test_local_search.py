@@ -0,0 +1,105 @@
+import os
+import json
+import asyncio
+import pytest
+from config import Config
+from state.raw_content import RawContentStore
+from tools.fake_search import FakeSearch
+from tools.local_search import LocalSearch
+from tools.search import SearchBackend, TavilySearch, create_search_backend
+
+DOCS = [
+    {"url": "https://a.com/rates", "title": "央行降息，利率下行", "content": "央行宣布下调政策利率，市场流动性改善，债券收益率下行。"},
+    {"url": "https://a.com/chips", "title": "半导体行业", "content": "半导体行业景气度回升，芯片库存持续去化。"},
+    {"url": "https://a.com/earnings", "title": "Earnings season", "content": "Quarterly earnings beat estimates; 利率 is not mentioned in the title."},
+]
+
+
+def _write_jsonl(path, docs):
+    with open(path, "w", encoding="utf-8") as f:
+        for doc in docs:
+            f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+
+
+def test_jsonl_ingest_ranks_by_bm25(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    _write_jsonl(corpus, DOCS)
+    backend = LocalSearch(str(tmp_path / "index.db"))
+    assert backend.ingest(str(corpus)).added == 3 and len(backend) == 3
+
+    results = backend.search("利率", max_results=5)
+    assert [r["url"] for r in results] == ["https://a.com/rates", "https://a.com/earnings"]
+    assert results[0]["score"] == 1.0 > results[1]["score"] > 0
+    assert set(results[0]) == {"title", "url", "content", "score", "raw_content_ref"}
+    assert backend.search("芯片 earnings", max_results=1)[0]["url"] in {"https://a.com/chips", "https://a.com/earnings"}
+    assert backend.search("。，") == []
+
+
+def test_jsonl_reingest_is_incremental(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    _write_jsonl(corpus, DOCS)
+    path = str(tmp_path / "index.db")
+    LocalSearch(path).ingest(str(corpus))
+
+    updated = [dict(DOCS[0], content="央行维持利率不变，关注通胀走势。"), DOCS[1]]
+    _write_jsonl(corpus, updated)
+    backend = LocalSearch(path)
+    stats = backend.ingest(str(corpus))
+    assert stats.to_dict() == {"added": 0, "updated": 1, "unchanged": 1, "removed": 1}
+    assert backend.search("通胀")[0]["url"] == "https://a.com/rates"
+    assert backend.search("下调") == []
+    assert backend.search("earnings") == []
+
+
+def test_directory_ingest_tracks_file_changes(tmp_path):
+    corpus = tmp_path / "docs"
+    corpus.mkdir()
+    (corpus / "a.md").write_text("# 新能源汽车\n\n销量同比增长，渗透率提升。", encoding="utf-8")
+    (corpus / "b.txt").write_text("光伏装机\n组件价格下降。", encoding="utf-8")
+    (corpus / "skip.bin").write_text("新能源", encoding="utf-8")
+    backend = LocalSearch(str(tmp_path / "index.db"))
+    assert backend.ingest(str(corpus)).added == 2
+
+    result = backend.search("新能源")[0]
+    assert result["title"] == "新能源汽车" and result["url"].startswith("file://")
+
+    (corpus / "b.txt").write_text("光伏装机\n储能需求旺盛。", encoding="utf-8")
+    os.utime(corpus / "b.txt", ns=(1, 1))
+    (corpus / "a.md").unlink()
+    stats = backend.ingest(str(corpus))
+    assert (stats.updated, stats.removed) == (1, 1)
+    assert backend.search("新能源") == []
+    assert backend.search("储能")[0]["title"] == "光伏装机"
+    assert backend.ingest(str(corpus)).unchanged == 1
+
+
+def test_long_documents_return_relevant_passage_and_raw_content(tmp_path):
+    filler = "无关的背景介绍。" * 400
+    with RawContentStore(max_bytes=1 << 20) as store:
+        backend = LocalSearch(str(tmp_path / "index.db"), max_content_chars=300, raw_store=store)
+        backend.add_documents([{"url": "https://long.com", "title": "长文", "content": filler + "关键结论：出口显著回暖。" + filler}])
+        result = backend.search("出口回暖")[0]
+        assert "出口显著回暖" in result["content"] and len(result["content"]) <= 300
+        assert store.handle(result["raw_content_ref"]).read().count("无关") == 800
+
+
+def test_async_search_many(tmp_path):
+    backend = LocalSearch(str(tmp_path / "index.db"))
+    backend.add_documents(DOCS)
+    results = asyncio.run(backend.asearch_many(["半导体", "利率", "不存在的词汇"], max_results=1))
+    assert [[r["url"] for r in rs] for rs in results] == [["https://a.com/chips"], ["https://a.com/rates"], []]
+
+
+def test_backends_selected_by_config(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    _write_jsonl(corpus, DOCS)
+    config = Config(search_backend="local", local_search_index=str(tmp_path / "index.db"), local_search_corpus=str(corpus))
+    backend = create_search_backend(config.search_backend, config.get_search_config())
+    assert isinstance(backend, LocalSearch) and len(backend) == 3
+    assert create_search_backend("local", config.get_search_config()) is backend
+    assert isinstance(create_search_backend("fake"), FakeSearch)
+    assert issubclass(TavilySearch, SearchBackend) and isinstance(backend, SearchBackend)
+    with pytest.raises(ValueError):
+        Config(search_backend="bing").get_search_config()
+    with pytest.raises(ValueError):
+        create_search_backend("bing")
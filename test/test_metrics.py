@@ -0,0 +1,77 @@
+import json
+import asyncio
+from llms.fake_llm import FakeLLM
+from nodes.search_node import FirstSearchNode
+from utils.metrics import MetricsRegistry, get_registry, timed
+
+INPUT = {"title": "A股", "content": "走势"}
+
+
+def test_registry_exports_prometheus_and_json(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc("requests_total", component="x")
+    registry.inc("requests_total", 2, component="x")
+    registry.observe("latency_seconds", 0.5, component='quote"d')
+
+    assert registry.get_counter("requests_total", component="x") == 3
+    text = registry.to_prometheus()
+    assert 'requests_total{component="x"} 3' in text
+    assert 'latency_seconds_count{component="quote\\"d"} 1' in text
+
+    path = tmp_path / "metrics.json"
+    registry.export_json(str(path))
+    assert json.loads(path.read_text())["summaries"]["latency_seconds"][0]["max"] == 0.5
+
+
+def test_nodes_and_llms_are_instrumented(tmp_path):
+    registry = get_registry()
+    registry.reset()
+    llm = FakeLLM(model_name="fake-metrics")
+    node = FirstSearchNode(llm)
+    node.run(INPUT)
+    asyncio.run(node.arun(INPUT))
+
+    assert registry.get_counter("node_runs_total", component="FirstSearchNode", method="run", status="ok") == 1
+    assert registry.get_counter("node_runs_total", component="FirstSearchNode", method="arun", status="ok") == 1
+    assert registry.get_counter("llm_calls_total", component="FakeLLM", model="fake-metrics", method="ainvoke", status="ok") == 1
+    assert registry.get_counter("llm_completion_tokens_total", model="fake-metrics") == llm.completion_tokens
+
+    path = tmp_path / "trace.json"
+    registry.export_trace(str(path))
+    names = [event["name"] for event in json.loads(path.read_text())["traceEvents"]]
+    assert "FirstSearchNode.run" in names and "FakeLLM.invoke" in names
+
+
+def test_fallback_and_errors_are_counted():
+    registry = get_registry()
+    registry.reset()
+    FirstSearchNode(FakeLLM(responder=lambda messages: "无法生成")).run(INPUT)
+    assert registry.get_counter("fallbacks_total", component="FirstSearchNode", reason="default_query") == 1
+
+    try:
+        FakeLLM(failure_rate=1.0).invoke([{"role": "user", "content": "hi"}])
+    except RuntimeError:
+        pass
+    assert registry.get_counter("llm_calls_total", component="FakeLLM", model="fake-llm", method="invoke", status="error") == 1
+
+
+def test_concurrent_async_spans_get_separate_trace_tracks():
+    registry = get_registry()
+    registry.reset()
+
+    async def work(name: str):
+        with timed("work_seconds", "test", name):
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(work("a"), work("b"))
+
+    asyncio.run(main())
+    with timed("work_seconds", "test", "sync"):
+        pass
+
+    events = [event for event in registry.to_trace_events()["traceEvents"] if event["ph"] == "X"]
+    tids = {event["name"]: event["tid"] for event in events}
+    assert len({tids["a"], tids["b"], tids["sync"]}) == 3
+    lanes = [event for event in registry.to_trace_events()["traceEvents"] if event["ph"] == "M"]
+    assert {event["tid"] for event in lanes} == set(tids.values())
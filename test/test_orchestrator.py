@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from agent.orchestrator import ParagraphOrchestrator, estimate_remaining_work
+from state.state import State, Search
+
+
+def _make_state(count: int = 4) -> State:
+    state = State(query="测试")
+    for i in range(count):
+        state.add_paragraph(f"段落{i}", f"内容{i}")
+    return state
+
+
+def test_estimate_remaining_work():
+    state = _make_state(2)
+    fresh, partial = state.paragraphs
+    partial.research.add_search(Search(query="q", content="c"))
+    partial.research.latest_summary = "summary"
+    partial.research.increment_reflection()
+
+    assert estimate_remaining_work(fresh, max_reflections=2) == 4
+    assert estimate_remaining_work(partial, max_reflections=2) == 1
+
+    partial.research.mark_completed()
+    assert estimate_remaining_work(partial) == 0
+
+
+def test_orchestrator_runs_concurrently_and_completes_state():
+    state = _make_state(6)
+    running = 0
+    peak = 0
+
+    async def researcher(paragraph):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        paragraph.research.latest_summary = f"{paragraph.title} 总结"
+        paragraph.research.mark_completed()
+
+    report = ParagraphOrchestrator(researcher, max_concurrency=3).run_sync(state)
+
+    assert peak == 3
+    assert state.is_completed
+    assert all(t.status == "done" for t in report.timelines)
+    assert report.wall_time < report.total_run_time
+
+
+def test_orchestrator_prioritizes_most_remaining_work():
+    state = _make_state(3)
+    state.paragraphs[0].research.latest_summary = "已有总结"
+    state.paragraphs[0].research.add_search(Search(query="q"))
+    started = []
+
+    async def researcher(paragraph):
+        started.append(paragraph.order)
+
+    ParagraphOrchestrator(researcher, max_concurrency=1).run_sync(state)
+    assert started == [1, 2, 0]
+
+
+def test_orchestrator_records_failures():
+    state = _make_state(2)
+
+    async def researcher(paragraph):
+        if paragraph.order == 1:
+            raise RuntimeError("boom")
+
+    report = ParagraphOrchestrator(researcher, max_concurrency=2).run_sync(state)
+    assert [t.status for t in report.timelines] == ["done", "failed"]
+    assert report.failed[0].error == "boom"
+
+    with pytest.raises(RuntimeError):
+        ParagraphOrchestrator(researcher, max_concurrency=2, fail_fast=True).run_sync(_make_state(2))
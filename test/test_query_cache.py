@@ -0,0 +1,102 @@
+import asyncio
+from tools.query_cache import QuerySimilarityCache, TfidfIndex, query_terms
+from tools.search import TavilySearch
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query, **kwargs):
+        self.calls += 1
+        return {"results": [{"title": query, "url": f"https://a.com/{self.calls}", "content": query, "score": 0.5}]}
+
+
+def test_query_terms_skip_single_characters_and_function_words():
+    assert query_terms("A股走势") == ["股走", "走势"]
+    assert query_terms("the Rate outlooks") == ["rate", "outlook"]
+    assert query_terms("量子计算的优点") == ["量子", "子计", "计算", "优点"]
+    assert query_terms("，。！") == []
+
+
+def test_tfidf_similarity_ranks_paraphrase_first():
+    index = TfidfIndex(dim=1024, capacity=8)
+    for query in ["美联储加息对中国股市的影响", "新能源汽车销量增长原因", "semiconductor supply chain risks"]:
+        index.add(query)
+    scores = index.similarities("新能源车销量增长的原因")
+    assert scores.argmax() == 1
+    assert index.similarities("semiconductor supply-chain risk").argmax() == 2
+    assert scores.max() > 3 * sorted(scores)[-2]
+
+
+def test_index_evicts_oldest_rows():
+    index = TfidfIndex(dim=256, capacity=2)
+    index.add("first query")
+    index.add("second query")
+    assert index.add("third query") == 0
+    assert len(index) == 2
+    assert index.similarities("third query").argmax() == 0
+
+
+def test_cache_hit_rules_and_stats():
+    cache = QuerySimilarityCache(threshold=0.6)
+    results = [{"title": "t", "url": "https://a.com", "content": "c", "score": 0.9}]
+    cache.add("人工智能对就业的影响", results, max_results=5, include_raw_content=False, cost=1.5)
+
+    assert cache.lookup("人工智能对就业影响", 5, include_raw_content=False) == results
+    # 需要原始正文、要求更多结果、或数字不同时都不能复用
+    assert cache.lookup("人工智能对就业影响", 5, include_raw_content=True) is None
+    assert cache.lookup("人工智能对就业影响", 10, include_raw_content=False) is None
+    assert cache.lookup("2025年人工智能对就业的影响", 5, include_raw_content=False) is None
+    assert cache.lookup("欧洲天然气价格", 5, include_raw_content=False) is None
+
+    assert cache.stats.hits == 1 and cache.stats.lookups == 5
+    assert cache.stats.saved_seconds == 1.5
+    assert cache.stats.to_dict()["hit_rate"] == 0.2
+
+
+def test_merge_combines_similar_entries():
+    cache = QuerySimilarityCache(threshold=0.5, merge=True)
+    cache.add("semiconductor supply chain risks", [{"url": "a", "score": 0.4}, {"url": "b", "score": 0.9}])
+    cache.add("semiconductor supply chain risk", [{"url": "a", "score": 0.8}, {"url": "c", "score": 0.1}])
+    merged = cache.lookup("semiconductor supply-chain risks", max_results=3)
+    assert [r["url"] for r in merged] == ["b", "a", "c"]
+    assert merged[1]["score"] == 0.8
+    assert cache.stats.merged_hits == 1
+
+
+def test_tavily_search_reuses_similar_queries():
+    searcher = TavilySearch(api_key="test-key", similar_cache=QuerySimilarityCache(threshold=0.8))
+    searcher.client = FakeClient()
+
+    first = searcher.search("Federal Reserve interest rate outlook")
+    assert searcher.search("federal reserve rate outlook") == first
+    assert searcher.client.calls == 1
+
+    searcher.search("European natural gas prices")
+    assert searcher.client.calls == 2
+
+    async def fake_post(query, max_results, include_raw_content):
+        raise AssertionError("不应请求API")
+
+    searcher._apost_search = fake_post
+    assert asyncio.run(searcher.asearch("Federal Reserve rate outlook")) == first
+    assert searcher.similar_cache.stats.hits == 2
+
+
+def test_similar_wording_on_a_different_topic_is_not_reused():
+    cache = QuerySimilarityCache(threshold=0.75)
+    cache.add("history of the Roman empire", [{"url": "https://rome.example"}])
+    cache.add("量子计算的优点和应用前景", [{"url": "https://quantum.example"}])
+
+    # 字面相近但主题不同：即使相似度超过阈值，最稀有的字词（ottoman、缺）不在缓存的查询中也不复用
+    assert cache.index.similarities("量子计算的缺点和应用前景").max() >= cache.threshold
+    assert cache.lookup("量子计算的缺点和应用前景") is None
+    # 只是虚词不同的改写仍然命中
+    assert cache.lookup("量子计算优点与应用前景") == [{"url": "https://quantum.example"}]
+    assert cache.stats.hits == 1
+
+    loose = QuerySimilarityCache(threshold=0.5)
+    loose.add("history of the Roman empire", [{"url": "https://rome.example"}])
+    assert loose.index.similarities("history of the Ottoman empire").max() >= loose.threshold
+    assert loose.lookup("history of the Ottoman empire") is None
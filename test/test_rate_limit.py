@@ -0,0 +1,127 @@
+import asyncio
+import time
+import pytest
+from llms.fake_llm import FakeLLM
+from utils.rate_limit import (
+    AIMDConfig,
+    AIMDLimiter,
+    RateLimiter,
+    TokenBucket,
+    get_rate_limiter,
+    is_throttle_error,
+    reset_rate_limiters
+)
+
+
+class Throttled(Exception):
+    status_code = 429
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(rate_per_minute=600, capacity=2)
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    wait = bucket.reserve(1)
+    assert 0.05 < wait <= 0.11
+    bucket.charge(-5)
+    assert bucket.available <= 2
+
+
+def test_aimd_increase_and_decrease():
+    limiter = AIMDLimiter(AIMDConfig(initial=4, max_limit=8, cooldown=0, latency_spike_factor=2.0))
+    for _ in range(40):
+        limiter.on_success(0.1, 10)
+    assert limiter.limit == 8
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    limiter.on_success(1.0, 10)
+    assert limiter.limit == 2
+
+
+def test_aimd_normalizes_latency_per_output_token():
+    limiter = AIMDLimiter(AIMDConfig(initial=4, cooldown=0, latency_spike_factor=2.0))
+    for _ in range(10):
+        limiter.on_success(0.1, 10)
+    # 输出更长的请求耗时更久，但每个token的耗时不变
+    limiter.on_success(5.0, 500)
+    limiter.on_success(5.0)
+    assert limiter.limit >= 4
+    assert AIMDLimiter(AIMDConfig(initial=4, cooldown=0)).config.latency_spike_factor is None
+
+
+def test_llm_has_no_limiter_without_budget():
+    from config import Config
+    config = Config(openai_api_key="k", openai_base_url="http://localhost")
+    assert FakeLLM(config=config.get_llm_config()).rate_limiter is None
+    config.llm_requests_per_minute = 600
+    limiter = FakeLLM(config=config.get_llm_config()).rate_limiter
+    assert limiter is not None and limiter.concurrency is None
+    config.llm_adaptive_concurrency = 8
+    reset_rate_limiters()
+    assert FakeLLM(config=config.get_llm_config()).rate_limiter.concurrency.limit == 8
+    reset_rate_limiters()
+
+
+def test_limiter_feeds_output_tokens_to_aimd():
+    reset_rate_limiters()
+    llm = FakeLLM(config={"rate_limit": {"name": "llm:aimd", "aimd": {"initial": 4, "latency_spike_factor": 2.0}}})
+    llm.invoke([{"role": "user", "content": "你好"}])
+    assert llm.rate_limiter.concurrency._baseline is not None
+    reset_rate_limiters()
+
+
+def test_aimd_bounds_concurrency():
+    limiter = AIMDLimiter(AIMDConfig(initial=2, max_limit=2))
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        await limiter.aacquire()
+        try:
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+        finally:
+            limiter.release()
+
+    async def main():
+        await asyncio.gather(*(work() for _ in range(10)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+def test_rate_limiter_backs_off_on_throttle():
+    limiter = RateLimiter("test", aimd=AIMDConfig(initial=8, cooldown=0))
+    with pytest.raises(Throttled):
+        with limiter.limit():
+            raise Throttled()
+    assert limiter.concurrency.limit == 4
+    assert limiter.concurrency.in_flight == 0
+    assert is_throttle_error(Throttled())
+    assert not is_throttle_error(ValueError())
+
+
+def test_shared_limiter_for_llms():
+    reset_rate_limiters()
+    config = {"rate_limit": {"name": "llm:shared", "requests_per_minute": 6000, "aimd": {"initial": 4}}}
+    first = FakeLLM(config=config)
+    second = FakeLLM(config=config)
+    assert first.rate_limiter is second.rate_limiter
+    assert get_rate_limiter("llm:shared") is first.rate_limiter
+
+    messages = [{"role": "user", "content": "你好"}]
+    first.invoke(messages)
+    asyncio.run(second.ainvoke(messages))
+    assert first.rate_limiter.concurrency.in_flight == 0
+    assert FakeLLM().rate_limiter is None
+
+
+def test_requests_per_minute_is_enforced():
+    limiter = RateLimiter("rpm", requests_per_minute=1200)
+    limiter.requests = TokenBucket(1200, capacity=1)
+    start = time.perf_counter()
+    for _ in range(4):
+        with limiter.limit():
+            pass
+    assert time.perf_counter() - start >= 0.12
@@ -0,0 +1,94 @@
+import os
+from state.raw_content import RawContentStore, resolve_raw_content
+from state.state import Research, Search
+from tools.search import SearchCache, SearchResult, TavilySearch
+
+PAGE = "<html>" + "完整网页正文。" * 200 + "</html>"
+
+
+class RawClient:
+    def __init__(self):
+        self.kwargs = []
+
+    def search(self, query, **kwargs):
+        self.kwargs.append(kwargs)
+        return {"results": [{"title": "t", "url": "https://a.com", "content": "摘要", "score": 0.5, "raw_content": PAGE}]}
+
+
+def test_store_spills_and_reads_lazily():
+    with RawContentStore(max_bytes=1 << 20) as store:
+        handle = store.put(PAGE)
+        assert handle.size == len(PAGE.encode("utf-8"))
+        assert os.path.exists(os.path.join(store.root, f"{handle.ref.split('/')[1]}.txt"))
+        assert handle.read() == PAGE
+        with handle.open() as mm:
+            assert mm.find("</html>".encode("utf-8")) > 0
+        assert store.put(PAGE).ref == handle.ref and store.total_bytes == handle.size
+        root = store.root
+    assert not os.path.exists(root)
+    assert resolve_raw_content(handle.ref) is None
+
+
+def test_store_evicts_least_recently_used():
+    pages = [f"第{i}页" * 100 for i in range(3)]
+    size = len(pages[0].encode("utf-8"))
+    with RawContentStore(max_bytes=2 * size) as store:
+        first, second = store.put(pages[0]), store.put(pages[1])
+        first.read()
+        third = store.put(pages[2])
+        assert not second.is_available and first.is_available and third.is_available
+        assert store.total_bytes == 2 * size and store.evictions == 1
+        assert store.put("x" * (3 * size)) is None
+
+
+def test_search_keeps_raw_content_handle(tmp_path):
+    store = RawContentStore(str(tmp_path / "raw"))
+    searcher = TavilySearch(api_key="test-key", raw_store=store)
+    searcher.client = RawClient()
+    results = searcher.search("q")
+    assert "raw_content" not in results[0]
+    assert SearchResult.from_dict(results[0]).raw_content.read() == PAGE
+
+    research = Research()
+    research.add_search_results("q", results)
+    search = Search.from_dict(research.search_history[0].to_dict())
+    assert search.raw_content.read() == PAGE
+
+    # 没有溢出目录时不再请求原始正文
+    plain = TavilySearch(api_key="test-key")
+    plain.client = RawClient()
+    plain.search("q")
+    assert plain.client.kwargs[0]["include_raw_content"] is False
+
+    # 同一目录重新打开时恢复已有正文
+    reopened = RawContentStore(str(tmp_path / "raw"), session_id=store.session_id)
+    assert reopened.total_bytes == store.total_bytes
+
+    # 其他会话留在同一目录中的正文不会被接管
+    other = RawContentStore(str(tmp_path / "raw"))
+    assert other.total_bytes == 0
+    other.close()
+
+
+def test_store_under_base_dir_is_owned_and_removed(tmp_path):
+    store = RawContentStore(base_dir=str(tmp_path / "spill"), max_bytes=1 << 20)
+    assert store.owns_root and os.path.dirname(store.root) == str(tmp_path / "spill")
+    store.put(PAGE)
+    store.close()
+    assert not os.path.exists(store.root)
+
+
+def test_persistent_cache_misses_when_raw_refs_are_from_another_session(tmp_path):
+    cache_path = str(tmp_path / "search.db")
+    first = TavilySearch(api_key="test-key", cache=SearchCache(cache_path), raw_store=RawContentStore(max_bytes=1 << 20))
+    first.client = RawClient()
+    first.search("q")
+    assert first.search("q")[0]["raw_content_ref"] and len(first.client.kwargs) == 1
+    first.raw_store.close()
+
+    second = TavilySearch(api_key="test-key", cache=SearchCache(cache_path), raw_store=RawContentStore(max_bytes=1 << 20))
+    second.client = RawClient()
+    results = second.search("q")
+    assert len(second.client.kwargs) == 1
+    assert SearchResult.from_dict(results[0]).raw_content.read() == PAGE
+    second.raw_store.close()
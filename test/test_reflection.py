@@ -0,0 +1,93 @@
+import asyncio
+from agent.pipeline import ResearchPipeline
+from llms.fake_llm import FakeLLM
+from nodes.search_node import FirstSearchNode, ReflectionNode
+from state.state import State, Research
+from tools.fake_search import FakeSearch
+from utils.metrics import get_registry
+from utils.novelty import ReflectionPolicy, research_novelty, score_novelty, known_shingles
+
+ARTICLE = "央行宣布下调存款准备金率0.5个百分点，释放长期资金约一万亿元，市场普遍认为此举有助于稳定经济增长预期。"
+
+
+def test_score_novelty_penalizes_known_urls_and_reposts():
+    known = known_shingles([ARTICLE])
+    urls = {"https://news.com/a"}
+
+    same_url = score_novelty([{"url": "http://www.news.com/a?utm_source=x", "content": "完全不同的全新内容" * 5}], urls, known)
+    assert same_url.gain == 0.0 and same_url.url_novelty == 0.0
+
+    repost = score_novelty([{"url": "https://mirror.com/a", "content": ARTICLE}], urls, known)
+    assert repost.url_novelty == 1.0 and repost.gain == 0.0
+
+    fresh = score_novelty([{"url": "https://b.com", "content": "新能源汽车出口量同比增长超过七成，带动相关产业链订单回升。"}], urls, known)
+    assert fresh.gain > 0.9
+
+
+def test_research_novelty_uses_summary_and_history():
+    research = Research(latest_summary=ARTICLE)
+    research.add_search_results("q", [{"url": "https://a.com", "content": "新能源汽车出口量同比增长超过七成。"}])
+    score = research_novelty([
+        {"url": "https://c.com", "content": ARTICLE},
+        {"url": "https://d.com", "content": "新能源汽车出口量同比增长超过七成。"}
+    ], research)
+    assert score.new_urls == 2 and score.gain == 0.0
+
+
+def test_research_novelty_tracks_new_results_and_summaries():
+    research = Research()
+    first = research.get_known_content()
+    research.add_search_results("q", [{"url": "https://a.com", "content": ARTICLE}])
+    research.update_summary("新能源汽车出口量同比增长超过七成。")
+    assert research.get_known_content() is first
+    score = research_novelty([
+        {"url": "https://a.com/", "content": "完全不同的全新内容" * 5},
+        {"url": "https://d.com", "content": "新能源汽车出口量同比增长超过七成。"}
+    ], research)
+    assert score.new_urls == 1 and score.gain == 0.0
+    # 换一个shingle长度时重新构建
+    assert research.get_known_content(3).k == 3
+
+
+def test_search_nodes_keep_their_names():
+    assert FirstSearchNode(FakeLLM()).node_name == "FirstSearchNode"
+    assert FirstSearchNode(FakeLLM(), "自定义").node_name == "自定义"
+    assert ReflectionNode(FakeLLM()).node_name == "ReflectionNode"
+
+
+def test_reflection_node_generates_query():
+    node = ReflectionNode(FakeLLM())
+    assert not node.validate_input({"title": "t", "content": "c"})
+    result = asyncio.run(node.arun({"title": "芯片", "content": "c", "paragraph_latest_state": "s"}))
+    assert result["search_query"] == "芯片 最新进展"
+
+
+class SeededSearch(FakeSearch):
+    """每次调用返回全新的文档"""
+
+    async def asearch(self, query, max_results=5, **kwargs):
+        return self._results(f"{query}#{self.calls}", max_results)
+
+
+def test_reflection_stops_when_gain_is_low():
+    get_registry().reset()
+    llm, search = FakeLLM(), FakeSearch()
+    state = State(query="半导体")
+    pipeline = ResearchPipeline(llm, search, reflection=ReflectionPolicy(max_rounds=3))
+    asyncio.run(pipeline.run(state))
+    # 反思查询与首次查询相同，重复结果没有增益：每段落只多一次反思与一次搜索，不再总结
+    assert all(p.research.reflection_iteration == 1 for p in state.paragraphs)
+    assert search.calls == 10
+    assert llm.calls == 1 + 5 * 3 + 1
+    assert get_registry().get_counter("reflection_stops_total", reason="low_gain") == 5
+
+
+def test_reflection_runs_until_budget_when_results_stay_novel():
+    get_registry().reset()
+    llm, search = FakeLLM(), SeededSearch()
+    state = State(query="半导体")
+    pipeline = ResearchPipeline(llm, search, reflection=ReflectionPolicy(max_rounds=2))
+    asyncio.run(pipeline.run(state))
+    assert all(p.research.reflection_iteration == 2 and p.is_completed for p in state.paragraphs)
+    assert llm.calls == 1 + 5 * (2 + 2 * 2) + 1
+    assert get_registry().get_counter("reflection_stops_total", reason="budget") == 5
@@ -0,0 +1,126 @@
+import time
+import asyncio
+from agent.batch import BatchRunner, BatchItem
+from agent.pipeline import ResearchPipeline
+from agent.report_stream import FileSink, QueueSink, StreamingReportAssembler
+from llms.fake_llm import FakeLLM
+from state.state import State
+from tools.fake_search import FakeSearch
+
+
+class DelayedPipeline(ResearchPipeline):
+    def __init__(self, *args, delays, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delays = delays
+
+    async def research_paragraph(self, paragraph):
+        await asyncio.sleep(self.delays[paragraph.order])
+        await super().research_paragraph(paragraph)
+
+
+async def _collect(pipeline, state):
+    sink = QueueSink()
+    chunks, first_at = [], None
+
+    async def consume():
+        nonlocal first_at
+        async for chunk in sink:
+            first_at = first_at or time.perf_counter()
+            chunks.append(chunk)
+
+    consumer = asyncio.create_task(consume())
+    start = time.perf_counter()
+    await pipeline.run(state, sink=sink)
+    finished_at = time.perf_counter()
+    await consumer
+    return "".join(chunks), first_at - start, finished_at - start
+
+
+def test_sections_are_written_in_order_as_paragraphs_finish():
+    state = State(query="新能源")
+    pipeline = DelayedPipeline(FakeLLM(), FakeSearch(), max_concurrency=5, delays=[0.0, 0.3, 0.1, 0.1, 0.2])
+    text, first, total = asyncio.run(_collect(pipeline, state))
+
+    assert text == state.final_report
+    assert text.startswith("# 新能源\n\n")
+    titles = [line[3:] for line in text.splitlines() if line.startswith("## ")]
+    assert titles == [p.title for p in state.paragraphs] + ["结论"]
+    # 第一个段落完成后立即输出，不等待最慢的段落
+    assert first < 0.2 < total
+
+
+def test_failed_section_falls_back_to_raw_content():
+    class BrokenStreamLLM(FakeLLM):
+        async def astream(self, messages, **kwargs):
+            raise RuntimeError("stream failed")
+            yield
+
+    state = State(query="q")
+    paragraph = state.paragraphs[state.add_paragraph("标题", "内容")]
+    paragraph.research.update_summary("段落总结")
+    paragraph.research.mark_completed()
+
+    async def run():
+        assembler = StreamingReportAssembler(BrokenStreamLLM(), QueueSink())
+        assembler.start(state)
+        return await assembler.finish(state)
+
+    # 结论生成同样失败且没有输出，整节省略
+    assert asyncio.run(run()) == "# q\n\n## 标题\n\n段落总结"
+
+
+def test_partial_section_failure_cancels_remaining_sections():
+    class PartialStreamLLM(FakeLLM):
+        async def astream(self, messages, **kwargs):
+            self.calls += 1
+            yield "## 部分"
+            if "失败" in messages[-1]["content"]:
+                raise RuntimeError("stream broke")
+            await asyncio.sleep(10)
+            yield "不应输出"
+
+    state = State(query="q")
+    for title in ("失败", "慢"):
+        paragraph = state.paragraphs[state.add_paragraph(title, "内容")]
+        paragraph.research.update_summary("段落总结")
+        paragraph.research.mark_completed()
+    llm = PartialStreamLLM()
+
+    async def run():
+        assembler = StreamingReportAssembler(llm, QueueSink())
+        assembler.start(state)
+        try:
+            await assembler.finish(state)
+        except RuntimeError as e:
+            pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            return e, pending
+
+    error, pending = asyncio.run(run())
+    assert str(error) == "stream broke"
+    assert pending == []
+    assert state.final_report == ""
+
+
+def test_batch_streams_report_to_file(tmp_path):
+    output_dir = str(tmp_path / "runs")
+    runner = BatchRunner(lambda: ResearchPipeline(FakeLLM(), FakeSearch()), output_dir, stream_reports=True)
+    result = asyncio.run(runner.run([BatchItem(id="q0", query="消费复苏")]))[0]
+    assert result.status == "done"
+    with open(result.report_path, encoding="utf-8") as f:
+        report = f.read()
+    assert report.startswith("# 消费复苏\n\n")
+    assert report.count("## ") == 6
+
+
+def test_finished_state_writes_existing_report(tmp_path):
+    state = State(query="q")
+    paragraph = state.paragraphs[state.add_paragraph("标题", "内容")]
+    paragraph.research.update_summary("段落总结")
+    paragraph.research.mark_completed()
+    state.set_final_report("# 已完成")
+    llm = FakeLLM()
+    path = str(tmp_path / "done.md")
+    asyncio.run(ResearchPipeline(llm, FakeSearch()).run(state, sink=FileSink(path)))
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "# 已完成"
+    assert llm.calls == 0
@@ -0,0 +1,128 @@
+import asyncio
+import time
+import pytest
+from llms.base import BaseLLM
+from llms.resilience import ResiliencePolicy, ResilientLLM, LLMDeadlineExceeded, is_retryable_error
+from utils.metrics import get_registry
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class ScriptedLLM(BaseLLM):
+    """按脚本依次返回延迟/异常的测试LLM"""
+
+    def __init__(self, script):
+        super().__init__("scripted", {})
+        self.script = list(script)
+        self.calls = 0
+
+    def _next(self):
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        return step
+
+    def invoke(self, messages, **kwargs):
+        delay, outcome = self._next()
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def ainvoke(self, messages, **kwargs):
+        delay, outcome = self._next()
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def stream(self, messages, **kwargs):
+        delay, outcome = self._next()
+        if isinstance(outcome, Exception):
+            raise outcome
+        yield from outcome
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_is_retryable_error():
+    assert is_retryable_error(RateLimited())
+    assert is_retryable_error(TimeoutError())
+    assert not is_retryable_error(BadRequest())
+    assert not is_retryable_error(ValueError())
+
+
+def test_retry_then_succeed():
+    get_registry().reset()
+    llm = ScriptedLLM([(0, RateLimited("429")), (0, RateLimited("429")), (0, "ok")])
+    resilient = ResilientLLM(llm, ResiliencePolicy(max_retries=3, base_delay=0.001), seed=1)
+    assert resilient.invoke(MESSAGES) == "ok"
+    assert llm.calls == 3
+    assert get_registry().counter_total("llm_retries_total") == 2
+
+
+def test_non_retryable_and_exhausted():
+    llm = ScriptedLLM([(0, BadRequest("400"))])
+    with pytest.raises(BadRequest):
+        ResilientLLM(llm, ResiliencePolicy(base_delay=0.001)).invoke(MESSAGES)
+    assert llm.calls == 1
+
+    llm = ScriptedLLM([(0, RateLimited("429"))])
+    with pytest.raises(RateLimited):
+        ResilientLLM(llm, ResiliencePolicy(max_retries=2, base_delay=0.001)).invoke(MESSAGES)
+    assert llm.calls == 3
+
+
+def test_async_deadline():
+    llm = ScriptedLLM([(1.0, "slow")])
+    resilient = ResilientLLM(llm, ResiliencePolicy(deadline=0.05))
+    start = time.perf_counter()
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(resilient.ainvoke(MESSAGES))
+    assert time.perf_counter() - start < 0.5
+
+
+def test_async_hedge_wins_over_slow_primary():
+    get_registry().reset()
+    llm = ScriptedLLM([(0.01, "warm")] * 5 + [(1.0, "slow"), (0.01, "fast")])
+    policy = ResiliencePolicy(hedge_quantile=0.9, hedge_min_samples=5, hedge_min_delay=0.02)
+    resilient = ResilientLLM(llm, policy)
+
+    async def main():
+        for _ in range(5):
+            await resilient.ainvoke(MESSAGES)
+        start = time.perf_counter()
+        result = await resilient.ainvoke(MESSAGES)
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(main())
+    assert result == "fast"
+    assert elapsed < 0.5
+    assert get_registry().counter_total("llm_hedges_total") == 1
+    assert get_registry().counter_total("llm_hedge_wins_total") == 1
+
+
+def test_sync_hedge_respects_deadline_after_primary_fails():
+    llm = ScriptedLLM([(0.01, "warm")] * 5 + [(0.25, BadRequest("400")), (1.0, "slow")])
+    policy = ResiliencePolicy(deadline=0.3, hedge_quantile=0.9, hedge_min_samples=5, hedge_min_delay=0.02)
+    resilient = ResilientLLM(llm, policy)
+    for _ in range(5):
+        resilient.invoke(MESSAGES)
+    start = time.perf_counter()
+    with pytest.raises(LLMDeadlineExceeded):
+        resilient.invoke(MESSAGES)
+    # 首个请求失败后只等待剩余的预算，而不是重新计时
+    assert time.perf_counter() - start < 0.45
+
+
+def test_stream_retries_only_before_first_chunk():
+    llm = ScriptedLLM([(0, RateLimited("429")), (0, ["a", "b"])])
+    resilient = ResilientLLM(llm, ResiliencePolicy(base_delay=0.001))
+    assert "".join(resilient.stream(MESSAGES)) == "ab"
+    assert llm.calls == 2
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from llms.base import BaseLLM
+from llms.factory import LLMFactory
+from llms.fake_llm import FakeLLM, FakeLLMError
+from llms.resilience import ResilientLLM
+from llms.router import RouterLLM
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def test_failover_and_ejection():
+    broken = FakeLLM(failure_rate=1.0)
+    healthy = FakeLLM(responder=lambda messages: "ok")
+    router = RouterLLM([broken, healthy], names=["broken", "healthy"], failure_threshold=1, seed=0)
+
+    for _ in range(10):
+        assert router.invoke(MESSAGES) == "ok"
+    stats = {s["name"]: s for s in router.health_stats()}
+    assert stats["broken"]["healthy"] is False
+    assert stats["broken"]["failures"] == 1
+    assert stats["healthy"]["calls"] == 10
+    assert stats["healthy"]["error_rate"] == 0
+
+
+def test_all_endpoints_fail():
+    router = RouterLLM([FakeLLM(failure_rate=1.0), FakeLLM(failure_rate=1.0)])
+    with pytest.raises(FakeLLMError):
+        asyncio.run(router.ainvoke(MESSAGES))
+
+
+def test_prefers_lower_latency():
+    fast = FakeLLM(responder=lambda messages: "fast")
+    slow = FakeLLM(responder=lambda messages: "slow", latency=0.02)
+    router = RouterLLM([slow, fast], names=["slow", "fast"], seed=1)
+    results = [router.invoke(MESSAGES) for _ in range(30)]
+    assert results.count("fast") > 20
+
+
+def test_stream_fails_over_before_first_chunk():
+    router = RouterLLM([FakeLLM(failure_rate=1.0), FakeLLM(responder=lambda messages: "streamed")],
+                       names=["a", "b"])
+    for _ in range(3):
+        assert "".join(router.stream(MESSAGES)) == "streamed"
+
+
+def test_factory_register_and_router():
+    class EchoLLM(BaseLLM):
+        def invoke(self, messages, **kwargs):
+            return self.base_url
+
+        async def ainvoke(self, messages, **kwargs):
+            return self.base_url
+
+    LLMFactory.register("echo", EchoLLM)
+    assert isinstance(LLMFactory.create("echo", "m", {}), EchoLLM)
+    assert isinstance(LLMFactory.create("fake", "m", {}), FakeLLM)
+    with pytest.raises(ValueError):
+        LLMFactory.create("unknown", "m", {})
+
+    llm = LLMFactory.create("router", "m", {
+        "endpoints": [{"provider": "echo", "base_url": "a"}, {"provider": "echo", "base_url": "b"}],
+        "resilience": {"max_retries": 1}
+    })
+    assert isinstance(llm, ResilientLLM)
+    assert isinstance(llm.llm, RouterLLM)
+    assert llm.invoke(MESSAGES) in ("a", "b")
+    assert len(llm.llm.health_stats()) == 2
+
+
+def test_cancelled_calls_release_in_flight():
+    slow = FakeLLM(responder=lambda messages: "slow", latency=1.0)
+    router = RouterLLM([slow, FakeLLM(responder=lambda messages: "slow", latency=1.0)], names=["a", "b"])
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                await asyncio.wait_for(router.ainvoke(MESSAGES), 0.01)
+
+    asyncio.run(main())
+    assert [s["in_flight"] for s in router.health_stats()] == [0, 0]
+    assert all(s["calls"] == 0 for s in router.health_stats())
+
+
+def test_non_retryable_error_does_not_fail_over():
+    class BadRequest(Exception):
+        status_code = 400
+
+    calls = []
+
+    def reject(messages):
+        calls.append(1)
+        raise BadRequest("context length exceeded")
+
+    router = RouterLLM([FakeLLM(responder=reject), FakeLLM(responder=reject)], failure_threshold=1)
+    for _ in range(3):
+        with pytest.raises(BadRequest):
+            router.invoke(MESSAGES)
+    assert len(calls) == 3
+    assert all(s["healthy"] and s["failures"] == 0 and s["in_flight"] == 0 for s in router.health_stats())
@@ -0,0 +1,105 @@
+from tools.search import SearchCache, TavilySearch, normalize_query
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query, **kwargs):
+        self.calls += 1
+        return {"results": [{"title": "t", "url": "https://a.com", "content": f"关于{query}", "score": 0.9}]}
+
+
+def test_normalize_query():
+    assert normalize_query("  A股 走势，2025?  ") == normalize_query("a股 走势 2025")
+    assert normalize_query("Hello,   World!") == "hello world"
+
+
+def test_tavily_search_uses_cache(tmp_path):
+    searcher = TavilySearch(api_key="test-key", cache=SearchCache(str(tmp_path / "search.sqlite")))
+    searcher.client = FakeClient()
+
+    first = searcher.search("A股 走势")
+    second = searcher.search("a股   走势！")
+    assert first == second
+    assert searcher.client.calls == 1
+
+    searcher.search("A股 走势", max_results=10)
+    assert searcher.client.calls == 2
+
+
+def test_search_cache_ttl(tmp_path):
+    cache = SearchCache(str(tmp_path / "search.sqlite"), ttl=-1)
+    cache.set("q", 5, True, [{"title": "t"}])
+    assert cache.get("q", 5, True) is None
+
+
+def test_asearch_many_keeps_input_order_and_times_out():
+    import asyncio
+
+    searcher = TavilySearch(api_key="test-key")
+    delays = {"slow": 0.05, "fast": 0.0, "stuck": 1.0}
+
+    async def fake_post(query, max_results, include_raw_content, timeout=None):
+        await asyncio.sleep(delays[query])
+        return {"results": [{"title": query, "url": f"https://{query}.com", "content": query}]}
+
+    searcher._apost_search = fake_post
+    results = asyncio.run(searcher.asearch_many(["slow", "fast", "stuck"], timeout=0.2))
+
+    assert [r[0]["title"] for r in results[:2]] == ["slow", "fast"]
+    assert results[2] == []
+
+
+def test_async_client_is_shared_within_loop():
+    import asyncio
+
+    searcher = TavilySearch(api_key="test-key")
+
+    async def main():
+        first = searcher.get_async_client()
+        assert searcher.get_async_client() is first
+        await searcher.aclose()
+        return first
+
+    asyncio.run(main())
+
+
+def test_async_client_uses_search_timeout_and_closes_on_loop_change():
+    import asyncio
+
+    searcher = TavilySearch(api_key="test-key", timeout=90)
+
+    async def open_client():
+        return searcher.get_async_client()
+
+    async def reopen_client():
+        client = searcher.get_async_client()
+        await asyncio.sleep(0)
+        return client
+
+    first = asyncio.run(open_client())
+    assert first.timeout.read == 90
+    second = asyncio.run(reopen_client())
+    assert second is not first and first.is_closed
+    asyncio.run(searcher.aclose())
+
+
+def test_normalize_query_keeps_symbols_inside_tokens():
+    keys = {normalize_query(q) for q in ("C#", "C++", "C", "C.")}
+    assert keys == {"c#", "c++", "c"}
+    assert normalize_query("Node.js 3.5版本。") == "node.js 3.5版本"
+    assert normalize_query("a + b # c") == "a b c"
+
+
+def test_empty_results_are_not_cached(tmp_path):
+    class EmptyThenFull(FakeClient):
+        def search(self, query, **kwargs):
+            self.calls += 1
+            return {"results": [] if self.calls == 1 else [{"title": "t", "url": "https://a.com", "content": query}]}
+
+    searcher = TavilySearch(api_key="test-key", cache=SearchCache(str(tmp_path / "search.sqlite")))
+    searcher.client = EmptyThenFull()
+    assert searcher.search("临时故障") == []
+    assert searcher.search("临时故障") != []
+    assert searcher.client.calls == 2
@@ -0,0 +1,157 @@
+import math
+import asyncio
+import tracemalloc
+from datetime import datetime
+from agent.pipeline import build_default_pipeline
+from state.blob_store import BlobStore
+from state.search_columns import SearchColumns
+from state.state import Research, State
+
+
+def _results(start, count, content="正文"):
+    return [
+        {"title": f"T{i}", "url": f"https://example.com/{i}", "content": f"{content}{i}", "score": None if i % 2 else i / 10}
+        for i in range(start, start + count)
+    ]
+
+
+def _filled(columnar, batches=3, size=4):
+    research = Research()
+    if columnar:
+        research.use_columnar_history()
+    for b in range(batches):
+        research.add_search_results(f"q{b % 2}", _results(b * size, size), deduplicate=False)
+    return research
+
+
+def test_columnar_views_match_list_layout():
+    plain, columnar = _filled(False), _filled(True)
+    assert isinstance(columnar.search_history, SearchColumns)
+    assert len(columnar.search_history) == 12 and columnar.search_history
+    for a, b in zip(plain.search_history, columnar.search_history):
+        assert (a.query, a.url, a.title, a.content, a.score) == (b.query, b.url, b.title, b.content, b.score)
+    assert columnar.search_history[-1].url == "https://example.com/11"
+    assert [s.url for s in columnar.search_history[2:4]] == ["https://example.com/2", "https://example.com/3"]
+    assert len(columnar.search_history._queries) == 2
+    scores = columnar.search_history.get_score_array()
+    assert scores[0] == 0.0 and math.isnan(scores[1])
+
+
+def test_batch_shares_one_timestamp():
+    research = _filled(True, batches=1)
+    assert len({s.timestamp for s in research.search_history}) == 1
+    assert research.search_history[0].created_at == research.search_history[0].timestamp
+
+
+def test_duplicates_merge_into_columns():
+    research = Research()
+    research.use_columnar_history()
+    research.add_search_results("q1", [{"url": "https://a.com", "title": "A", "content": "内容A", "score": 0.4}])
+    added = research.add_search_results("q2", [
+        {"url": "https://a.com?utm_source=x", "content": "内容A更完整", "score": 0.9},
+        {"url": "https://b.com", "content": "内容B", "score": 0.1},
+        {"url": "https://b.com", "content": "内容B", "score": 0.5}
+    ])
+    assert [s.url for s in added] == ["https://b.com"]
+    assert len(research.search_history) == 2
+    assert research.search_history[0].score == 0.9 and research.search_history[0].content == "内容A更完整"
+    assert research.search_history[1].score == 0.5
+
+
+def test_pending_searches_and_state_round_trip():
+    state = State(query="测试")
+    state.use_columnar_history()
+    state.add_paragraph("背景", "介绍背景")
+    research = state.paragraphs[0].research
+    research.add_search_results("q", _results(0, 3), deduplicate=False)
+    research.update_summary("总结")
+    research.add_search_results("q", _results(3, 2), deduplicate=False)
+    assert [s.url for s in research.get_pending_searches()] == ["https://example.com/3", "https://example.com/4"]
+
+    restored = State.from_json(state.to_json())
+    fields = ("query", "url", "title", "content", "score", "timestamp")
+    assert [[getattr(s, f) for f in fields] for s in restored.iter_searches()] == \
+        [[getattr(s, f) for f in fields] for s in state.iter_searches()]
+    assert restored.paragraphs[0].research.search_history[1].score is None
+
+
+def test_journal_replays_columnar_session(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = State(query="测试")
+    state.use_columnar_history()
+    journal = state.enable_journal(path, compact_every=1000)
+    state.add_paragraph("背景", "介绍背景")
+    state.paragraphs[0].research.add_search_results("q", _results(0, 3), deduplicate=False)
+    restored = State.load_from_file(path)
+    assert [s.url for s in restored.paragraphs[0].research.search_history] == [s.url for s in state.iter_searches()]
+    journal.close()
+
+
+def test_externalize_keeps_only_refs(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    research = Research()
+    research.use_columnar_history()
+    research.add_search_results("q", _results(0, 3, content="很长的正文" * 100), deduplicate=False)
+    assert research.externalize_content(store, min_size=10) == 3
+    assert research.search_history.contents == [None, None, None]
+    assert research.search_history[0].content.startswith("很长的正文")
+    assert research.to_dict()["search_history"][0]["content_ref"]
+
+
+def test_columnar_layout_uses_less_memory():
+    def measure(columnar):
+        tracemalloc.start()
+        research = _filled(columnar, batches=200, size=10)
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(research.search_history) == 2000
+        return memory
+
+    assert measure(True) < measure(False) * 0.7
+
+
+def test_aware_timestamps_keep_their_instant():
+    research = Research()
+    research.use_columnar_history()
+    research.add_search_results("q", _results(0, 2), deduplicate=False)
+    research.update_search(0, timestamp="2025-01-01T08:00:00+08:00")
+    research.update_search(1, timestamp="2025-01-01T01:00:00+01:00")
+    first, second = research.search_history
+    assert datetime.fromisoformat(first.timestamp) == datetime.fromisoformat("2025-01-01T00:00:00+00:00")
+    assert datetime.fromisoformat(second.timestamp) == datetime.fromisoformat(first.timestamp)
+
+
+def test_columnar_mode_survives_save_and_load(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = State(query="测试")
+    state.use_columnar_history()
+    state.add_paragraph("背景", "介绍背景")
+    state.paragraphs[0].research.add_search_results("q", _results(0, 3), deduplicate=False)
+    state.save_to_file(path)
+
+    restored = State.load_from_file(path)
+    assert isinstance(restored.paragraphs[0].research.search_history, SearchColumns)
+    restored.add_paragraph("补充", "新段落")
+    assert isinstance(restored.paragraphs[1].research.search_history, SearchColumns)
+    assert "columnar_history" not in Research().to_dict()
+
+
+def test_bulk_append_leaves_caller_results_untouched():
+    research = Research()
+    research.use_columnar_history()
+    results = [
+        {"url": "https://a.com", "content": "短", "score": 0.1},
+        {"url": "https://a.com", "content": "更完整的正文", "score": 0.9}
+    ]
+    added = research.add_search_results("q", results)
+    assert len(added) == 1 and added[0].content == "更完整的正文" and added[-1].score == 0.9
+    assert results[0] == {"url": "https://a.com", "content": "短", "score": 0.1}
+    assert research.to_dict()["search_history"] == [s.to_dict() for s in research.search_history]
+
+
+def test_pipeline_setting_switches_to_columnar_history():
+    state = State(query="测试")
+    asyncio.run(build_default_pipeline(fake=True, columnar_history=True).run(state))
+    assert state.final_report
+    assert all(isinstance(p.research.search_history, SearchColumns) for p in state.paragraphs)
+    assert any(len(p.research.search_history) for p in state.paragraphs)
@@ -0,0 +1,89 @@
+import time
+import asyncio
+from llms.base import BaseLLM
+from nodes.search_node import FirstSearchNode
+from utils.stream_json import StreamingJSONParser
+
+OUTPUT = '```json\n{"search_query": "2025 A股 走势 \\"预测\\"", "reasoning": "需要覆盖宏观、资金面和政策面的信息", "count": 3, "tags": ["a", {"b": 1}]}\n```'
+
+
+def _chunks(text: str, size: int = 4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class StreamingLLM(BaseLLM):
+    def __init__(self, output: str):
+        super().__init__("fake", {})
+        self.output = output
+        self.sent = 0
+
+    def invoke(self, messages, **kwargs):
+        return self.output
+
+    async def ainvoke(self, messages, **kwargs):
+        return self.output
+
+    def stream(self, messages, **kwargs):
+        for chunk in _chunks(self.output):
+            self.sent += 1
+            yield chunk
+
+    async def astream(self, messages, **kwargs):
+        for chunk in _chunks(self.output):
+            self.sent += 1
+            yield chunk
+
+
+def test_parser_emits_fields_as_they_close():
+    parser = StreamingJSONParser(required_fields=["search_query"])
+    seen = []
+    for chunk in _chunks(OUTPUT, 3):
+        for key, value in parser.feed(chunk):
+            seen.append((key, value, len(parser.text)))
+
+    assert [s[0] for s in seen] == ["search_query", "reasoning", "count", "tags"]
+    assert seen[0][1] == '2025 A股 走势 "预测"'
+    assert seen[0][2] < OUTPUT.index("reasoning") + 3
+    assert parser.fields["count"] == 3
+    assert parser.fields["tags"] == ["a", {"b": 1}]
+    assert parser.done and parser.has_required
+
+
+def test_first_search_node_stops_stream_early():
+    llm = StreamingLLM(OUTPUT)
+    result = FirstSearchNode(llm).run_streaming({"title": "A股", "content": "走势"})
+    assert result["search_query"] == '2025 A股 走势 "预测"'
+    assert llm.sent < len(_chunks(OUTPUT)) // 2
+
+    llm = StreamingLLM(OUTPUT)
+    result = asyncio.run(FirstSearchNode(llm).arun_streaming({"title": "A股", "content": "走势"}, stop_early=False))
+    assert result["reasoning"].startswith("需要覆盖")
+    assert llm.sent == len(_chunks(OUTPUT))
+
+
+def test_first_search_node_streaming_falls_back_to_default():
+    llm = StreamingLLM("抱歉，我无法回答")
+    result = FirstSearchNode(llm).run_streaming({"title": "A股", "content": "走势"})
+    assert result["search_query"] == "相关主题研究"
+
+
+def test_parser_handles_long_streams_in_linear_time():
+    reasoning = "资金面" * 100000
+    output = '{"search_query": "A股", "reasoning": "' + reasoning + '"}'
+    parser = StreamingJSONParser(required_fields=["search_query"])
+    start = time.perf_counter()
+    for chunk in _chunks(output, 2):
+        parser.feed(chunk)
+    assert time.perf_counter() - start < 2
+    assert parser.fields["reasoning"] == reasoning
+    assert parser.text == output
+
+
+def test_blank_search_query_falls_back_like_non_streaming():
+    output = '{"search_query": "  ", "reasoning": "无"}'
+    parser = StreamingJSONParser(required_fields=["search_query"])
+    assert parser.feed(output) == [("reasoning", "无")]
+    assert not parser.has_required
+
+    result = FirstSearchNode(StreamingLLM(output)).run_streaming({"title": "A股", "content": "走势"})
+    assert result["search_query"] == "相关主题研究"
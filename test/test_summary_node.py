@@ -0,0 +1,93 @@
+import json
+import asyncio
+from agent.pipeline import ResearchPipeline
+from llms.fake_llm import FakeLLM, default_responder
+from nodes.summary_node import FirstSummaryNode, ReflectionSummaryNode, SummaryCompressor, split_into_chunks
+from state.state import State, Research
+from tools.fake_search import FakeSearch
+from utils.metrics import get_registry
+from utils.novelty import ReflectionPolicy
+from utils.text_processing import estimate_tokens
+
+
+class RecordingLLM(FakeLLM):
+    def __init__(self, **kwargs):
+        self.requests = []
+        super().__init__(responder=self._respond, **kwargs)
+
+    def _respond(self, messages):
+        self.requests.append(json.loads(messages[-1]["content"]))
+        return default_responder(messages)
+
+
+def _paragraph(results):
+    state = State(query="测试")
+    paragraph = state.paragraphs[state.add_paragraph("芯片", "产业现状")]
+    paragraph.research.add_search_results("q", results)
+    return paragraph
+
+
+def test_split_into_chunks_respects_budget():
+    text = "第一句话内容。" * 40 + "A very long English sentence. " * 10
+    chunks = split_into_chunks(text, 50)
+    assert "".join(chunks) == text
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+
+
+def test_pending_searches_survive_serialization():
+    research = Research()
+    research.add_search_results("q1", [{"url": "https://a.com", "content": "甲"}])
+    research.update_summary("总结")
+    research.add_search_results("q2", [{"url": "https://b.com", "content": "乙"}])
+    assert [s.url for s in research.get_pending_searches()] == ["https://b.com"]
+    restored = Research.from_dict(research.to_dict())
+    assert restored.summarized_count == 1
+    # 旧版本保存的State没有该字段时，视为已有结果均已总结
+    legacy = research.to_dict()
+    del legacy["summarized_count"]
+    assert Research.from_dict(legacy).summarized_count == 2
+
+
+def test_reflection_summary_sends_only_new_results():
+    llm = RecordingLLM()
+    paragraph = _paragraph([{"url": "https://a.com", "content": "旧结果内容", "score": 0.5}])
+    FirstSummaryNode(llm).summarize(paragraph, "q")
+    paragraph.research.add_search_results("q2", [{"url": "https://b.com", "content": "新结果内容", "score": 0.5}])
+    ReflectionSummaryNode(llm).summarize(paragraph, "q2")
+
+    request = llm.requests[-1]
+    assert "新结果内容" in request["search_results"][0]
+    assert "旧结果内容" not in request["search_results"][0]
+    assert "旧结果内容" in request["paragraph_latest_state"]
+    assert paragraph.research.get_pending_searches() == []
+
+
+def test_compressor_bounds_summary_length():
+    llm = FakeLLM()
+    paragraph = _paragraph([])
+    compressor = SummaryCompressor(llm, max_tokens=100, chunk_tokens=60)
+    summary = "市场数据显示成交额持续放大。" * 60
+    compressed = asyncio.run(compressor.acompress(paragraph, summary))
+    assert estimate_tokens(compressed) <= 100
+    assert llm.calls > 1
+    assert compressor.compress(paragraph, "短总结") == "短总结"
+
+
+class NovelSearch(FakeSearch):
+    async def asearch(self, query, max_results=5, **kwargs):
+        return self._results(f"{query}#{self.calls}", max_results)
+
+
+def test_prompt_size_stays_bounded_across_rounds():
+    get_registry().reset()
+    state = State(query="半导体")
+    pipeline = ResearchPipeline(FakeLLM(), NovelSearch(content_chars=300), max_paragraphs=1,
+                                reflection=ReflectionPolicy(max_rounds=8), max_summary_tokens=300)
+    asyncio.run(pipeline.run(state))
+    research = state.paragraphs[0].research
+    assert research.reflection_iteration == 8
+    assert estimate_tokens(research.latest_summary) <= 300
+    prompt = get_registry().get_summary("summary_prompt_tokens", node="ReflectionSummaryNode")
+    assert prompt.count == 8
+    # 每轮只有上一版总结（≤300）加新结果，prompt不随轮次累积
+    assert prompt.max - prompt.min <= 300
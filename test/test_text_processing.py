@@ -1,4 +1,4 @@
-import sys, os
+import sys, os, json, time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
@@ -8,7 +8,13 @@ from utils.text_processing import (
     extract_json_from_text,
     truncate_content,
     format_search_results_for_prompt,
-    validate_json_schema
+    validate_json_schema,
+    estimate_tokens,
+    truncate_to_tokens,
+    pack_search_results,
+    get_prompt_token_budget,
+    iter_json_spans,
+    extract_json_detailed
 )
 
 
@@ -62,6 +68,37 @@ def test_extract_json_from_text_invalid():
     assert "raw_text" in result
 
 
+def test_extract_json_from_text_picks_correct_span():
+    text = 'Reasoning: 对比 {"a": 1} 与 {"b": "含有}括号\\"与引号"}，结论如上。'
+    assert extract_json_from_text(text) == {"a": 1}
+    assert extract_json_from_text(text, which="last") == {"b": '含有}括号"与引号'}
+    assert extract_json_from_text(text, which="all") == [{"a": 1}, {"b": '含有}括号"与引号'}]
+
+
+def test_extract_json_detailed_reports_path():
+    assert extract_json_detailed('{"a": 1}')[1] == "direct"
+    assert extract_json_detailed('好的，结果是 {"a": 1} 希望有帮助')[1] == "scan"
+    result, path = extract_json_detailed('{"a": 1')
+    assert path == "failed" and result["error"] == "JSON解析失败"
+
+
+def test_iter_json_spans_recovers_from_broken_candidates():
+    text = '[1, {"a": 2] 然后 {"ok": true} {"unclosed": '
+    spans = list(iter_json_spans(text))
+    assert [text[b:e] for b, e in spans][-1] == '{"ok": true}'
+
+
+def test_iter_json_spans_is_linear_on_truncated_input():
+    truncated = json.dumps({"a": [{"b": [i, {"c": "x" * 5}]} for i in range(3000)]})[:-7]
+    start = time.perf_counter()
+    spans = list(iter_json_spans(truncated))
+    assert list(iter_json_spans("[" * 20000)) == []
+    assert len(list(iter_json_spans("[{" * 20000 + "}]" * 3))) == 1
+    assert time.perf_counter() - start < 1.0
+    # 外层未闭合时产出其中每个完整的元素
+    assert len(spans) == 2999 and json.loads(truncated[slice(*spans[0])]) == {"b": [0, {"c": "xxxxx"}]}
+
+
 def test_truncate_content_short_text():
     text = "short text"
     result = truncate_content(text, max_length=20)
@@ -94,3 +131,39 @@ def test_validate_json_schema():
 
     required_missing = ["a", "c"]
     assert not validate_json_schema(data, required_missing)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("中文内容") == 4
+    assert estimate_tokens("abcdefgh") == 2
+
+
+def test_truncate_to_tokens_cuts_at_sentence_boundary():
+    text = "第一句话很短。第二句话也很短。第三句话会被截掉。" * 5
+    result = truncate_to_tokens(text, 20)
+    assert estimate_tokens(result) <= 20
+    assert result.endswith("。")
+
+
+def test_pack_search_results_respects_budget_and_ranking():
+    results = [
+        {"url": "https://a.com", "content": "A股 市场 走势 分析。" * 200, "score": 0.9},
+        {"url": "https://b.com", "content": "无关的广告内容。" * 200, "score": 0.1},
+        {"url": "https://c.com", "content": "A股 资金面 宏观经济。", "score": 0.5},
+    ]
+    packed = pack_search_results(results, token_budget=200, query="A股走势", min_tokens_per_result=120)
+    assert packed.used_tokens <= 200
+    assert packed.included == 2
+    assert packed.dropped == 1
+    assert packed.truncated == 1
+    assert packed.dropped_tokens > 0
+    assert packed.text.startswith("A股 市场")
+    assert "广告" not in packed.text
+
+
+def test_format_search_results_for_prompt_with_budget():
+    results = [{"content": "word " * 5000, "score": 0.5}]
+    formatted = format_search_results_for_prompt(results, token_budget=100)
+    assert estimate_tokens(formatted) <= 100
+    assert get_prompt_token_budget({"context_window": 10000, "max_tokens": 2000}, reserved_tokens=1000) == 7000
@@ -0,0 +1,79 @@
+import time
+import zlib
+import random
+import asyncio
+from typing import Any
+from .search import SearchBackend
+
+_SENTENCES = [
+    "监管部门发布了新的指导意见，市场预期随之调整。",
+    "分析师认为，流动性改善将支撑估值修复。",
+    "Quarterly earnings beat consensus estimates across most sectors.",
+    "外资连续三周净流入，成交额显著放大。",
+    "The central bank signalled that further easing remains on the table.",
+    "行业景气度分化明显，新能源与半导体表现突出。",
+    "Analysts warned that valuation risks persist in small-cap stocks.",
+    "政策层面强调稳增长与防风险并重。",
+]
+
+
+class FakeSearch(SearchBackend):
+    """离线确定性搜索后端，结果由查询内容决定"""
+
+    def __init__(self,
+                 latency: float = 0.0,
+                 content_chars: int = 2000,
+                 failure_rate: float = 0.0,
+                 duplicate_rate: float = 0.0,
+                 seed: int = 0):
+        self.latency = latency
+        self.content_chars = content_chars
+        self.failure_rate = failure_rate
+        self.duplicate_rate = duplicate_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _results(self, query: str, max_results: int) -> list[dict[str, Any]]:
+        self.calls += 1
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            print("搜索错误: 模拟的搜索失败")
+            return []
+        rng = random.Random(zlib.crc32(query.encode("utf-8")) ^ self.seed)
+        results = []
+        for i in range(max_results):
+            # 部分结果指向共享的站点，模拟跨查询的重复内容
+            shared = rng.random() < self.duplicate_rate
+            doc_id = rng.randrange(20) if shared else rng.randrange(1 << 30)
+            doc_rng = random.Random(doc_id)
+            content = []
+            while sum(len(s) for s in content) < self.content_chars:
+                # 模板句加上随机词与数字，使不同文档的shingle足够不同
+                phrase = "".join(chr(doc_rng.randrange(0x4e00, 0x9fa5)) for _ in range(12))
+                content.append(f"{doc_rng.choice(_SENTENCES)}{phrase}，同比变化{doc_rng.uniform(-30, 30):.1f}%。")
+            results.append({
+                "title": f"{query} - 结果{i + 1}",
+                "url": f"https://example.com/{'shared' if shared else 'doc'}/{doc_id}",
+                "content": f"{query}。" + "".join(content),
+                "score": round(1.0 - i / max(max_results, 1) * rng.uniform(0.5, 1.0), 4)
+            })
+        return results
+
+    def search(self,
+               query: str,
+               max_results: int = 5,
+               include_raw_content: bool = True,
+               timeout: int = 240) -> list[dict[str, Any]]:
+        time.sleep(self.latency)
+        return self._results(query, max_results)
+
+    async def asearch(self,
+                      query: str,
+                      max_results: int = 5,
+                      include_raw_content: bool = True,
+                      timeout: float = 60) -> list[dict[str, Any]]:
+        await asyncio.sleep(self.latency)
+        return self._results(query, max_results)
+
+    async def asearch_many(self, queries: list[str], **kwargs) -> list[list[dict[str, Any]]]:
+        return list(await asyncio.gather(*(self.asearch(q, **kwargs) for q in queries)))
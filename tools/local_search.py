@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+from attrs import define, asdict
+from state.raw_content import RawContentStore
+from utils.metrics import get_registry
+from utils.text_processing import split_into_chunks, tokenize
+from .search import SearchBackend, SearchResult
+
+DEFAULT_SUFFIXES = (".txt", ".md", ".markdown")
+
+
+@define(auto_attribs=True, slots=True)
+class IngestStats:
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+def _index_text(text: str) -> str:
+    # FTS5自带的分词器不切分中文，这里预先切成与BM25索引一致的词，以空格连接后交给unicode61
+    return " ".join(tokenize(text))
+
+
+def _match_expression(query: str) -> str:
+    terms = dict.fromkeys(tokenize(query))
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _best_passage(content: str, query: str, max_chars: int) -> str:
+    """正文过长时返回与查询重叠词最多的片段，模拟搜索引擎的摘要"""
+    if len(content) <= max_chars:
+        return content
+    terms = set(tokenize(query))
+    chunks = split_into_chunks(content, max(max_chars // 2, 1))
+    best = max(chunks, key=lambda chunk: len(terms.intersection(tokenize(chunk))))
+    return best[:max_chars]
+
+
+class LocalSearch(SearchBackend):
+    """基于SQLite FTS5的本地语料搜索后端，按bm25排序，不需要网络
+
+    文档以URL为键保存，批量导入目录或JSONL语料；重复导入时只重建内容有变化的文档，
+    并删除语料中已不存在的文档。标题权重为正文的title_weight倍。
+    """
+
+    def __init__(self,
+                 path: str,
+                 max_content_chars: int = 2000,
+                 title_weight: float = 2.0,
+                 raw_store: RawContentStore | None = None,
+                 max_concurrency: int = 8):
+        self.path = path
+        self.max_content_chars = max_content_chars
+        self.title_weight = title_weight
+        self.raw_store = raw_store
+        self.max_concurrency = max_concurrency
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, title TEXT NOT NULL, content TEXT NOT NULL, "
+            "source TEXT NOT NULL, digest TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_source ON documents(source)")
+        try:
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(title, content)")
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"当前SQLite不支持FTS5，无法使用本地搜索: {str(e)}") from e
+
+    def log_info(self, message: str):
+        print(f"[LocalSearch] {message}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _upsert(self, url: str, title: str, content: str, source: str, digest: str, stats: IngestStats):
+        row = self._conn.execute("SELECT id, digest FROM documents WHERE url = ?", (url,)).fetchone()
+        if row is not None and row[1] == digest:
+            stats.unchanged += 1
+            return
+        if row is None:
+            doc_id = self._conn.execute(
+                "INSERT INTO documents (url, title, content, source, digest) VALUES (?, ?, ?, ?, ?)",
+                (url, title, content, source, digest)
+            ).lastrowid
+            stats.added += 1
+        else:
+            doc_id = row[0]
+            self._conn.execute(
+                "UPDATE documents SET title = ?, content = ?, source = ?, digest = ? WHERE id = ?",
+                (title, content, source, digest, doc_id)
+            )
+            self._conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+            stats.updated += 1
+        self._conn.execute(
+            "INSERT INTO documents_fts (rowid, title, content) VALUES (?, ?, ?)",
+            (doc_id, _index_text(title), _index_text(content))
+        )
+
+    def _remove_missing(self, source: str, seen: set[str], stats: IngestStats):
+        rows = self._conn.execute("SELECT id, url FROM documents WHERE source = ?", (source,)).fetchall()
+        stale = [(doc_id,) for doc_id, url in rows if url not in seen]
+        self._conn.executemany("DELETE FROM documents_fts WHERE rowid = ?", stale)
+        self._conn.executemany("DELETE FROM documents WHERE id = ?", stale)
+        stats.removed += len(stale)
+
+    def add_documents(self, documents: Iterable[dict[str, Any]], source: str = "api", sync: bool = False) -> IngestStats:
+        """在一个事务中批量写入 {url, title, content} 文档；sync为True时删除该source下本次未出现的文档"""
+        stats = IngestStats()
+        start = time.perf_counter()
+        seen: set[str] = set()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for doc in documents:
+                    url, title, content = doc.get("url", ""), doc.get("title", ""), doc.get("content", "")
+                    if not url or not (title or content):
+                        continue
+                    digest = doc.get("digest") or hashlib.sha1(f"{title}\0{content}".encode("utf-8")).hexdigest()
+                    self._upsert(url, title, content, source, digest, stats)
+                    seen.add(url)
+                if sync:
+                    self._remove_missing(source, seen, stats)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            if stats.added or stats.updated or stats.removed:
+                self._conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+        get_registry().inc("local_search_ingested_total", stats.added + stats.updated)
+        self.log_info(f"导入 {source}: {stats.to_dict()}，耗时 {time.perf_counter() - start:.2f}s")
+        return stats
+
+    def ingest_directory(self, root: str, suffixes: tuple[str, ...] = DEFAULT_SUFFIXES) -> IngestStats:
+        """导入目录下的文本文件，标题为第一行非空文本；按修改时间与大小判断文件是否变化"""
+        root = os.path.abspath(root)
+
+        def documents():
+            for dirpath, _, filenames in os.walk(root):
+                for filename in sorted(filenames):
+                    if not filename.lower().endswith(suffixes):
+                        continue
+                    path = Path(dirpath, filename)
+                    stat = path.stat()
+                    digest = f"{stat.st_mtime_ns}:{stat.st_size}"
+                    url = path.as_uri()
+                    # 未变化的文件不读取正文
+                    if self._digest(url) == digest:
+                        yield {"url": url, "title": filename, "content": " ", "digest": digest}
+                        continue
+                    content = path.read_text(encoding="utf-8", errors="replace")
+                    first_line = next((line for line in content.splitlines() if line.strip()), "")
+                    title = first_line.strip().lstrip("#").strip() or path.stem
+                    yield {"url": url, "title": title, "content": content, "digest": digest}
+
+        return self.add_documents(documents(), source=root, sync=True)
+
+    def ingest_jsonl(self, path: str) -> IngestStats:
+        """导入JSONL语料，每行 {"url": ..., "title": ..., "content": ...}；缺少url时以文件与行号生成"""
+        path = os.path.abspath(path)
+        uri = Path(path).as_uri()
+
+        def documents():
+            with open(path, "r", encoding="utf-8") as f:
+                for lineno, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        doc = json.loads(line)
+                    except json.JSONDecodeError:
+                        self.log_info(f"跳过无法解析的第 {lineno} 行")
+                        continue
+                    doc.setdefault("url", f"{uri}#L{lineno}")
+                    yield doc
+
+        return self.add_documents(documents(), source=path, sync=True)
+
+    def ingest(self, corpus: str) -> IngestStats:
+        if os.path.isdir(corpus):
+            return self.ingest_directory(corpus)
+        return self.ingest_jsonl(corpus)
+
+    def _digest(self, url: str) -> str | None:
+        # 只在add_documents持有锁的事务中调用
+        row = self._conn.execute("SELECT digest FROM documents WHERE url = ?", (url,)).fetchone()
+        return row[0] if row is not None else None
+
+    def remove(self, url: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("DELETE FROM documents WHERE url = ? RETURNING id", (url,)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM documents_fts WHERE rowid = ?", row)
+        return row is not None
+
+    def search(self,
+               query: str,
+               max_results: int = 5,
+               include_raw_content: bool = True,
+               timeout: int = 240) -> list[SearchResult]:
+        match = _match_expression(query)
+        if not match:
+            return []
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT d.title, d.url, d.content, documents_fts.rank FROM documents_fts "
+                    "JOIN documents d ON d.id = documents_fts.rowid "
+                    "WHERE documents_fts MATCH ? AND documents_fts.rank MATCH ? "
+                    "ORDER BY documents_fts.rank LIMIT ?",
+                    (match, f"bm25({self.title_weight}, 1.0)", max_results)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"本地搜索错误: {str(e)}")
+            return []
+        results = []
+        # bm25为负且越小越相关；小语料上的绝对值可能极小，score取相对最高分的比例
+        best = rows[0][3] if rows and rows[0][3] else -1.0
+        for title, url, content, rank in rows:
+            data = {
+                "title": title,
+                "url": url,
+                "content": _best_passage(content, query, self.max_content_chars),
+                "score": round(rank / best, 4)
+            }
+            if include_raw_content:
+                data["raw_content"] = content
+            results.append(SearchResult.from_dict(data, self.raw_store).to_dict())
+        return results
+
+    async def asearch(self,
+                      query: str,
+                      max_results: int = 5,
+                      include_raw_content: bool = True,
+                      timeout: float = 60) -> list[SearchResult]:
+        return await asyncio.to_thread(self.search, query, max_results, include_raw_content)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_local_backends: dict[str, LocalSearch] = {}
+_local_backends_lock = threading.Lock()
+
+def get_local_search(index_path: str, corpus: str | None = None) -> LocalSearch:
+    """同一进程内按索引路径共享LocalSearch，第一次创建时增量导入corpus"""
+    key = os.path.abspath(index_path)
+    with _local_backends_lock:
+        backend = _local_backends.get(key)
+        if backend is None:
+            backend = LocalSearch(index_path)
+            if corpus:
+                backend.ingest(corpus)
+            _local_backends[key] = backend
+    return backend
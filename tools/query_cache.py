@@ -0,0 +1,257 @@
+import re
+import zlib
+import threading
+from collections import Counter
+from typing import Any
+import numpy as np
+from attrs import define
+from utils.metrics import get_registry
+from .search import normalize_query
+
+
+_CJK_CHARS = "\u3400-\u4dbf\u4e00-\u9fff"
+_WORD_RE = re.compile(fr"([{_CJK_CHARS}]+)|([^\s{_CJK_CHARS}]+)")
+# 虚词不参与特征：中文在此处断开，英文直接丢弃
+_CJK_FUNCTION_CHARS = re.compile("[的了和与及或之吗呢]")
+_STOPWORDS = frozenset(
+    "a an the of for and or to in on at by with about from into is are was were be what how why which vs".split()
+)
+
+
+def _stem(word: str) -> str:
+    # 只归并最常见的复数形式，使risk与risks视为同一个词
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _analyze(text: str) -> tuple[list[str], list[str]]:
+    """返回 (中文连续片段, 英文实词)，已去掉虚词与单个字母"""
+    runs: list[str] = []
+    words: list[str] = []
+    for cjk, other in _WORD_RE.findall(normalize_query(text)):
+        if cjk:
+            runs.extend(run for run in _CJK_FUNCTION_CHARS.split(cjk) if run)
+        elif len(other) > 1 and other not in _STOPWORDS:
+            words.append(_stem(other))
+    return runs, words
+
+
+def query_terms(text: str, ngram_range: tuple[int, int] = (2, 2)) -> list[str]:
+    """查询的特征词：中文取ngram_range内的字n-gram，英文取实词
+
+    不使用单字与单个字母，它们几乎出现在所有查询中，会淹没真正区分主题的词。
+    """
+    runs, words = _analyze(text)
+    low, high = ngram_range
+    terms: list[str] = []
+    for run in runs:
+        for n in range(low, high + 1):
+            terms.extend(run[i:i + n] for i in range(len(run) - n + 1))
+    terms.extend(words)
+    return terms
+
+
+def query_units(text: str) -> frozenset[str]:
+    """用于稀有词校验的最小单位：中文按字、英文按实词"""
+    runs, words = _analyze(text)
+    return frozenset("".join(runs)) | frozenset(words)
+
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def query_numbers(text: str) -> frozenset[str]:
+    """查询中的数字（年份、型号等），数字不同的查询即使字面相近也不视为相似"""
+    return frozenset(_NUMBER_RE.findall(normalize_query(text)))
+
+
+class TfidfIndex:
+    """查询特征词（见query_terms）的TF-IDF向量索引
+
+    使用哈希技巧映射到固定维度，行向量保存次线性词频，IDF在查询时按当前文档频率计算，
+    因此新增查询不需要重算已有向量。容量满时覆盖最早写入的行。
+    """
+
+    def __init__(self, dim: int = 2048, capacity: int = 1024, ngram_range: tuple[int, int] = (2, 2)):
+        self.dim = dim
+        self.capacity = capacity
+        self.ngram_range = ngram_range
+        self._tf = np.zeros((capacity, dim), dtype=np.float32)
+        self._df = np.zeros(dim, dtype=np.float32)
+        self._size = 0
+        self._next = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def vectorize(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        grams = query_terms(text, self.ngram_range)
+        if grams:
+            columns = np.fromiter((zlib.crc32(g.encode("utf-8")) % self.dim for g in grams), dtype=np.int64, count=len(grams))
+            np.add.at(vector, columns, 1.0)
+            np.log1p(vector, out=vector)
+        return vector
+
+    def add(self, text: str) -> int:
+        """写入一条查询，返回所在行号"""
+        row = self._next
+        if self._size == self.capacity:
+            self._df -= self._tf[row] > 0
+        else:
+            self._size += 1
+        self._tf[row] = self.vectorize(text)
+        self._df += self._tf[row] > 0
+        self._next = (row + 1) % self.capacity
+        return row
+
+    def similarities(self, text: str) -> np.ndarray:
+        """与所有已写入查询的余弦相似度，下标即行号"""
+        if not self._size:
+            return np.zeros(0, dtype=np.float32)
+        idf = np.log((1.0 + self._size) / (1.0 + self._df)) + 1.0
+        query = self.vectorize(text) * idf
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(self._size, dtype=np.float32)
+        matrix = self._tf[:self._size] * idf
+        norms = np.linalg.norm(matrix, axis=1)
+        norms[norms == 0] = 1.0
+        return (matrix @ query) / (norms * norm)
+
+
+@define(auto_attribs=True, slots=True)
+class SimilarCacheStats:
+    lookups: int = 0
+    hits: int = 0
+    merged_hits: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def misses(self) -> int:
+        return self.lookups - self.hits
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "merged_hits": self.merged_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "saved_seconds": self.saved_seconds
+        }
+
+
+@define(auto_attribs=True, slots=True)
+class _Entry:
+    query: str
+    numbers: frozenset[str]
+    units: frozenset[str]
+    max_results: int
+    include_raw_content: bool
+    results: list[dict[str, Any]]
+    cost: float
+
+
+class QuerySimilarityCache:
+    """按查询语义相近程度复用搜索结果：相似度达到threshold时直接返回已有结果
+
+    merge为True时合并所有超过阈值的历史查询结果（按url去重、按score排序）。
+    只有结果数足够、原始正文需求被满足、且包含查询中最稀有的rare_terms个字词的历史查询才会被复用，
+    避免“奥斯曼帝国”命中“罗马帝国”、“缺点”命中“优点”这类字面相近而主题不同的查询。
+    """
+
+    def __init__(self,
+                 threshold: float = 0.8,
+                 max_entries: int = 1024,
+                 dim: int = 2048,
+                 merge: bool = False,
+                 ngram_range: tuple[int, int] = (2, 2),
+                 rare_terms: int = 2):
+        self.threshold = threshold
+        self.merge = merge
+        self.rare_terms = rare_terms
+        # 每个字词出现在多少条已缓存查询中，用于找出查询里最稀有的字词
+        self._unit_df: Counter[str] = Counter()
+        self.index = TfidfIndex(dim=dim, capacity=max_entries, ngram_range=ngram_range)
+        self.entries: list[_Entry | None] = [None] * max_entries
+        self.stats = SimilarCacheStats()
+        self._lock = threading.Lock()
+
+    def _rarest_units(self, units: frozenset[str]) -> frozenset[str]:
+        # 从未出现过的字词最稀有；同样稀有时按字典序取，保证结果稳定
+        return frozenset(sorted(units, key=lambda unit: (self._unit_df[unit], unit))[:self.rare_terms])
+
+    def _usable(self,
+                entry: _Entry | None,
+                numbers: frozenset[str],
+                required: frozenset[str],
+                max_results: int,
+                include_raw_content: bool) -> bool:
+        return (entry is not None
+                and entry.numbers == numbers
+                and required <= entry.units
+                and entry.max_results >= max_results
+                and (entry.include_raw_content or not include_raw_content))
+
+    def lookup(self, query: str, max_results: int = 5, include_raw_content: bool = True) -> list[dict[str, Any]] | None:
+        with self._lock:
+            self.stats.lookups += 1
+            scores = self.index.similarities(query)
+            numbers = query_numbers(query)
+            required = self._rarest_units(query_units(query))
+            candidates = np.flatnonzero(scores >= self.threshold)
+            matches = sorted(
+                ((float(scores[row]), self.entries[row]) for row in candidates
+                 if self._usable(self.entries[row], numbers, required, max_results, include_raw_content)),
+                key=lambda match: -match[0]
+            )
+            if not matches:
+                get_registry().inc("search_similar_cache_total", result="miss")
+                return None
+
+            if self.merge and len(matches) > 1:
+                results = self._merge([entry for _, entry in matches], max_results)
+                self.stats.merged_hits += 1
+            else:
+                results = matches[0][1].results[:max_results]
+            saved = matches[0][1].cost
+            self.stats.hits += 1
+            self.stats.saved_seconds += saved
+        registry = get_registry()
+        registry.inc("search_similar_cache_total", result="hit")
+        registry.inc("search_similar_cache_saved_seconds_total", saved)
+        print(f"[QuerySimilarityCache] 复用相似查询的结果: {query} ≈ {matches[0][1].query}（相似度 {matches[0][0]:.2f}）")
+        return [dict(r) for r in results]
+
+    @staticmethod
+    def _merge(entries: list[_Entry], max_results: int) -> list[dict[str, Any]]:
+        by_url: dict[str, dict[str, Any]] = {}
+        for entry in entries:
+            for result in entry.results:
+                key = result.get("url") or result.get("title", "")
+                current = by_url.get(key)
+                if current is None or (result.get("score") or 0) > (current.get("score") or 0):
+                    by_url[key] = result
+        return sorted(by_url.values(), key=lambda r: -(r.get("score") or 0))[:max_results]
+
+    def add(self,
+            query: str,
+            results: list[dict[str, Any]],
+            max_results: int = 5,
+            include_raw_content: bool = True,
+            cost: float = 0.0):
+        """记录一次真实搜索及其耗时；空结果不记录，避免把失败的搜索当作命中"""
+        if not results:
+            return
+        with self._lock:
+            row = self.index.add(query)
+            evicted = self.entries[row]
+            if evicted is not None:
+                self._unit_df.subtract(evicted.units)
+            units = query_units(query)
+            self._unit_df.update(units)
+            self.entries[row] = _Entry(query, query_numbers(query), units, max_results, include_raw_content, list(results), cost)
@@ -1,9 +1,22 @@
 import os
-from typing import Any
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from typing import Any, TYPE_CHECKING
 from attrs import define, asdict
-from tavily import TavilyClient
-from dotenv import load_dotenv
-load_dotenv()
+from config import load_env
+from state.raw_content import RawContentHandle, RawContentStore, resolve_raw_content
+from utils.cache import SQLiteCache
+from utils.rate_limit import RateLimiter, get_rate_limiter
+
+if TYPE_CHECKING:
+    import asyncio
+    import httpx
+    from .query_cache import QuerySimilarityCache
 
 
 @define(auto_attribs=True, slots=True)
@@ -12,58 +25,377 @@ class SearchResult:
     url: str
     content: str
     score: float | None = None
+    # 原始网页正文溢出到会话目录，这里只保留引用
+    raw_content_ref: str = ""
+
+    @property
+    def raw_content(self) -> RawContentHandle | None:
+        return resolve_raw_content(self.raw_content_ref)
 
     def to_dict(self) -> dict[str, Any]:
         return asdict(self)
 
     @classmethod
-    def from_dict(cls, data: dict[str, Any]) -> "SearchResult":
+    def from_dict(cls, data: dict[str, Any], raw_store: RawContentStore | None = None) -> "SearchResult":
+        """提供raw_store时把raw_content写入溢出目录，否则丢弃原始正文"""
+        raw_content_ref = data.get("raw_content_ref", "")
+        if raw_store is not None and data.get("raw_content"):
+            handle = raw_store.put(data["raw_content"])
+            raw_content_ref = handle.ref if handle is not None else ""
         return cls(
             title=data.get("title", ""),
             url=data.get("url", ""),
             content=data.get("content", ""),
-            score=data.get("score")
+            score=data.get("score"),
+            raw_content_ref=raw_content_ref
         )
 
 
-class TavilySearch:
-    def __init__(self, api_key: str | None = None):
+def normalize_query(query: str) -> str:
+    """忽略大小写、空白与标点差异，用于搜索缓存的键
+
+    紧跟在词后的#与+（C#、C++）以及词中间的.（node.js、3.5）是词的一部分，予以保留。
+    """
+    normalized = unicodedata.normalize("NFKC", query).casefold()
+    chars = []
+    for i, ch in enumerate(normalized):
+        if not (unicodedata.category(ch).startswith("P") or ch == "+"):
+            chars.append(ch)
+            continue
+        prev = normalized[i - 1] if i else ""
+        following = normalized[i + 1] if i + 1 < len(normalized) else ""
+        if ch in "#+" and (prev.isalnum() or (prev in "#+" and chars and chars[-1] == prev)):
+            chars.append(ch)
+        elif ch == "." and prev.isalnum() and following.isalnum():
+            chars.append(ch)
+        else:
+            chars.append(" ")
+    return " ".join("".join(chars).split())
+
+
+class SearchCache:
+    """搜索结果磁盘缓存，以压缩JSON形式保存，按新鲜度TTL过期并限制总大小"""
+
+    def __init__(self,
+                 path: str,
+                 ttl: float | None = 24 * 3600,
+                 max_bytes: int | None = 128 * 1024 * 1024):
+        self.store = SQLiteCache(path, ttl=ttl, max_bytes=max_bytes, compress=True)
+
+    @property
+    def stats(self):
+        return self.store.stats
+
+    @staticmethod
+    def make_key(query: str, max_results: int, include_raw_content: bool) -> str:
+        payload = json.dumps(
+            [normalize_query(query), max_results, include_raw_content],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, max_results: int, include_raw_content: bool) -> list[dict[str, Any]] | None:
+        """原始正文引用只在写入它的会话内有效；需要原始正文而引用已无法解析时视为未命中"""
+        raw = self.store.get(self.make_key(query, max_results, include_raw_content))
+        if raw is None:
+            return None
+        results = json.loads(raw)
+        if include_raw_content and any(
+            r.get("raw_content_ref") and resolve_raw_content(r["raw_content_ref"]) is None for r in results
+        ):
+            return None
+        return results
+
+    def set(self, query: str, max_results: int, include_raw_content: bool, results: list[dict[str, Any]]):
+        payload = json.dumps(results, ensure_ascii=False).encode("utf-8")
+        self.store.set(self.make_key(query, max_results, include_raw_content), payload)
+
+    def clear(self):
+        self.store.clear()
+
+
+class SearchBackend(ABC):
+    """搜索后端抽象基类，search/asearch返回SearchResult.to_dict()格式的结果列表，出错时返回空列表"""
+    max_concurrency: int = 8
+
+    @abstractmethod
+    def search(self,
+               query: str,
+               max_results: int = 5,
+               include_raw_content: bool = True,
+               timeout: int = 240) -> list[SearchResult]:
+        pass
+
+    @abstractmethod
+    async def asearch(self,
+                      query: str,
+                      max_results: int = 5,
+                      include_raw_content: bool = True,
+                      timeout: float = 60) -> list[SearchResult]:
+        pass
+
+    async def asearch_many(self, queries: list[str], **kwargs) -> list[list[SearchResult]]:
+        """并发执行多个查询，结果顺序与输入一致"""
+        import asyncio
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(query: str) -> list[SearchResult]:
+            async with semaphore:
+                return await self.asearch(query, **kwargs)
+
+        return list(await asyncio.gather(*(run(q) for q in queries)))
+
+    async def aclose(self):
+        pass
+
+
+class TavilySearch(SearchBackend):
+    API_BASE_URL = "https://api.tavily.com"
+
+    def __init__(self,
+                 api_key: str | None = None,
+                 cache: SearchCache | None = None,
+                 max_connections: int = 20,
+                 max_concurrency: int = 8,
+                 rate_limiter: RateLimiter | None = None,
+                 similar_cache: "QuerySimilarityCache | None" = None,
+                 raw_store: RawContentStore | None = None,
+                 timeout: float = 60):
         if api_key is None:
+            load_env()
             api_key = os.getenv("TAVILY_API_KEY")
             if not api_key:
                 raise ValueError("Tavily API Key未找到， 请设置TAVILY_API_KEY环境变量或在初始化时提供")
-        self.client = TavilyClient(api_key=api_key)
+        self.api_key = api_key
+        self._client = None
+        self.cache = cache
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        # 缓存命中不占用限流名额，只有真正请求API时才经过限流器
+        self.rate_limiter = rate_limiter
+        # 近义查询复用已有结果，未命中时才真正请求API
+        self.similar_cache = similar_cache
+        # 只有配置了溢出目录时才请求原始正文，否则raw_content无处保存
+        self.raw_store = raw_store
+
+        # 异步请求的默认超时，连接池与asearch共用，单次请求可以覆盖
+        self.timeout = timeout
+
+        # 异步连接池绑定在创建它的事件循环上，换循环时关闭旧连接池后重建
+        self._async_client: "httpx.AsyncClient | None" = None
+        self._async_loop: "asyncio.AbstractEventLoop | None" = None
+        self._closing: "set[asyncio.Future]" = set()
 
     def search(self,
                query: str,
                max_results: int = 5,
                include_raw_content: bool = True,
                timeout: int = 240) -> list[SearchResult]:
+        include_raw_content = include_raw_content and self.raw_store is not None
+        cached = self._lookup(query, max_results, include_raw_content)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
         try:
-            response = self.client.search(
-                query=query,
-                max_results=max_results,
-                include_raw_content=include_raw_content,
+            with self._rate_limit():
+                response = self.client.search(
+                    query=query,
+                    max_results=max_results,
+                    include_raw_content=include_raw_content,
+                    timeout=timeout
+                )
+            results = [SearchResult.from_dict(item, self.raw_store).to_dict() for item in response.get("results", [])]
+            self._store(query, max_results, include_raw_content, results, time.perf_counter() - start)
+            return results
+
+        except Exception as e:
+            print(f"搜索错误: {str(e)}")
+            return []
+
+    def _lookup(self, query: str, max_results: int, include_raw_content: bool) -> list[dict[str, Any]] | None:
+        if self.cache is not None:
+            cached = self.cache.get(query, max_results, include_raw_content)
+            if cached is not None:
+                return cached
+        if self.similar_cache is not None:
+            return self.similar_cache.lookup(query, max_results, include_raw_content)
+        return None
+
+    def _store(self, query: str, max_results: int, include_raw_content: bool,
+               results: list[dict[str, Any]], elapsed: float):
+        # 空结果多为临时故障，不写入缓存，以免在TTL内一直返回空
+        if not results:
+            return
+        if self.cache is not None:
+            self.cache.set(query, max_results, include_raw_content, results)
+        if self.similar_cache is not None:
+            self.similar_cache.add(query, results, max_results, include_raw_content, cost=elapsed)
+
+    @property
+    def client(self):
+        # tavily与httpx只在第一次真正请求时导入
+        if self._client is None:
+            from tavily import TavilyClient
+            self._client = TavilyClient(api_key=self.api_key)
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    def _rate_limit(self):
+        return self.rate_limiter.limit() if self.rate_limiter is not None else nullcontext()
+
+    def _arate_limit(self):
+        return self.rate_limiter.alimit() if self.rate_limiter is not None else nullcontext()
+
+    def get_async_client(self) -> "httpx.AsyncClient":
+        """返回当前事件循环上共享的HTTP连接池"""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop or self._async_client.is_closed:
+            import httpx
+            if self._async_client is not None and not self._async_client.is_closed:
+                self._close_stale_client(self._async_client, self._async_loop, loop)
+            self._async_client = httpx.AsyncClient(
+                base_url=self.API_BASE_URL,
+                timeout=httpx.Timeout(self.timeout),
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_key}"
+                },
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    def _close_stale_client(self,
+                            client: "httpx.AsyncClient",
+                            old_loop: "asyncio.AbstractEventLoop | None",
+                            loop: "asyncio.AbstractEventLoop"):
+        import asyncio
+        # 旧循环仍在其他线程运行时在旧循环上关闭，否则在当前循环上尽力关闭
+        if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+            future = asyncio.run_coroutine_threadsafe(client.aclose(), old_loop)
+        else:
+            async def close():
+                try:
+                    await client.aclose()
+                except Exception:
+                    # 旧循环已关闭时其连接无法正常关闭，随对象回收
+                    pass
+            future = loop.create_task(close())
+        self._closing.add(future)
+        future.add_done_callback(self._closing.discard)
+
+    async def _apost_search(self, query: str, max_results: int, include_raw_content: bool,
+                            timeout: float | None = None) -> dict[str, Any]:
+        async with self._arate_limit():
+            response = await self.get_async_client().post(
+                "/search",
+                json={
+                    "query": query,
+                    "max_results": max_results,
+                    "include_raw_content": include_raw_content
+                },
+                timeout=timeout if timeout is not None else self.timeout
+            )
+            response.raise_for_status()
+        return response.json()
+
+    async def asearch(self,
+                      query: str,
+                      max_results: int = 5,
+                      include_raw_content: bool = True,
+                      timeout: float | None = None) -> list[SearchResult]:
+        import asyncio
+        timeout = self.timeout if timeout is None else timeout
+        include_raw_content = include_raw_content and self.raw_store is not None
+        cached = self._lookup(query, max_results, include_raw_content)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                self._apost_search(query, max_results, include_raw_content, timeout=timeout),
                 timeout=timeout
             )
-            results = [SearchResult.from_dict(item) for item in response.get("results", [])]
-            return [r.to_dict() for r in results]
+            results = [SearchResult.from_dict(item, self.raw_store).to_dict() for item in response.get("results", [])]
+            self._store(query, max_results, include_raw_content, results, time.perf_counter() - start)
+            return results
 
+        except TimeoutError:
+            print(f"异步搜索超时({timeout}s): {query}")
+            return []
         except Exception as e:
-            print(f"搜索错误: {str(e)}")
+            print(f"异步搜索错误: {str(e)}")
             return []
 
-_tavily_client: TavilyClient | None = None
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+
+_tavily_client: TavilySearch | None = None
+_tavily_client_lock = threading.Lock()
 
 def get_tavily_client() -> TavilySearch:
     global _tavily_client
     if _tavily_client is None:
-        _tavily_client = TavilySearch()
+        with _tavily_client_lock:
+            if _tavily_client is None:
+                load_env()
+                cache_path = os.getenv("SEARCH_CACHE_PATH")
+                cache = SearchCache(cache_path, ttl=float(os.getenv("SEARCH_CACHE_TTL", 24 * 3600))) if cache_path else None
+                rpm = os.getenv("SEARCH_REQUESTS_PER_MINUTE")
+                rate_limiter = get_rate_limiter("search:tavily", requests_per_minute=float(rpm)) if rpm else None
+                threshold = os.getenv("SEARCH_SIMILARITY_THRESHOLD")
+                similar_cache = None
+                if threshold:
+                    from .query_cache import QuerySimilarityCache
+                    similar_cache = QuerySimilarityCache(threshold=float(threshold))
+                raw_dir = os.getenv("SEARCH_RAW_CONTENT_DIR")
+                raw_store = None
+                if raw_dir:
+                    max_bytes = int(os.getenv("SEARCH_RAW_CONTENT_MAX_BYTES", 256 * 1024 * 1024))
+                    # 每个进程在raw_dir下新建自己的会话目录，进程退出时删除
+                    raw_store = RawContentStore(base_dir=raw_dir, max_bytes=max_bytes)
+                _tavily_client = TavilySearch(cache=cache, rate_limiter=rate_limiter,
+                                              similar_cache=similar_cache, raw_store=raw_store)
     return _tavily_client
 
+async def aget_tavily_client() -> TavilySearch:
+    """异步版本的单例获取，同一事件循环内的所有任务共享同一个连接池"""
+    client = get_tavily_client()
+    client.get_async_client()
+    return client
+
+def create_search_backend(backend: str = "tavily", config: dict[str, Any] | None = None) -> SearchBackend:
+    """按名称创建搜索后端：tavily为共享的Tavily单例，local为SQLite FTS5本地语料，fake为离线的FakeSearch"""
+    config = config or {}
+    match backend:
+        case "tavily":
+            return get_tavily_client()
+        case "local":
+            from .local_search import get_local_search
+            return get_local_search(config["index_path"], corpus=config.get("corpus"))
+        case "fake":
+            from .fake_search import FakeSearch
+            return FakeSearch()
+        case _:
+            raise ValueError(f"未知的搜索后端： {backend}")
+
 def tavily_search(query: str, **kwargs) -> list[SearchResult]:
     return get_tavily_client().search(query, **kwargs)
 
+async def atavily_search(query: str, **kwargs) -> list[SearchResult]:
+    client = await aget_tavily_client()
+    return await client.asearch(query, **kwargs)
+
 
 def test_search(query: str = "武大诬陷案", max_results: int = 3):
     print(f"\n=== 测试Tavily搜索功能 ===")
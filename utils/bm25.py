@@ -0,0 +1,138 @@
+import math
+from array import array
+from collections import Counter
+from typing import Any, Iterable
+from attrs import define
+from .text_processing import split_into_chunks, tokenize
+
+
+@define(auto_attribs=True, slots=True)
+class Passage:
+    doc_id: int
+    position: int
+    text: str
+    title: str = ""
+    url: str = ""
+
+
+class PassageIndex:
+    """搜索结果正文的BM25段落倒排索引，支持增量添加与按文档删除
+
+    倒排表为 词 -> (段落编号, 词频) 两个array列，追加时不复制已有数据；
+    查询时以numpy向量化计算BM25，文档数、文档频率与平均长度随增删实时维护，不需要重建索引。
+    删除的段落只标记为失效，其倒排项在查询时被屏蔽。
+    """
+
+    def __init__(self, passage_tokens: int = 200, k1: float = 1.2, b: float = 0.75):
+        self.passage_tokens = passage_tokens
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._df: Counter[str] = Counter()
+        self._passages: list[Passage | None] = []
+        self._terms: list[tuple[str, ...]] = []
+        self._lengths = array("f")
+        self._alive = array("f")
+        self._doc_passages: dict[int, list[int]] = {}
+        self._total_length = 0
+        self._live = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_passages
+
+    def add_document(self, doc_id: int, text: str, title: str = "", url: str = "") -> int:
+        """切分正文并加入索引，返回新增的段落数；同一doc_id会先删除旧段落"""
+        if doc_id in self._doc_passages:
+            self.remove_document(doc_id)
+        ids = []
+        for position, chunk in enumerate(split_into_chunks(text, self.passage_tokens)):
+            terms = Counter(tokenize(chunk))
+            if not terms:
+                continue
+            pid = len(self._passages)
+            self._passages.append(Passage(doc_id, position, chunk, title, url))
+            self._terms.append(tuple(terms))
+            length = sum(terms.values())
+            self._lengths.append(length)
+            self._alive.append(1.0)
+            self._total_length += length
+            for term, tf in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("q"), array("f"))
+                postings[0].append(pid)
+                postings[1].append(tf)
+            self._df.update(terms.keys())
+            ids.append(pid)
+        self._doc_passages[doc_id] = ids
+        self._live += len(ids)
+        return len(ids)
+
+    def remove_document(self, doc_id: int):
+        for pid in self._doc_passages.pop(doc_id, []):
+            self._df.subtract(self._terms[pid])
+            self._total_length -= int(self._lengths[pid])
+            self._alive[pid] = 0.0
+            self._passages[pid] = None
+            self._terms[pid] = ()
+            self._live -= 1
+
+    def search(self, query: str, k: int = 5, doc_ids: Iterable[int] | None = None) -> list[tuple[Passage, float]]:
+        """返回BM25得分最高的k个段落；doc_ids限定只在这些文档的段落中检索"""
+        if not self._live:
+            return []
+        import numpy as np
+
+        mask = np.frombuffer(self._alive, dtype=np.float32)
+        if doc_ids is not None:
+            allowed = [pid for doc_id in doc_ids for pid in self._doc_passages.get(doc_id, ())]
+            if not allowed:
+                return []
+            mask = np.zeros(len(self._passages), dtype=np.float32)
+            mask[allowed] = 1.0
+
+        n = self._live
+        k1, b = self.k1, self.b
+        norms = k1 * (1.0 - b + b * np.frombuffer(self._lengths, dtype=np.float32) / (self._total_length / n))
+        scores = np.zeros(len(self._passages), dtype=np.float32)
+        for term in set(tokenize(query)):
+            df = self._df.get(term, 0)
+            if df <= 0:
+                continue
+            pids, tfs = self._postings[term]
+            pids = np.frombuffer(pids, dtype=np.int64)
+            tfs = np.frombuffer(tfs, dtype=np.float32)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            # 同一词的倒排表中段落编号不重复，可以直接按下标累加
+            scores[pids] += idf * tfs * (k1 + 1.0) / (tfs + norms[pids])
+        scores *= mask
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        ranked = sorted(candidates.tolist(), key=lambda pid: -scores[pid])
+        return [(self._passages[pid], float(scores[pid])) for pid in ranked]
+
+
+def passages_to_results(matches: list[tuple[Passage, float]]) -> list[dict[str, Any]]:
+    """把检索到的段落按所属文档合并为搜索结果格式，段落保持原文顺序，score为相对最高分的比例"""
+    if not matches:
+        return []
+    best = matches[0][1] or 1.0
+    grouped: dict[int, list[tuple[Passage, float]]] = {}
+    for passage, score in matches:
+        grouped.setdefault(passage.doc_id, []).append((passage, score))
+    results = []
+    for items in grouped.values():
+        items.sort(key=lambda item: item[0].position)
+        first = items[0][0]
+        results.append({
+            "title": first.title,
+            "url": first.url,
+            "content": " ... ".join(passage.text for passage, _ in items),
+            "score": max(score for _, score in items) / best
+        })
+    return results
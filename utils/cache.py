@@ -0,0 +1,201 @@
+import os
+import time
+import zlib
+import threading
+from collections import OrderedDict
+from typing import Any
+from attrs import define
+
+
+@define(auto_attribs=True, slots=True)
+class CacheStats:
+    hits: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hit_rate
+        }
+
+
+class LRUCache:
+    """线程安全的内存LRU缓存，支持条目数上限与TTL"""
+
+    def __init__(self, max_entries: int = 256, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> int:
+        """写入缓存，返回因容量被淘汰的条目数"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        evicted = 0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class SQLiteCache:
+    """基于SQLite的磁盘缓存，支持TTL、zlib压缩与按总字节数的LRU淘汰"""
+
+    def __init__(self,
+                 path: str,
+                 ttl: float | None = None,
+                 max_bytes: int | None = 256 * 1024 * 1024,
+                 compress: bool = True):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.stats = CacheStats()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        import sqlite3
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and created_at + self.ttl < now
+
+    def get(self, key: str) -> bytes | None:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> tuple[bytes, float | None] | None:
+        """返回 (值, 过期时间戳)，过期时间为None表示永不过期"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, size, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            value, size, created_at = row
+            if self._is_expired(created_at, now):
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats.hits += 1
+            self.stats.disk_hits += 1
+        expires_at = created_at + self.ttl if self.ttl is not None else None
+        return (zlib.decompress(value) if self.compress else value), expires_at
+
+    def set(self, key: str, value: bytes):
+        payload = zlib.compress(value) if self.compress else value
+        size = len(payload)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict()
+
+    def _evict(self):
+        if self.max_bytes is None or self._total_bytes <= self.max_bytes:
+            return
+        if self.ttl is not None:
+            cursor = self._conn.execute(
+                "DELETE FROM cache WHERE created_at < ? RETURNING size", (time.time() - self.ttl,)
+            )
+            removed = cursor.fetchall()
+            self._total_bytes -= sum(r[0] for r in removed)
+            self.stats.expirations += len(removed)
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM cache ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.stats.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def delete(self, key: str):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache WHERE key = ? RETURNING size", (key,))
+            self._total_bytes -= sum(r[0] for r in cursor.fetchall())
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._total_bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
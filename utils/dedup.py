@@ -0,0 +1,166 @@
+import re
+import zlib
+import heapq
+from typing import Any
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 只包含纯跟踪用途的参数；ref、from、source等在很多站点上决定页面内容（如GitHub的?ref=<分支>），不能去除
+TRACKING_PARAMS = {
+    "gclid", "fbclid", "msclkid", "dclid", "yclid", "mc_cid", "mc_eid",
+    "spm", "igshid", "_ga", "_gl", "cmpid", "ncid", "srcid", "wfr"
+}
+TRACKING_PREFIXES = ("utm_", "hmsr", "hmpl", "hmcu", "hmkw", "hmci", "pk_", "mtm_")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+
+
+def canonicalize_url(url: str) -> str:
+    """规范化URL：统一协议与主机、去除跟踪参数/页内锚点/默认端口，参数排序
+
+    以/或!开头的片段是单页应用的路由（#/route、#!/route），予以保留。
+    """
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.startswith("m."):
+        host = host[2:]
+    scheme = parts.scheme.lower()
+    port = str(parts.port) if parts.port else ""
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    path = re.sub(r"/(index|default)\.(html?|php|aspx?)$", "/", path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    # http与https视为同一资源
+    fragment = parts.fragment if parts.fragment.startswith(("/", "!")) else ""
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), fragment))
+
+
+def normalize_text(text: str) -> str:
+    text = _NON_WORD_RE.sub(" ", text.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def shingles(text: str, k: int = 5) -> set[str]:
+    """字符级k-gram，对中英文均适用"""
+    text = normalize_text(text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def minhash_signature(text: str, num_hashes: int = 64, k: int = 5) -> tuple[int, ...]:
+    """bottom-k MinHash签名：单一哈希函数下最小的num_hashes个shingle哈希值"""
+    hashes = {zlib.crc32(s.encode("utf-8")) for s in shingles(text, k)}
+    return tuple(sorted(heapq.nsmallest(num_hashes, hashes)))
+
+
+def estimate_jaccard(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    if not sig_a or not sig_b:
+        return 0.0
+    k = min(len(sig_a), len(sig_b))
+    set_a, set_b = set(sig_a), set(sig_b)
+    union_smallest = heapq.nsmallest(k, set_a | set_b)
+    shared = sum(1 for h in union_smallest if h in set_a and h in set_b)
+    return shared / k
+
+
+class SearchDeduplicator:
+    """跨搜索的去重索引：先按规范化URL判重，再用MinHash判定近似重复正文"""
+
+    def __init__(self, threshold: float = 0.8, num_hashes: int = 64, shingle_size: int = 5, min_length: int = 50):
+        self.threshold = threshold
+        self.num_hashes = num_hashes
+        self.shingle_size = shingle_size
+        self.min_length = min_length
+        self._urls: dict[str, int] = {}
+        self._signatures: dict[int, tuple[int, ...]] = {}
+        self._buckets: dict[int, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, content: str) -> tuple[int, ...]:
+        if len(content) < self.min_length:
+            return ()
+        return minhash_signature(content, self.num_hashes, self.shingle_size)
+
+    def find_duplicate(self, url: str, content: str) -> int | None:
+        """返回重复项的编号，不重复返回None"""
+        return self.lookup(url, content)[0]
+
+    def lookup(self, url: str, content: str) -> tuple[int | None, tuple[int, ...] | None]:
+        """返回 (重复项编号, 正文签名)；URL已命中时不计算签名，签名为None
+
+        不重复时把签名传给add，避免对同一正文再计算一次MinHash。
+        """
+        canonical = canonicalize_url(url)
+        if canonical and canonical in self._urls:
+            return self._urls[canonical], None
+        signature = self.signature(content)
+        return self._find_near_duplicate(signature), signature
+
+    def _find_near_duplicate(self, signature: tuple[int, ...]) -> int | None:
+        if not signature:
+            return None
+        candidates: set[int] = set()
+        for h in signature:
+            candidates.update(self._buckets.get(h, ()))
+        best, best_score = None, self.threshold
+        for doc_id in candidates:
+            score = estimate_jaccard(signature, self._signatures[doc_id])
+            if score >= best_score:
+                best, best_score = doc_id, score
+        return best
+
+    def add(self, doc_id: int, url: str, content: str, signature: tuple[int, ...] | None = None):
+        canonical = canonicalize_url(url)
+        if canonical:
+            self._urls.setdefault(canonical, doc_id)
+        if signature is None:
+            signature = self.signature(content)
+        if signature:
+            self._signatures[doc_id] = signature
+            for h in signature:
+                self._buckets.setdefault(h, set()).add(doc_id)
+
+
+def deduplicate_results(results: list[dict[str, Any]], threshold: float = 0.8) -> list[dict[str, Any]]:
+    """对一批搜索结果去重，保留首次出现的结果，重复项的更高得分会合并到保留项"""
+    deduplicator = SearchDeduplicator(threshold=threshold)
+    kept: list[dict[str, Any]] = []
+    for item in results:
+        url, content = item.get("url", ""), item.get("content", "")
+        duplicate, signature = deduplicator.lookup(url, content)
+        if duplicate is None:
+            deduplicator.add(len(kept), url, content, signature)
+            kept.append(dict(item))
+            continue
+        merge_result(kept[duplicate], item)
+    return kept
+
+
+def merge_result(target: dict[str, Any], other: dict[str, Any]):
+    """合并重复结果：保留更高的得分与更完整的正文"""
+    other_score = other.get("score")
+    if other_score is not None and (target.get("score") is None or other_score > target["score"]):
+        target["score"] = other_score
+    other_content = other.get("content", "")
+    if len(other_content) > len(target.get("content", "")):
+        target["content"] = other_content
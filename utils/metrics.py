@@ -0,0 +1,301 @@
+import sys
+import json
+import time
+import inspect
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable
+from attrs import define, field
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in key) + "}"
+
+
+def _current_task_id() -> int | None:
+    # 未导入asyncio时不可能处于协程中，避免为此导入asyncio
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is None:
+        return None
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return None
+    return id(task) if task is not None else None
+
+
+@define(auto_attribs=True, slots=True)
+class Summary:
+    count: int = 0
+    total: float = 0.0
+    min: float = float("inf")
+    max: float = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.mean,
+            "min": self.min if self.count else 0.0,
+            "max": self.max
+        }
+
+
+@define(auto_attribs=True, slots=True)
+class Span:
+    name: str
+    category: str
+    start: float
+    duration: float
+    thread_id: int = 0
+    # 在协程中记录时为所属Task的标识，同一线程上并发的Task导出到不同的trace轨道
+    task_id: int | None = None
+    attributes: dict[str, Any] = field(factory=dict)
+
+
+class MetricsRegistry:
+    """进程内指标注册表：计数器、耗时汇总与调用span，可导出为Prometheus文本或JSON trace"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.enabled = True
+        self._counters: dict[str, dict[LabelKey, float]] = {}
+        self._summaries: dict[str, dict[LabelKey, Summary]] = {}
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._summaries.setdefault(name, {}).setdefault(key, Summary()).observe(value)
+
+    def record_span(self, name: str, category: str, start: float, duration: float, **attributes):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._spans.append(Span(
+                name=name,
+                category=category,
+                start=start - self._origin,
+                duration=duration,
+                thread_id=threading.get_ident(),
+                task_id=_current_task_id(),
+                attributes=attributes
+            ))
+
+    def get_counter(self, name: str, **labels) -> float:
+        return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def get_summary(self, name: str, **labels) -> Summary:
+        return self._summaries.get(name, {}).get(_label_key(labels), Summary())
+
+    def counter_total(self, name: str) -> float:
+        return sum(self._counters.get(name, {}).values())
+
+    @property
+    def spans(self) -> list[Span]:
+        return list(self._spans)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+            self._spans.clear()
+            self._origin = time.perf_counter()
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                "summaries": {
+                    name: [{"labels": dict(key), **summary.to_dict()} for key, summary in series.items()]
+                    for name, series in self._summaries.items()
+                }
+            }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{_format_labels(key)} {value}" for key, value in series.items())
+            for name, series in sorted(self._summaries.items()):
+                lines.append(f"# TYPE {name} summary")
+                for key, summary in series.items():
+                    lines.append(f"{name}_count{_format_labels(key)} {summary.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {summary.total}")
+        return "\n".join(lines) + "\n"
+
+    def to_trace_events(self) -> dict[str, Any]:
+        """Chrome trace格式（chrome://tracing / Perfetto 可直接打开）
+
+        X事件在同一tid内必须严格嵌套，因此每个线程与其上的每个Task各占一条轨道。
+        """
+        spans = self.spans
+        lanes: dict[tuple[int, int | None], int] = {}
+        for span in spans:
+            lanes.setdefault((span.thread_id, span.task_id), len(lanes) + 1)
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 0,
+                "tid": tid,
+                "args": {"name": f"thread {thread_id}" if task_id is None else f"thread {thread_id} task {tid}"}
+            }
+            for (thread_id, task_id), tid in lanes.items()
+        ]
+        events.extend(
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": 0,
+                "tid": lanes[(span.thread_id, span.task_id)],
+                "args": span.attributes
+            }
+            for span in spans
+        )
+        return {"traceEvents": events}
+
+    def export_prometheus(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+
+    def export_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    def export_trace(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_trace_events(), f, ensure_ascii=False)
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+@contextmanager
+def timed(metric: str, category: str, span_name: str, **labels):
+    """记录一段代码的耗时、调用次数与span，异常时status为error"""
+    registry = get_registry()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = "cancelled" if isinstance(e, GeneratorExit) else "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        registry.observe(f"{metric}_seconds", duration, status=status, **labels)
+        registry.inc(f"{metric}s_total", status=status, **labels)
+        registry.record_span(span_name, category, start, duration, status=status, **labels)
+
+
+def instrument(metric: str, category: str, label_getter: Callable[[Any, str], dict[str, Any]]):
+    """生成方法装饰器：同时支持普通函数、协程、同步与异步生成器"""
+    def decorator(method: Callable) -> Callable:
+        name = method.__name__
+
+        if inspect.isasyncgenfunction(method):
+            @functools.wraps(method)
+            async def async_gen_wrapper(self, *args, **kwargs):
+                labels = label_getter(self, name)
+                generator = method(self, *args, **kwargs)
+                with timed(metric, category, f"{labels.get('component', '')}.{name}", **labels):
+                    try:
+                        async for item in generator:
+                            yield item
+                    finally:
+                        # 提前结束时立即关闭内层生成器（如关闭HTTP流）
+                        await generator.aclose()
+            return async_gen_wrapper
+
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def gen_wrapper(self, *args, **kwargs):
+                labels = label_getter(self, name)
+                with timed(metric, category, f"{labels.get('component', '')}.{name}", **labels):
+                    return (yield from method(self, *args, **kwargs))
+            return gen_wrapper
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                labels = label_getter(self, name)
+                with timed(metric, category, f"{labels.get('component', '')}.{name}", **labels):
+                    return await method(self, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            labels = label_getter(self, name)
+            with timed(metric, category, f"{labels.get('component', '')}.{name}", **labels):
+                return method(self, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def record_token_usage(model: str, prompt_tokens: int | None, completion_tokens: int | None, **labels):
+    registry = get_registry()
+    registry.inc("llm_prompt_tokens_total", prompt_tokens or 0, model=model, **labels)
+    registry.inc("llm_completion_tokens_total", completion_tokens or 0, model=model, **labels)
+
+
+def record_usage_from_response(model: str, response: Any, **labels):
+    """从OpenAI响应的usage字段记录token用量"""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        record_token_usage(model, getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0), **labels)
+
+
+def record_fallback(component: str, reason: str):
+    get_registry().inc("fallbacks_total", component=component, reason=reason)
+
+
+def record_queue_time(component: str, seconds: float):
+    get_registry().observe("queue_wait_seconds", seconds, component=component)
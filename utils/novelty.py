@@ -0,0 +1,106 @@
+from typing import TYPE_CHECKING, Any, Iterable
+from attrs import define, field
+from .dedup import canonicalize_url, shingles
+
+if TYPE_CHECKING:
+    from state.state import Research
+
+
+@define(auto_attribs=True, slots=True)
+class NoveltyScore:
+    """一轮搜索结果相对已有信息的新增程度"""
+    url_novelty: float = 0.0
+    content_novelty: float = 0.0
+    new_urls: int = 0
+    total_results: int = 0
+
+    @property
+    def gain(self) -> float:
+        # 已知URL的结果会被合并，不贡献新内容，因此content_novelty已包含URL维度
+        return self.content_novelty
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "url_novelty": self.url_novelty,
+            "content_novelty": self.content_novelty,
+            "new_urls": self.new_urls,
+            "total_results": self.total_results,
+            "gain": self.gain
+        }
+
+
+def known_shingles(texts: Iterable[str], k: int = 5) -> set[str]:
+    known: set[str] = set()
+    for text in texts:
+        known.update(shingles(text, k))
+    return known
+
+
+@define(auto_attribs=True, slots=True)
+class KnownContent:
+    """已知的URL与正文shingle，随Research新增的搜索记录与总结增量更新"""
+    k: int = 5
+    urls: set[str] = field(factory=set)
+    shingles: set[str] = field(factory=set)
+
+    def add_text(self, text: str):
+        self.shingles.update(shingles(text, self.k))
+
+    def add_search(self, url: str, content: str):
+        if url:
+            self.urls.add(canonicalize_url(url))
+        self.add_text(content)
+
+
+def score_novelty(results: list[dict[str, Any]],
+                  known_urls: set[str],
+                  known: set[str],
+                  k: int = 5) -> NoveltyScore:
+    """按新URL占比与新k-gram占比评估结果的信息增益
+
+    content_novelty为新URL结果中未出现过的shingle数除以全部结果的shingle总数，
+    重复URL或换了地址的转载内容都只会带来很低的增益。
+    """
+    if not results:
+        return NoveltyScore()
+    new_urls, new_grams, total_grams = 0, 0, 0
+    # 本批结果内新出现的URL与shingle单独记录，不复制也不修改传入的已知集合
+    seen_urls: set[str] = set()
+    seen: set[str] = set()
+    for result in results:
+        url = canonicalize_url(result.get("url", ""))
+        grams = shingles(result.get("content", ""), k)
+        total_grams += len(grams)
+        if url and (url in known_urls or url in seen_urls):
+            continue
+        new_urls += 1
+        seen_urls.add(url)
+        fresh = grams - known - seen
+        new_grams += len(fresh)
+        seen |= fresh
+    return NoveltyScore(
+        url_novelty=new_urls / len(results),
+        content_novelty=new_grams / total_grams if total_grams else 0.0,
+        new_urls=new_urls,
+        total_results=len(results)
+    )
+
+
+def research_novelty(results: list[dict[str, Any]], research: "Research", k: int = 5) -> NoveltyScore:
+    """以Research的latest_summary与已有search_history为基准评估新结果"""
+    known = research.get_known_content(k)
+    return score_novelty(results, known.urls, known.shingles, k)
+
+
+@define(auto_attribs=True, slots=True)
+class ReflectionPolicy:
+    """反思轮次的自适应预算：每轮增益低于min_gain即停止，最多max_rounds轮"""
+    max_rounds: int = 3
+    min_gain: float = 0.15
+    shingle_size: int = 5
+
+    def should_reflect(self, research: "Research") -> bool:
+        return research.reflection_iteration < self.max_rounds
+
+    def is_worthwhile(self, score: NoveltyScore) -> bool:
+        return score.gain >= self.min_gain
@@ -0,0 +1,340 @@
+import time
+import threading
+from collections import deque
+from contextvars import ContextVar
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, TYPE_CHECKING
+from attrs import define
+from utils.metrics import get_registry
+
+if TYPE_CHECKING:
+    import asyncio
+
+THROTTLE_ERROR_NAMES = {"RateLimitError", "UsageLimitExceededError"}
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """判断异常是否为服务端限流（HTTP 429）"""
+    if type(error).__name__ in THROTTLE_ERROR_NAMES:
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+class TokenBucket:
+    """线程安全的令牌桶，按每分钟速率匀速补充；允许透支，透支部分由后续调用等待偿还"""
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def reserve(self, amount: float) -> float:
+        """预留令牌并返回需要等待的秒数，超过容量的请求按容量计算以免永远等待"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= min(amount, self.capacity)
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def charge(self, amount: float):
+        """事后扣减（如按响应中的实际token用量），负数表示退还"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+    def acquire(self, amount: float = 1):
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, amount: float = 1):
+        import asyncio
+        wait = self.reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class _Waiter:
+    __slots__ = ("event", "future", "loop")
+
+    def __init__(self, loop: "asyncio.AbstractEventLoop | None" = None):
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+
+
+@define(auto_attribs=True, slots=True)
+class AIMDConfig:
+    initial: float = 4
+    min_limit: float = 1
+    max_limit: float = 64
+    # 每成功一个“窗口”（当前并发数个请求）并发上限加 increase
+    increase: float = 1
+    decrease_factor: float = 0.5
+    # 每个输出token的耗时超过基线的该倍数视为延迟尖峰；None表示只根据429减小并发
+    latency_spike_factor: float | None = None
+    # 两次乘性减小之间的最短间隔，避免同一批失败把并发压到底
+    cooldown: float = 1.0
+
+
+class AIMDLimiter:
+    """AIMD自适应并发控制：健康时加性增大并发上限，遇到429或延迟尖峰时乘性减小
+
+    同步线程与多个事件循环可以共享同一个限流器。
+    """
+
+    def __init__(self, config: AIMDConfig | None = None):
+        self.config = config or AIMDConfig()
+        self._limit = float(self.config.initial)
+        self._in_flight = 0
+        self._waiters: deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+        self._baseline: float | None = None
+        self._last_decrease = 0.0
+
+    @property
+    def limit(self) -> int:
+        return max(int(self._limit), int(self.config.min_limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _try_take(self) -> bool:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._lock:
+            if self._try_take():
+                return
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+        waiter.event.wait()
+
+    async def aacquire(self):
+        import asyncio
+        with self._lock:
+            if self._try_take():
+                return
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # 已被分配到名额后才取消，需要把名额交还
+            self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._wake_waiters()
+
+    def _wake_waiters(self):
+        # 名额直接移交给等待者，in_flight不经过“释放再抢占”
+        while self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            self._waiters.popleft().wake()
+
+    def on_success(self, latency: float, output_tokens: int | None = None):
+        """成功后加性增大并发；开启延迟尖峰检测时按输出token数归一化，长输出不会被当作尖峰"""
+        config = self.config
+        with self._lock:
+            spike = False
+            if config.latency_spike_factor is not None and output_tokens:
+                per_token = latency / output_tokens
+                baseline = self._baseline
+                self._baseline = per_token if baseline is None else 0.9 * baseline + 0.1 * per_token
+                spike = baseline is not None and per_token > baseline * config.latency_spike_factor
+            if spike:
+                self._decrease()
+            else:
+                self._limit = min(config.max_limit, self._limit + config.increase / max(self._limit, 1))
+                self._wake_waiters()
+
+    def on_throttle(self):
+        with self._lock:
+            self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.config.cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(self.config.min_limit, self._limit * self.config.decrease_factor)
+
+
+class _Lease:
+    """单次受限调用的上下文，记录调用期间补扣的输出token数"""
+    __slots__ = ("output_tokens",)
+
+    def __init__(self):
+        self.output_tokens = 0
+
+
+_current_lease: ContextVar[_Lease | None] = ContextVar("rate_limit_lease", default=None)
+
+
+@contextmanager
+def _bind_lease(lease: _Lease):
+    previous = _current_lease.get()
+    token = _current_lease.set(lease)
+    try:
+        yield lease
+    finally:
+        try:
+            _current_lease.reset(token)
+        except ValueError:
+            # 生成器在其他上下文中结束时无法reset，直接恢复原值
+            _current_lease.set(previous)
+
+
+class RateLimiter:
+    """请求数/token数令牌桶 + 可选的AIMD并发控制，按名称在进程内共享
+
+    只有显式提供aimd配置时才限制并发。
+    """
+
+    def __init__(self,
+                 name: str,
+                 requests_per_minute: float | None = None,
+                 tokens_per_minute: float | None = None,
+                 aimd: AIMDConfig | None = None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AIMDLimiter(aimd) if aimd is not None else None
+
+    def _reserve(self, tokens: float) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def charge_tokens(self, tokens: float):
+        """请求完成后按实际用量补扣token（如输出token数）"""
+        if self.tokens is not None and tokens:
+            self.tokens.charge(tokens)
+        lease = _current_lease.get()
+        if lease is not None and tokens > 0:
+            lease.output_tokens += tokens
+
+    def _feedback(self, start: float, error: BaseException | None, lease: _Lease):
+        registry = get_registry()
+        if error is None:
+            self.concurrency.on_success(time.perf_counter() - start, lease.output_tokens or None)
+        elif is_throttle_error(error):
+            registry.inc("rate_limit_throttled_total", limiter=self.name)
+            self.concurrency.on_throttle()
+        registry.observe("rate_limit_concurrency", self.concurrency.limit, limiter=self.name)
+
+    @contextmanager
+    def limit(self, tokens: float = 0):
+        """同步调用的限流上下文：等待名额与令牌，结束后根据结果调整并发"""
+        if self.concurrency is not None:
+            self.concurrency.acquire()
+        error = None
+        start = time.perf_counter()
+        lease = _Lease()
+        try:
+            wait = self._reserve(tokens)
+            if wait > 0:
+                get_registry().observe("rate_limit_wait_seconds", wait, limiter=self.name)
+                time.sleep(wait)
+            start = time.perf_counter()
+            with _bind_lease(lease):
+                yield self
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if self.concurrency is not None:
+                # 调用方提前关闭流时不反馈延迟
+                if not isinstance(error, GeneratorExit):
+                    self._feedback(start, error, lease)
+                self.concurrency.release()
+
+    @asynccontextmanager
+    async def alimit(self, tokens: float = 0):
+        import asyncio
+        if self.concurrency is not None:
+            await self.concurrency.aacquire()
+        error = None
+        start = time.perf_counter()
+        lease = _Lease()
+        try:
+            wait = self._reserve(tokens)
+            if wait > 0:
+                get_registry().observe("rate_limit_wait_seconds", wait, limiter=self.name)
+                await asyncio.sleep(wait)
+            start = time.perf_counter()
+            with _bind_lease(lease):
+                yield self
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if self.concurrency is not None:
+                if not isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+                    self._feedback(start, error, lease)
+                self.concurrency.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "concurrency_limit": self.concurrency.limit if self.concurrency else None,
+            "in_flight": self.concurrency.in_flight if self.concurrency else None,
+            "requests_available": self.requests.available if self.requests else None,
+            "tokens_available": self.tokens.available if self.tokens else None
+        }
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, **kwargs) -> RateLimiter:
+    """按名称获取进程内共享的限流器，首次创建时使用kwargs作为配置"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = _limiters[name] = RateLimiter(name, **kwargs)
+    return limiter
+
+
+def reset_rate_limiters():
+    with _limiters_lock:
+        _limiters.clear()
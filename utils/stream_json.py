@@ -0,0 +1,140 @@
+import json
+from typing import Any, Iterable
+
+_WHITESPACE = " \t\r\n"
+
+
+def _is_blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+class StreamingJSONParser:
+    """增量解析LLM流式输出中的顶层JSON对象
+
+    每次feed一个文本块，返回本次新完成的顶层字段 (key, value)。
+    字符串字段在右引号出现时立即产出，无需等待整个对象结束；
+    对象之前的推理文字或```json标签会被跳过。
+    required_fields中的字段值为空时视为缺失，不会产出，调用方按非流式路径回退。
+    """
+
+    def __init__(self, required_fields: Iterable[str] = ()):
+        self.required_fields = tuple(required_fields)
+        self.fields: dict[str, Any] = {}
+        # 文本块只追加到列表，避免长输出反复拼接字符串
+        self._chunks: list[str] = []
+        # 跨块的未完成token，_token_start为其在当前块中的续接位置
+        self._token_parts: list[str] = []
+        self._chunk = ""
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: str | None = None
+        self._token_start: int | None = None
+        self._expect_value = False
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    @property
+    def has_required(self) -> bool:
+        return all(name in self.fields for name in self.required_fields)
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        self._chunks.append(chunk)
+        self._chunk = chunk
+        emitted: list[tuple[str, Any]] = []
+        text = chunk
+        i = 0
+        while i < len(text) and not self.done:
+            ch = text[i]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._close_top_level_string(i, emitted)
+                i += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._token_start is None:
+                    self._token_start = i
+            elif ch in "{[":
+                if self._depth == 1 and self._expect_value and self._token_start is None:
+                    self._token_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect_value:
+                    self._emit_value(i + 1, emitted)
+                elif self._depth == 0:
+                    if self._expect_value and self._token_start is not None:
+                        self._emit_value(i, emitted)
+                    self.done = True
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_value = True
+                    self._token_start = None
+                elif ch == ",":
+                    if self._expect_value and self._token_start is not None:
+                        self._emit_value(i, emitted)
+                    self._reset_member()
+                elif ch not in _WHITESPACE and self._expect_value and self._token_start is None:
+                    # 数字、true/false/null 等原始值
+                    self._token_start = i
+            i += 1
+        if self._token_start is not None and not self.done:
+            self._token_parts.append(text[self._token_start:])
+            self._token_start = 0
+        return emitted
+
+    def _token(self, end: int) -> str:
+        raw = self._chunk[self._token_start:end]
+        if self._token_parts:
+            self._token_parts.append(raw)
+            raw = "".join(self._token_parts)
+            self._token_parts.clear()
+        return raw
+
+    def _close_top_level_string(self, end: int, emitted: list[tuple[str, Any]]):
+        raw = self._token(end + 1)
+        if self._expect_value:
+            self._emit_raw(raw, emitted)
+        else:
+            self._key = json.loads(raw)
+            self._token_start = None
+
+    def _emit_value(self, end: int, emitted: list[tuple[str, Any]]):
+        self._emit_raw(self._token(end).strip(), emitted)
+
+    def _emit_raw(self, raw: str, emitted: list[tuple[str, Any]]):
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            value = raw
+        if self._key is not None and not (self._key in self.required_fields and _is_blank(value)):
+            self.fields[self._key] = value
+            emitted.append((self._key, value))
+        self._reset_member()
+
+    def _reset_member(self):
+        self._key = None
+        self._token_start = None
+        self._token_parts.clear()
+        self._expect_value = False
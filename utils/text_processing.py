@@ -1,34 +1,116 @@
 import re, json
-from typing import Any
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Literal
 from json import JSONDecodeError
+from attrs import define, field
+from utils.dedup import deduplicate_results
+
+_CODE_FENCE_RE = re.compile(r"```")
+_REASONING_RE = re.compile(r"(?is)(?:reasoning|思考|分析|解释)[:：].*?(?=[{\[])")
+_JSON_TOKEN_RE = re.compile(r'[{}\[\]"\\]')
+_JSON_CLOSERS = {"{": "}", "[": "]"}
+
+
+@lru_cache(maxsize=16)
+def _code_block_open_re(language: str) -> re.Pattern[str]:
+    return re.compile(fr"```{re.escape(language)}\s*")
+
 
 def clean_code_block_tags(text: str, language: str = "json") -> str:
     """移除形如```json...```的代码块标签 """
-    text = re.sub(fr"```{language}\s*", "", text)
-    text = re.sub(r"```", "", text)
+    text = _code_block_open_re(language).sub("", text)
+    text = _CODE_FENCE_RE.sub("", text)
     return text.strip()
 
 def remove_reasoning_from_output(text: str) -> str:
     """移除LLM输出的推理或者解释部分"""
-    cleaned = re.sub(r'(?is)(?:reasoning|思考|分析|解释)[:：].*?(?=[{\[])', '', text)
+    cleaned = _REASONING_RE.sub('', text)
     return cleaned.strip()
 
-def extract_json_from_text(text: str) -> dict[str, Any]:
+def iter_json_spans(text: str, start: int = 0) -> Iterator[tuple[int, int]]:
+    """单遍线性扫描文本，按出现顺序产出括号配平的顶层JSON候选区间 [start, end)
+
+    识别字符串与转义，字符串中的括号不参与配平；对象外的引号视为普通文字。
+    借助正则直接跳到结构字符，普通文本不逐字处理。
+    候选因括号不匹配或未闭合而失效时，产出其中已配平的最外层子区间，不回退重扫。
+    """
+    # 每层记录 (期望的闭括号, 起点, 该层内已配平的最外层子区间)
+    stack: list[tuple[str, int, list[tuple[int, int]]]] = []
+    in_string = False
+    skip_until = -1
+    for match in _JSON_TOKEN_RE.finditer(text, start):
+        pos = match.start()
+        if pos < skip_until:
+            continue
+        ch = text[pos]
+        if in_string:
+            if ch == "\\":
+                skip_until = pos + 2
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch in _JSON_CLOSERS:
+            stack.append((_JSON_CLOSERS[ch], pos, []))
+        elif not stack:
+            continue
+        elif ch == '"':
+            in_string = True
+        elif ch == stack[-1][0]:
+            _, span_start, _ = stack.pop()
+            if stack:
+                # 子区间被外层候选包含，只保留外层
+                stack[-1][2].append((span_start, pos + 1))
+            else:
+                yield span_start, pos + 1
+        else:
+            # 括号不匹配：所有未闭合的候选都不可能配平，产出它们内部已配平的子区间
+            for _, _, children in stack:
+                yield from children
+            stack.clear()
+    # 未闭合的候选中可能嵌有完整的JSON
+    for _, _, children in stack:
+        yield from children
 
-    text = clean_code_block_tags(remove_reasoning_from_output(text))
-    try:
-        return json.loads(text)
-    except JSONDecodeError:
-        pass
+def _parse_spans(text: str, spans: Iterable[tuple[int, int]]) -> Iterator[Any]:
+    for begin, end in spans:
+        try:
+            yield json.loads(text[begin:end])
+        except JSONDecodeError:
+            continue
 
-    match = re.search(r"(\{.*\}|\[.*\])", text, re.DOTALL)
-    if match:
-        snippet = match.group()
+def extract_json_detailed(text: str, which: Literal["first", "last", "all"] = "first") -> tuple[Any, str]:
+    """提取JSON并返回 (结果, 解析路径)，路径为 direct/scan/failed，供统计回退率"""
+    cleaned = clean_code_block_tags(remove_reasoning_from_output(text))
+    if cleaned[:1] in _JSON_CLOSERS:
         try:
-            return json.load(snippet)
+            value = json.loads(cleaned)
+            return ([value] if which == "all" else value), "direct"
         except JSONDecodeError:
-            return {"error": "JSON解析失败", "raw_text": snippet}
-    return {"error": "未找到JSON结构", "raw_text": text}
+            pass
+
+    match which:
+        case "first":
+            value = next(_parse_spans(text, iter_json_spans(text)), None)
+            if value is not None:
+                return value, "scan"
+        case "last":
+            value = next(_parse_spans(text, reversed(list(iter_json_spans(text)))), None)
+            if value is not None:
+                return value, "scan"
+        case "all":
+            values = list(_parse_spans(text, iter_json_spans(text)))
+            if values:
+                return values, "scan"
+        case _:
+            raise ValueError(f"未知的提取方式：{which}")
+
+    if any(ch in cleaned for ch in _JSON_CLOSERS):
+        return {"error": "JSON解析失败", "raw_text": cleaned}, "failed"
+    return {"error": "未找到JSON结构", "raw_text": cleaned}, "failed"
+
+def extract_json_from_text(text: str, which: Literal["first", "last", "all"] = "first") -> Any:
+    """从LLM输出中提取JSON，which指定取第一个、最后一个或全部顶层对象"""
+    return extract_json_detailed(text, which)[0]
 
 def validate_json_schema(data: dict[str, Any], required_field: list[str]) -> bool:
     return all(field in data for field in required_field)
@@ -42,12 +124,194 @@ def truncate_content(content: str, max_length: int = 20000) -> str:
         truncated = truncated[:last_space]
     return truncated + "..."
 
-def format_search_results_for_prompt(search_results: list[dict[str, Any]], max_length: int = 20000) -> str:
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_SENTENCE_END_RE = re.compile(r"[。！？!?；;]|[.](?=\s)|\n")
+_TERM_RE = re.compile(r"[a-z0-9]+|[\u3400-\u4dbf\u4e00-\u9fff]+")
+_BLOCK_END_RE = re.compile(r"(?<=[。！？!?；;\n])|(?<=\.)(?=\s)")
+RESULT_SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：CJK字符约1个token，其余字符约4个字符1个token"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def get_prompt_token_budget(llm_config: dict[str, Any], reserved_tokens: int = 2000) -> int:
+    """根据模型上下文窗口与max_tokens计算可用于搜索结果的token预算"""
+    context_window = llm_config.get("context_window", 128000)
+    max_tokens = llm_config.get("max_tokens", 4096)
+    return max(context_window - max_tokens - reserved_tokens, 0)
+
+
+def truncate_to_tokens(content: str, max_tokens: int) -> str:
+    """按token预算截断，尽量在句子边界处切断"""
+    if estimate_tokens(content) <= max_tokens:
+        return content
+    if max_tokens <= 0:
+        return ""
+    # 按字符累加估算token，找到预算对应的截断位置；预留省略号与取整误差
+    limit = max_tokens - 2
+    used, cut = 0.0, 0
+    for cut, ch in enumerate(content):
+        used += 1 if _CJK_RE.match(ch) else 0.25
+        if used > limit:
+            break
+    truncated = content[:cut]
+    boundary = max((m.end() for m in _SENTENCE_END_RE.finditer(truncated)), default=0)
+    if boundary > cut * 0.5:
+        return truncated[:boundary].rstrip()
+    last_space = truncated.rfind(" ")
+    if last_space > cut * 0.8:
+        truncated = truncated[:last_space]
+    return truncated.rstrip() + "..."
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list[str]:
+    """按句子边界把文本切成不超过max_tokens的块，超长的单句直接截断"""
+    chunks, current, used = [], [], 0
+    for sentence in filter(None, _BLOCK_END_RE.split(text)):
+        tokens = estimate_tokens(sentence)
+        if current and used + tokens > max_tokens:
+            chunks.append("".join(current))
+            current, used = [], 0
+        if tokens > max_tokens:
+            sentence, tokens = truncate_to_tokens(sentence, max_tokens), max_tokens
+        current.append(sentence)
+        used += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def tokenize(text: str) -> list[str]:
+    """检索用分词：英文与数字按词切分，连续的中文按重叠双字切分，单个汉字保留为一个词"""
+    tokens = []
+    for term in _TERM_RE.findall(text.lower()):
+        if _CJK_RE.match(term):
+            tokens.extend(term[i:i + 2] for i in range(max(len(term) - 1, 1)))
+        else:
+            tokens.append(term)
+    return tokens
+
+
+def _query_terms(text: str) -> set[str]:
+    terms = set()
+    for term in _TERM_RE.findall(text.lower()):
+        if _CJK_RE.match(term):
+            terms.update(term[i:i + 2] for i in range(max(len(term) - 1, 1)))
+        elif len(term) > 1:
+            terms.add(term)
+    return terms
+
+
+def relevance_score(query: str, content: str) -> float:
+    """查询词（中文按双字切分）在内容中的覆盖率"""
+    terms = _query_terms(query)
+    if not terms:
+        return 0.0
+    lowered = content.lower()
+    return sum(1 for term in terms if term in lowered) / len(terms)
+
+
+@define(auto_attribs=True, slots=True)
+class PackedContext:
+    text: str = ""
+    token_budget: int = 0
+    used_tokens: int = 0
+    included: int = 0
+    truncated: int = 0
+    dropped: int = 0
+    dropped_tokens: int = 0
+    items: list[dict[str, Any]] = field(factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "used_tokens": self.used_tokens,
+            "included": self.included,
+            "truncated": self.truncated,
+            "dropped": self.dropped,
+            "dropped_tokens": self.dropped_tokens
+        }
+
+
+def pack_search_results(search_results: list[dict[str, Any]],
+                        token_budget: int,
+                        query: str = "",
+                        min_tokens_per_result: int = 200,
+                        score_weight: float = 0.5,
+                        deduplicate: bool = True) -> PackedContext:
+    """在token预算内打包搜索结果
+
+    按score与查询相关度排序，预算不足时丢弃排名最低的结果，
+    其余结果以水位填充方式分配预算：短结果完整保留，剩余预算均分给长结果。
+    """
+    if deduplicate:
+        search_results = deduplicate_results(search_results)
+
+    candidates = []
+    for item in search_results:
+        content = item.get("content", "").strip()
+        if not content:
+            continue
+        score = item.get("score") or 0.0
+        rank = score_weight * score + (1 - score_weight) * relevance_score(query, content) if query else score
+        candidates.append({"item": item, "content": content, "rank": rank, "need": estimate_tokens(content)})
+    candidates.sort(key=lambda c: c["rank"], reverse=True)
+
+    packed = PackedContext(token_budget=token_budget)
+    separator_tokens = estimate_tokens(RESULT_SEPARATOR)
+
+    def available(count: int) -> int:
+        return token_budget - separator_tokens * max(count - 1, 0)
+
+    kept = list(candidates)
+    while kept and available(len(kept)) < sum(min(c["need"], min_tokens_per_result) for c in kept):
+        dropped = kept.pop()
+        packed.dropped += 1
+        packed.dropped_tokens += dropped["need"]
+
+    remaining = available(len(kept))
+    for i, candidate in enumerate(sorted(kept, key=lambda c: c["need"])):
+        allocation = min(candidate["need"], remaining // (len(kept) - i))
+        candidate["allocation"] = allocation
+        remaining -= allocation
+
+    sections = []
+    for candidate in kept:
+        content = candidate["content"]
+        if candidate["allocation"] < candidate["need"]:
+            content = truncate_to_tokens(content, candidate["allocation"])
+            packed.truncated += 1
+            packed.dropped_tokens += candidate["need"] - estimate_tokens(content)
+        if not content:
+            packed.dropped += 1
+            continue
+        sections.append(content)
+        packed.items.append(candidate["item"])
+
+    packed.text = RESULT_SEPARATOR.join(sections)
+    packed.included = len(sections)
+    packed.used_tokens = estimate_tokens(packed.text)
+    return packed
+
+
+def format_search_results_for_prompt(search_results: list[dict[str, Any]],
+                                     max_length: int = 20000,
+                                     deduplicate: bool = True,
+                                     token_budget: int | None = None,
+                                     query: str = "") -> str:
+    """格式化搜索结果，给定token_budget时使用预算打包，否则按max_length逐条截断"""
+    if token_budget is not None:
+        return pack_search_results(search_results, token_budget, query=query, deduplicate=deduplicate).text
+    if deduplicate:
+        search_results = deduplicate_results(search_results)
     formatted = []
     for item in search_results:
         content = item.get("content", "").strip()
         if content:
             formatted.append(truncate_content(content, max_length))
     return "\n\n".join(formatted)
-
-